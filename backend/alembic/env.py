@@ -0,0 +1,61 @@
+"""
+Alembic environment.
+
+Migrations run on the application's own sync engine (app.core.database),
+so DATABASE_URL, async-driver stripping and SQLite PRAGMAs all apply.
+Callers that already hold a connection (tests, tooling) can pass it as
+`config.attributes["connection"]`.
+"""
+
+from logging.config import fileConfig
+
+from alembic import context
+
+from app.core.database import Base, engine, sync_database_url
+from app.models import user, task  # noqa: F401  Import models to register them
+
+config = context.config
+
+if config.config_file_name is not None and not config.attributes.get("connection"):
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = Base.metadata
+
+
+def run_migrations_offline() -> None:
+    """Emit the migration SQL without a database connection (alembic upgrade --sql)."""
+    context.configure(
+        url=sync_database_url,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        render_as_batch=sync_database_url.startswith("sqlite"),
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_on(connection) -> None:
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        # SQLite can't ALTER most things; batch mode recreates the table
+        render_as_batch=connection.dialect.name == "sqlite",
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        run_migrations_on(connection)
+        return
+    with engine.connect() as connection:
+        run_migrations_on(connection)
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,91 @@
+"""Baseline schema (users, tasks, pomodoro_sessions)
+
+Databases created by the old create_all() at startup already have these
+tables; they are left alone, so `alembic upgrade head` adopts them.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-16
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if op.get_context().as_sql:
+        existing = set()
+    else:
+        existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "users" not in existing:
+        op.create_table(
+            "users",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("email", sa.String(length=255), nullable=False),
+            sa.Column("username", sa.String(length=100), nullable=False),
+            sa.Column("hashed_password", sa.String(length=255), nullable=False),
+            sa.Column("is_active", sa.Boolean(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.Column("updated_at", sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_users_email", "users", ["email"], unique=True)
+        op.create_index("ix_users_id", "users", ["id"])
+        op.create_index("ix_users_username", "users", ["username"], unique=True)
+
+    if "tasks" not in existing:
+        op.create_table(
+            "tasks",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("title", sa.String(length=200), nullable=False),
+            sa.Column("description", sa.Text(), nullable=True),
+            sa.Column(
+                "status",
+                sa.Enum("TODO", "IN_PROGRESS", "DONE", name="taskstatus", native_enum=False, length=20),
+                nullable=True,
+            ),
+            sa.Column(
+                "priority",
+                sa.Enum("LOW", "MEDIUM", "HIGH", name="taskpriority", native_enum=False, length=20),
+                nullable=True,
+            ),
+            sa.Column("user_id", sa.Integer(), nullable=False),
+            sa.Column("due_date", sa.DateTime(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.Column("updated_at", sa.DateTime(), nullable=True),
+            sa.Column("completed_at", sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_tasks_id", "tasks", ["id"])
+        op.create_index("ix_tasks_user_id", "tasks", ["user_id"])
+
+    if "pomodoro_sessions" not in existing:
+        op.create_table(
+            "pomodoro_sessions",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("task_id", sa.Integer(), nullable=False),
+            sa.Column("duration_minutes", sa.Integer(), nullable=False),
+            sa.Column("actual_duration_minutes", sa.Integer(), nullable=True),
+            sa.Column("session_type", sa.String(length=20), nullable=False),
+            sa.Column("started_at", sa.DateTime(), nullable=True),
+            sa.Column("completed_at", sa.DateTime(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(["task_id"], ["tasks.id"]),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_pomodoro_sessions_id", "pomodoro_sessions", ["id"])
+
+
+def downgrade() -> None:
+    op.drop_table("pomodoro_sessions")
+    op.drop_table("tasks")
+    op.drop_table("users")
@@ -0,0 +1,49 @@
+"""Indexes for per-user task filters and per-task session lookups
+
+- tasks (user_id, status): task lists and stats filtered by status
+- pomodoro_sessions (task_id, created_at): every session query joins or
+  filters on task_id (this also serves as the missing task_id index) and
+  most of them order or filter by created_at
+
+On PostgreSQL the indexes are built CONCURRENTLY so writes aren't blocked
+while they build; that can't run inside a transaction, hence the
+autocommit block.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-16
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_tasks_user_id_status", "tasks", ["user_id", "status"]),
+    ("ix_pomodoro_sessions_task_id_created_at", "pomodoro_sessions", ["task_id", "created_at"]),
+]
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            for name, table, columns in INDEXES:
+                op.create_index(name, table, columns, postgresql_concurrently=True)
+    else:
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            for name, table, _ in INDEXES:
+                op.drop_index(name, table_name=table, postgresql_concurrently=True)
+    else:
+        for name, table, _ in INDEXES:
+            op.drop_index(name, table_name=table)
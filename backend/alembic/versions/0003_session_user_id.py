@@ -0,0 +1,76 @@
+"""Denormalized pomodoro_sessions.user_id
+
+Adds the owner of each session's task to the session row so per-user
+session queries don't need to join tasks. Existing rows are backfilled in
+id ranges, keeping each UPDATE transaction short on large tables.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-16
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH_SIZE = 50000
+
+BACKFILL = (
+    "UPDATE pomodoro_sessions SET user_id = "
+    "(SELECT tasks.user_id FROM tasks WHERE tasks.id = pomodoro_sessions.task_id)"
+)
+
+
+def backfill() -> None:
+    context = op.get_context()
+    if context.as_sql:
+        op.execute(BACKFILL)
+        return
+    bind = op.get_bind()
+    low, high = bind.execute(sa.text("SELECT min(id), max(id) FROM pomodoro_sessions")).one()
+    if low is None:
+        return
+    postgresql = bind.dialect.name == "postgresql"
+    for start in range(low, high + 1, BACKFILL_BATCH_SIZE):
+        statement = sa.text(f"{BACKFILL} WHERE id >= :start AND id < :end").bindparams(
+            start=start, end=start + BACKFILL_BATCH_SIZE
+        )
+        if postgresql:
+            # Commit each range on its own
+            with context.autocommit_block():
+                bind.execute(statement)
+        else:
+            bind.execute(statement)
+
+
+def upgrade() -> None:
+    op.add_column("pomodoro_sessions", sa.Column("user_id", sa.Integer(), nullable=True))
+    backfill()
+
+    with op.batch_alter_table("pomodoro_sessions") as batch_op:
+        batch_op.alter_column("user_id", existing_type=sa.Integer(), nullable=False)
+        batch_op.create_foreign_key("fk_pomodoro_sessions_user_id_users", "users", ["user_id"], ["id"])
+
+    if op.get_bind().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            op.create_index(
+                "ix_pomodoro_sessions_user_id_created_at",
+                "pomodoro_sessions",
+                ["user_id", "created_at"],
+                postgresql_concurrently=True,
+            )
+    else:
+        op.create_index("ix_pomodoro_sessions_user_id_created_at", "pomodoro_sessions", ["user_id", "created_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_pomodoro_sessions_user_id_created_at", table_name="pomodoro_sessions")
+    with op.batch_alter_table("pomodoro_sessions") as batch_op:
+        batch_op.drop_constraint("fk_pomodoro_sessions_user_id_users", type_="foreignkey")
+        batch_op.drop_column("user_id")
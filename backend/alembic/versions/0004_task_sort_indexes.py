@@ -0,0 +1,48 @@
+"""Indexes for keyset pagination of task listings
+
+One (user_id, sort key, id) index per task sort order, so each page is an
+index range scan. The priority sort ranks LOW < MEDIUM < HIGH, which needs
+an expression index; its expression must stay identical to
+app.models.task.task_priority_rank for queries to use it.
+
+Session listings already use ix_pomodoro_sessions_user_id_created_at.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-16
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+PRIORITY_RANK = sa.text(
+    "(CASE WHEN (priority = 'LOW') THEN 0 WHEN (priority = 'HIGH') THEN 2 ELSE 1 END)"
+)
+
+INDEXES = [
+    ("ix_tasks_user_id_created_at_id", ["user_id", "created_at", "id"]),
+    ("ix_tasks_user_id_due_date_id", ["user_id", "due_date", "id"]),
+    ("ix_tasks_user_id_priority_rank_id", ["user_id", PRIORITY_RANK, "id"]),
+]
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            for name, columns in INDEXES:
+                op.create_index(name, "tasks", columns, postgresql_concurrently=True)
+    else:
+        for name, columns in INDEXES:
+            op.create_index(name, "tasks", columns)
+
+
+def downgrade() -> None:
+    for name, _ in INDEXES:
+        op.drop_index(name, table_name="tasks")
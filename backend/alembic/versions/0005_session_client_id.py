@@ -0,0 +1,44 @@
+"""Client ids for offline-uploaded pomodoro sessions
+
+Sessions recorded offline carry an id generated by the client, unique per
+user, so re-uploading the same history doesn't create duplicates. Rows
+created online keep a NULL client_id, which the unique index ignores.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-16
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("pomodoro_sessions", sa.Column("client_id", sa.String(length=64), nullable=True))
+
+    if op.get_bind().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            op.create_index(
+                "ix_pomodoro_sessions_user_id_client_id",
+                "pomodoro_sessions",
+                ["user_id", "client_id"],
+                unique=True,
+                postgresql_concurrently=True,
+            )
+    else:
+        op.create_index(
+            "ix_pomodoro_sessions_user_id_client_id", "pomodoro_sessions", ["user_id", "client_id"], unique=True
+        )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_pomodoro_sessions_user_id_client_id", table_name="pomodoro_sessions")
+    with op.batch_alter_table("pomodoro_sessions") as batch_op:
+        batch_op.drop_column("client_id")
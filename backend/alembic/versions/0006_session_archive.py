@@ -0,0 +1,42 @@
+"""Archive table for old pomodoro sessions
+
+Totals of sessions moved out of pomodoro_sessions by the archival job
+(app.core.archive), one row per user, day, task and session type.
+Partitioning pomodoro_sessions is opt-in and done separately with
+`python maintain_sessions.py partition` (PostgreSQL only).
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-16
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "pomodoro_session_archive",
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("task_id", sa.Integer(), sa.ForeignKey("tasks.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("session_type", sa.String(length=20), nullable=False),
+        sa.Column("sessions", sa.Integer(), nullable=False),
+        sa.Column("completed_sessions", sa.Integer(), nullable=False),
+        sa.Column("completed_minutes", sa.Integer(), nullable=False),
+        sa.Column("timed_sessions", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("user_id", "day", "task_id", "session_type"),
+    )
+    op.create_index("ix_pomodoro_session_archive_task_id", "pomodoro_session_archive", ["task_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_pomodoro_session_archive_task_id", table_name="pomodoro_session_archive")
+    op.drop_table("pomodoro_session_archive")
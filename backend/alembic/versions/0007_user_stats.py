@@ -0,0 +1,72 @@
+"""Per-user statistics counters
+
+Adds user_stats, the running totals the dashboard reads instead of
+aggregating each user's history (see app.core.user_stats), and fills it
+from the existing tasks, sessions and archived sessions. Counters can be
+recomputed later with `python maintain_stats.py rebuild`.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-16
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+COUNTERS = [
+    "tasks",
+    "todo_tasks",
+    "in_progress_tasks",
+    "done_tasks",
+    "sessions",
+    "completed_sessions",
+    "completed_minutes",
+    "timed_sessions",
+    "work_minutes",
+]
+
+# Statuses are stored by enum name
+_TASKS = "(SELECT count(*) FROM tasks t WHERE t.user_id = users.id{})"
+_SESSIONS = "(SELECT {} FROM pomodoro_sessions s WHERE s.user_id = users.id{})"
+_ARCHIVE = "(SELECT coalesce(sum({}), 0) FROM pomodoro_session_archive a WHERE a.user_id = users.id{})"
+_COMPLETED = " AND s.completed_at IS NOT NULL"
+_MINUTES = "coalesce(sum(s.actual_duration_minutes), 0)"
+
+BACKFILL = (
+    f"INSERT INTO user_stats (user_id, {', '.join(COUNTERS)}) SELECT users.id, "
+    + ", ".join([
+        _TASKS.format(""),
+        _TASKS.format(" AND t.status = 'TODO'"),
+        _TASKS.format(" AND t.status = 'IN_PROGRESS'"),
+        _TASKS.format(" AND t.status = 'DONE'"),
+        _SESSIONS.format("count(*)", "") + " + " + _ARCHIVE.format("a.sessions", ""),
+        _SESSIONS.format("count(*)", _COMPLETED) + " + " + _ARCHIVE.format("a.completed_sessions", ""),
+        _SESSIONS.format(_MINUTES, _COMPLETED) + " + " + _ARCHIVE.format("a.completed_minutes", ""),
+        _SESSIONS.format("count(s.actual_duration_minutes)", _COMPLETED)
+        + " + " + _ARCHIVE.format("a.timed_sessions", ""),
+        _SESSIONS.format(_MINUTES, _COMPLETED + " AND s.session_type = 'work'")
+        + " + " + _ARCHIVE.format("a.completed_minutes", " AND a.session_type = 'work'"),
+    ])
+    + " FROM users"
+)
+
+
+def upgrade() -> None:
+    op.create_table(
+        "user_stats",
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        *(sa.Column(name, sa.Integer(), nullable=False) for name in COUNTERS),
+        sa.PrimaryKeyConstraint("user_id"),
+    )
+    op.execute(BACKFILL)
+
+
+def downgrade() -> None:
+    op.drop_table("user_stats")
@@ -0,0 +1,81 @@
+"""Hourly activity rollups per user
+
+Adds user_stats_hourly, each user's sessions, completed sessions, work
+minutes and completed tasks per UTC hour, which /stats/timeseries reads
+instead of the sessions (see app.core.user_stats), and fills it from the
+existing sessions, archived sessions (at the start of their day) and
+tasks. Large databases can leave the tables empty here and fill them in
+user batches with `python maintain_stats.py backfill` instead.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-16
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+ROLLUPS = ["sessions", "completed_sessions", "work_minutes", "tasks_completed"]
+
+# Hour expressions by dialect; SQLite compares the text the DateTime type stores
+HOURS = {
+    "postgresql": {
+        "session": "date_trunc('hour', s.created_at)",
+        "archive": "CAST(a.day AS timestamp)",
+        "task": "date_trunc('hour', t.completed_at)",
+    },
+    "sqlite": {
+        "session": "strftime('%Y-%m-%d %H:00:00.000000', s.created_at)",
+        "archive": "a.day || ' 00:00:00.000000'",
+        "task": "strftime('%Y-%m-%d %H:00:00.000000', t.completed_at)",
+    },
+}
+
+SESSIONS = (
+    "SELECT s.user_id, {session}, count(*), count(s.completed_at), "
+    "coalesce(sum(CASE WHEN s.completed_at IS NOT NULL AND s.session_type = 'work' "
+    "THEN s.actual_duration_minutes END), 0), 0 "
+    "FROM pomodoro_sessions s WHERE s.created_at IS NOT NULL GROUP BY s.user_id, {session}"
+)
+ARCHIVE = (
+    "SELECT a.user_id, {archive}, sum(a.sessions), sum(a.completed_sessions), "
+    "coalesce(sum(CASE WHEN a.session_type = 'work' THEN a.completed_minutes END), 0), 0 "
+    "FROM pomodoro_session_archive a GROUP BY a.user_id, {archive}"
+)
+# Statuses are stored by enum name
+TASKS = (
+    "SELECT t.user_id, {task}, 0, 0, 0, count(*) FROM tasks t "
+    "WHERE t.status = 'DONE' AND t.completed_at IS NOT NULL GROUP BY t.user_id, {task}"
+)
+
+UPSERT = (
+    f"INSERT INTO user_stats_hourly (user_id, hour, {', '.join(ROLLUPS)}) {{select}} "
+    "ON CONFLICT (user_id, hour) DO UPDATE SET "
+    + ", ".join(f"{name} = user_stats_hourly.{name} + excluded.{name}" for name in ROLLUPS)
+)
+
+
+def upgrade() -> None:
+    op.create_table(
+        "user_stats_hourly",
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("hour", sa.DateTime(), nullable=False),
+        *(sa.Column(name, sa.Integer(), nullable=False) for name in ROLLUPS),
+        sa.PrimaryKeyConstraint("user_id", "hour"),
+    )
+    hours = HOURS.get(op.get_bind().dialect.name)
+    if hours is None:
+        return
+    for select in (SESSIONS, ARCHIVE, TASKS):
+        op.execute(UPSERT.format(select=select.format(**hours)))
+
+
+def downgrade() -> None:
+    op.drop_table("user_stats_hourly")
@@ -0,0 +1,97 @@
+"""Daily focus arrays per user
+
+Adds user_activity, one row per user with the completed work sessions
+and their minutes of every UTC day packed into arrays (see
+app.core.activity), which /stats/heatmap and /stats/streaks read, and
+fills it from the existing sessions and archived sessions, a range of
+users at a time. Offline (--sql) upgrades leave it empty; fill it with
+`python maintain_stats.py backfill`.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-16
+"""
+
+import struct
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH_USERS = 1000
+
+DAYS = {"postgresql": "CAST(s.created_at AS DATE)", "sqlite": "date(s.created_at)"}
+
+SESSIONS = (
+    "SELECT s.user_id, {day}, count(*), coalesce(sum(s.actual_duration_minutes), 0) FROM pomodoro_sessions s "
+    "WHERE s.session_type = 'work' AND s.completed_at IS NOT NULL AND s.created_at IS NOT NULL "
+    "AND s.user_id >= :low AND s.user_id < :high GROUP BY s.user_id, {day}"
+)
+ARCHIVE = (
+    "SELECT a.user_id, a.day, sum(a.completed_sessions), sum(a.completed_minutes) FROM pomodoro_session_archive a "
+    "WHERE a.session_type = 'work' AND a.user_id >= :low AND a.user_id < :high GROUP BY a.user_id, a.day"
+)
+
+
+def _pack(values) -> bytes:
+    # Unsigned 16-bit little-endian, saturating
+    return struct.pack(f"<{len(values)}H", *(min(max(value, 0), 0xFFFF) for value in values))
+
+
+def backfill(bind) -> None:
+    day_expression = DAYS.get(bind.dialect.name)
+    high_id = bind.execute(sa.text("SELECT max(id) FROM users")).scalar()
+    if day_expression is None or high_id is None:
+        return
+    table = sa.table(
+        "user_activity",
+        sa.column("user_id"),
+        sa.column("first_day", sa.Date()),
+        sa.column("work_sessions", sa.LargeBinary()),
+        sa.column("work_minutes", sa.LargeBinary()),
+    )
+    for low in range(0, high_id + 1, BACKFILL_BATCH_USERS):
+        bounds = {"low": low, "high": low + BACKFILL_BATCH_USERS}
+        days = {}
+        for query in (SESSIONS.format(day=day_expression), ARCHIVE):
+            for user_id, day, sessions, minutes in bind.execute(sa.text(query), bounds):
+                day = day if isinstance(day, date) else date.fromisoformat(str(day))
+                totals = days.setdefault(user_id, {}).setdefault(day, [0, 0])
+                totals[0] += sessions
+                totals[1] += minutes or 0
+        rows = []
+        for user_id, user_days in days.items():
+            first, last = min(user_days), max(user_days)
+            span = [user_days.get(date.fromordinal(ordinal), (0, 0)) for ordinal in range(first.toordinal(), last.toordinal() + 1)]
+            rows.append({
+                "user_id": user_id,
+                "first_day": first,
+                "work_sessions": _pack([sessions for sessions, _ in span]),
+                "work_minutes": _pack([minutes for _, minutes in span]),
+            })
+        if rows:
+            op.bulk_insert(table, rows)
+
+
+def upgrade() -> None:
+    op.create_table(
+        "user_activity",
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("first_day", sa.Date(), nullable=False),
+        sa.Column("work_sessions", sa.LargeBinary(), nullable=False),
+        sa.Column("work_minutes", sa.LargeBinary(), nullable=False),
+        sa.PrimaryKeyConstraint("user_id"),
+    )
+    if not op.get_context().as_sql:
+        backfill(op.get_bind())
+
+
+def downgrade() -> None:
+    op.drop_table("user_activity")
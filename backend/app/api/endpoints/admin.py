@@ -2,15 +2,20 @@
 Admin endpoints for database management.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
-from ...core.database import get_db, reset_database, drop_all_tables, create_tables
+from ...core.database import get_db, database_pool_status
 from ...core.config import settings
-from ...models.user import User
-from ...models.task import Task, PomodoroSession
+from ...core.password_hashing import password_hasher
+from ...core.principal_cache import principal_cache, clear_principals
+from ...core.purge import purge_all, purge_user
+from ...core.security import token_cache
+from ...core.stats_cache import stats_cache
+from ...core.rate_limit import rate_limit_state
+from ..routing import SessionRouter
 
-router = APIRouter()
+router = SessionRouter()
 
 
 @router.post("/reset-db", status_code=status.HTTP_200_OK)
@@ -19,21 +24,21 @@ def reset_db(db: Session = Depends(get_db)):
     Reset the entire database.
     WARNING: This will delete ALL data including users, tasks, and pomodoro sessions!
     
+    The schema is kept: tables are truncated on PostgreSQL and emptied in
+    small batches elsewhere (see app.core.purge), so other connections are
+    never locked out for long. Use `python reset_db.py` to rebuild the schema.
+    
     Note: This endpoint is for development/testing only. 
     In production, use proper database migration tools.
     """
     try:
-        # Close all connections first
-        db.close()
-        
-        # Drop all tables
-        drop_all_tables()
-        # Recreate all tables
-        create_tables()
+        deleted = purge_all(db.get_bind())
+        clear_principals()
         
         return {
             "message": "Database reset successfully",
             "status": "success",
+            "deleted": deleted,
             "database_url": settings.DATABASE_URL.split("@")[-1] if "@" in settings.DATABASE_URL else settings.DATABASE_URL
         }
     except Exception as e:
@@ -53,22 +58,51 @@ def delete_all_users(db: Session = Depends(get_db)):
     WARNING: This will delete ALL users and their associated data!
     """
     try:
-        # Delete all pomodoro sessions (they depend on tasks)
-        db.query(PomodoroSession).delete()
-        # Delete all tasks (they depend on users)
-        db.query(Task).delete()
-        # Delete all users
-        deleted_count = db.query(User).delete()
-        db.commit()
+        deleted = purge_all(db.get_bind())
+        # Bulk deletes bypass ORM events, so drop cached principals explicitly
+        clear_principals()
         
+        users = "all" if deleted["users"] is None else deleted["users"]
         return {
-            "message": f"Deleted {deleted_count} users and all associated data",
-            "status": "success"
+            "message": f"Deleted {users} users and all associated data",
+            "status": "success",
+            "deleted": deleted,
         }
     except Exception as e:
-        db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error deleting users: {str(e)}"
         )
 
+
+@router.delete("/users/{user_id}", status_code=status.HTTP_200_OK)
+def delete_user(user_id: int, db: Session = Depends(get_db)):
+    """
+    Delete one user and all of their tasks and sessions.
+    
+    The account is deactivated first, then its rows are deleted in small
+    batches, so other users' requests aren't blocked meanwhile.
+    """
+    deleted = purge_user(db.get_bind(), user_id)
+    if deleted is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return {
+        "message": f"Deleted user {user_id} and all associated data",
+        "status": "success",
+        "deleted": deleted,
+    }
+
+
+@router.get("/metrics", status_code=status.HTTP_200_OK)
+def get_metrics():
+    """
+    Runtime metrics for capacity planning (queue depths, latencies, counters).
+    """
+    return {
+        "password_hashing": password_hasher.metrics(),
+        "principal_cache": principal_cache.stats(),
+        "token_cache": token_cache.stats(),
+        "stats_cache": stats_cache.stats(),
+        "auth_rate_limit": rate_limit_state(),
+        "database_pool": database_pool_status(),
+    }
@@ -3,108 +3,157 @@ API endpoints for authentication (register, login, me).
 """
 
 from datetime import timedelta
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Optional
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from ...core.database import get_db
-from ...core.security import verify_password, get_password_hash, create_access_token
+from ...core.database import get_request_db, run_db
+from ...core.security import create_access_token
+from ...core.password_hashing import password_hasher, PasswordHashingUnavailable
+from ...core.rate_limit import login_limiter, register_limiter
 from ...core.config import settings
 from ...core.dependencies import get_current_active_user
 from ...models.user import User
 from ...schemas.auth import UserCreate, User as UserSchema, Token
+from ..routing import SessionRouter
 
-router = APIRouter()
+router = SessionRouter()
+
+
+def hashing_unavailable_exception(error: PasswordHashingUnavailable) -> HTTPException:
+    """Map a saturated or failed hashing pool to a retryable 503."""
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=f"Authentication service is busy, please retry ({error})",
+        headers={"Retry-After": "1"},
+    )
+
+
+def too_many_attempts_exception(retry_after: int) -> HTTPException:
+    """Rejection for throttled auth attempts."""
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Too many attempts, please try again later",
+        headers={"Retry-After": str(retry_after)},
+    )
+
+
+# Registration messages by unique column of users
+DUPLICATE_USER_DETAILS = {
+    "email": "Email already registered",
+    "username": "Username already taken",
+}
+
+
+def duplicate_user_detail(error: IntegrityError) -> str:
+    """
+    Map a unique-constraint violation on users to the registration message,
+    by the violated constraint: its name on PostgreSQL (the unique index
+    "ix_users_email"), the "users.email" column in SQLite's message. The
+    rest of the message can't be used, it contains the conflicting value.
+    """
+    constraint = getattr(getattr(error.orig, "diag", None), "constraint_name", None)
+    for column, detail in DUPLICATE_USER_DETAILS.items():
+        if constraint is not None:
+            if constraint in (f"ix_users_{column}", f"users_{column}_key"):
+                return detail
+        elif f"users.{column}" in str(error.orig):
+            return detail
+    return "User already exists"
+
+
+def insert_user(db: Session, email: str, username: str, hashed_password: str) -> UserSchema:
+    """Insert a user with one INSERT ... RETURNING and return it serialized."""
+    statement = insert(User).values(
+        email=email,
+        username=username,
+        hashed_password=hashed_password
+    ).returning(User)
+    try:
+        new_user = db.execute(statement).scalar_one()
+        # Serialize before commit so the expired row is not reloaded
+        response = UserSchema.model_validate(new_user)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return response
+
+
+def find_login_user(db: Session, identifier: str) -> Optional[User]:
+    """Find a user by username or email."""
+    return db.query(User).filter(
+        (User.username == identifier) | (User.email == identifier)
+    ).first()
+
+
+def store_password_hash(db: Session, user: User, hashed_password: str) -> None:
+    """Persist an upgraded password hash; failures are rolled back and ignored."""
+    try:
+        user.hashed_password = hashed_password
+        db.commit()
+    except Exception:
+        db.rollback()
+
+
+def client_address(request: Request) -> Optional[str]:
+    """Client IP as seen by the server (honours uvicorn --proxy-headers)."""
+    return request.client.host if request.client else None
 
 
 @router.post("/register", response_model=UserSchema, status_code=status.HTTP_201_CREATED)
-def register(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register(user_data: UserCreate, request: Request, db: Session = Depends(get_request_db)):
     """
     Register a new user.
-    If registration fails after user creation, the user is removed from the database.
+    
+    Uniqueness is enforced by the unique constraints on email and username:
+    the password is hashed once and the row is inserted and returned by a
+    single INSERT ... RETURNING statement. Conflicts map to the same 400
+    messages as before.
     """
-    new_user = None
+    # Throttle before touching the database or the hashing pool
+    retry_after = await register_limiter.hit_async(
+        ip=client_address(request),
+        username=user_data.username,
+        email=user_data.email,
+    )
+    if retry_after:
+        raise too_many_attempts_exception(retry_after)
+
+    # Ensure password is a string before hashing
+    password_str = str(user_data.password)
+    try:
+        hashed_password = await password_hasher.hash(password_str)
+    except PasswordHashingUnavailable as e:
+        raise hashing_unavailable_exception(e)
+    
     try:
-        # Check if user with email already exists
-        existing_user = db.query(User).filter(User.email == user_data.email).first()
-        if existing_user:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Email already registered"
-            )
-        
-        # Check if username already exists
-        existing_user = db.query(User).filter(User.username == user_data.username).first()
-        if existing_user:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Username already taken"
-            )
-        
-        # Create new user
-        # Ensure password is a string before hashing
-        password_str = str(user_data.password)
-        hashed_password = get_password_hash(password_str)
-        
-        new_user = User(
-            email=user_data.email,
-            username=user_data.username,
-            hashed_password=hashed_password
+        response = await run_db(
+            db, insert_user, user_data.email, user_data.username, hashed_password
+        )
+    except IntegrityError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=duplicate_user_detail(e)
         )
-        db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
-        
-        # Verify the password can be verified immediately after creation
-        # This ensures the hash is correct before returning
-        verification_result = verify_password(password_str, hashed_password)
-        if not verification_result:
-            # If password verification fails, remove the user
-            db.delete(new_user)
-            db.commit()
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Error: Password hash verification failed. User not created."
-            )
-        
-        # Return the user - login should work immediately after
-        return new_user
-    except HTTPException:
-        # Re-raise HTTP exceptions (they already have proper status codes)
-        # If user was created, try to remove it
-        if new_user and hasattr(new_user, 'id') and new_user.id:
-            try:
-                db.delete(new_user)
-                db.commit()
-            except Exception:
-                db.rollback()
-        raise
     except Exception as e:
-        # Rollback any pending transaction
-        db.rollback()
-        
-        # If user was created, try to remove it
-        if new_user and hasattr(new_user, 'id') and new_user.id:
-            try:
-                # Refresh to ensure we have the latest state
-                db.refresh(new_user)
-                db.delete(new_user)
-                db.commit()
-            except Exception as delete_error:
-                db.rollback()
-                # Log the error but don't fail the request
-                print(f"Warning: Could not delete user after failed registration: {delete_error}")
-        
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error creating user: {str(e)}"
         )
+    
+    # Return the user - login should work immediately after
+    return response
 
 
 @router.post("/login", response_model=Token)
-def login(
+async def login(
+    request: Request,
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_request_db)
 ):
     """
     Login endpoint. Returns JWT access token.
@@ -112,10 +161,13 @@ def login(
     Note: OAuth2PasswordRequestForm expects 'username' field,
     but we accept both username and email for login.
     """
+    # Throttle before touching the database or the hashing pool
+    retry_after = await login_limiter.hit_async(ip=client_address(request), username=form_data.username)
+    if retry_after:
+        raise too_many_attempts_exception(retry_after)
+    
     # Try to find user by username or email
-    user = db.query(User).filter(
-        (User.username == form_data.username) | (User.email == form_data.username)
-    ).first()
+    user = await run_db(db, find_login_user, form_data.username)
     
     if not user:
         raise HTTPException(
@@ -124,8 +176,13 @@ def login(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # Verify password
-    password_valid = verify_password(form_data.password, user.hashed_password)
+    # Verify password (off the request worker, in the hashing pool)
+    try:
+        password_valid, upgraded_hash = await password_hasher.verify_and_update(
+            form_data.password, user.hashed_password
+        )
+    except PasswordHashingUnavailable as e:
+        raise hashing_unavailable_exception(e)
     if not password_valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -147,6 +204,11 @@ def login(
         expires_delta=access_token_expires
     )
     
+    # Transparently upgrade legacy or low-cost hashes; a failure here
+    # must not block the login
+    if upgraded_hash:
+        await run_db(db, store_password_hash, user, upgraded_hash)
+    
     return {"access_token": access_token, "token_type": "bearer"}
 
 
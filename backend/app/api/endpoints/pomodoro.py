@@ -2,18 +2,35 @@
 API endpoints for pomodoro session management.
 """
 
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Dict, List, Optional
+from fastapi import Depends, HTTPException, Query, Response, status
+from sqlalchemy import and_, delete, insert, literal, select, update
 from sqlalchemy.orm import Session
 from datetime import datetime
 
 from ...core.database import get_db
 from ...core.dependencies import get_current_active_user
+from ...core.pagination import NEXT_CURSOR_HEADER, InvalidCursor, SortKey, paginate
+from ...core.partitions import session_conflict_columns
+from ...core.sql import minutes_between, upsert_insert
+from ...core.user_stats import SESSION_STATS_COLUMNS, add_user_stats, completion_changes, session_changes
 from ...models.task import PomodoroSession, Task
 from ...models.user import User
-from ...schemas.task import PomodoroSessionCreate, PomodoroSessionUpdate, PomodoroSession as PomodoroSessionSchema
+from ...schemas.task import (
+    PomodoroSessionCreate,
+    PomodoroSessionUpdate,
+    PomodoroSession as PomodoroSessionSchema,
+    PomodoroSessionIngest,
+    PomodoroSessionIngestRequest,
+    PomodoroSessionIngestResult,
+    PomodoroSessionIngestResponse,
+)
+from ..routing import SessionRouter
 
-router = APIRouter()
+router = SessionRouter()
+
+# Sessions are listed in creation order ((user_id, created_at) index)
+SESSION_SORT_KEY = SortKey("created_at", PomodoroSession.created_at)
 
 @router.post("/", response_model=PomodoroSessionSchema, status_code=status.HTTP_201_CREATED)
 def create_pomodoro_session(
@@ -24,32 +41,144 @@ def create_pomodoro_session(
     """
     Create a new pomodoro session for a task.
     """
-    # Verify task exists and belongs to user
-    task = db.query(Task).filter(Task.id == session.task_id, Task.user_id == current_user.id).first()
-    if task is None:
+    # INSERT ... SELECT from the task, so a task the user doesn't own inserts nothing
+    table = PomodoroSession.__table__
+    owned_task = select(
+        Task.id,
+        Task.user_id,
+        literal(session.duration_minutes, table.c.duration_minutes.type),
+        literal(session.session_type, table.c.session_type.type),
+    ).where(Task.id == session.task_id, Task.user_id == current_user.id)
+    statement = insert(table).from_select(
+        ["task_id", "user_id", "duration_minutes", "session_type"], owned_task
+    ).returning(*table.c)
+    row = db.execute(statement).first()
+    if row is None:
         raise HTTPException(status_code=404, detail="Task not found")
+    add_user_stats(db, current_user.id, session_changes([row]))
+    db.commit()
+    return PomodoroSessionSchema.model_validate(row)
+
+def _session_ids_by_client_id(db: Session, user_id: int, client_ids: List[str]) -> Dict[str, int]:
+    table = PomodoroSession.__table__
+    rows = db.execute(
+        select(table.c.client_id, table.c.id).where(table.c.user_id == user_id, table.c.client_id.in_(client_ids))
+    )
+    return dict(rows.all())
+
+def insert_sessions(db: Session, user_id: int, items: List[PomodoroSessionIngest]) -> Dict[str, int]:
+    """
+    Insert offline sessions with one multi-row INSERT ... RETURNING.
+    
+    Sessions whose client_id the user already has are skipped, including
+    ones inserted concurrently by another request where the dialect
+    supports ON CONFLICT. Returns the new session ids by client_id.
+    """
+    if not items:
+        return {}
+    table = PomodoroSession.__table__
+    dialect = db.get_bind().dialect.name
+    upsert = upsert_insert(dialect)
+    statement = upsert(table).on_conflict_do_nothing(
+        index_elements=session_conflict_columns(dialect)
+    ) if upsert is not None else insert(table)
+    rows = [
+        {
+            **item.model_dump(),
+            "user_id": user_id,
+            # Offline sessions belong to the day they happened, not the upload
+            "created_at": item.started_at,
+            "actual_duration_minutes": item.actual_duration_minutes
+            or int((item.completed_at - item.started_at).total_seconds() / 60),
+        }
+        for item in items
+    ]
+    statement = statement.returning(table.c.client_id, table.c.id, *(table.c[name] for name in SESSION_STATS_COLUMNS))
+    inserted = db.execute(statement, rows).all()
+    add_user_stats(db, user_id, session_changes(inserted))
+    return {row.client_id: row.id for row in inserted}
+
+@router.post("/batch", response_model=PomodoroSessionIngestResponse)
+def ingest_pomodoro_sessions(
+    batch: PomodoroSessionIngestRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Store finished sessions recorded while offline.
+    
+    Each session carries a client-generated client_id; sessions already
+    uploaded (or repeated within the batch) are reported as duplicate with
+    the id of the stored session, so uploads can be retried safely.
+    Ownership of all tasks is checked with one query and the new sessions
+    are inserted with one statement.
+    """
+    sessions = batch.sessions
+    task_ids = {item.task_id for item in sessions}
+    owned_task_ids = set(db.scalars(
+        select(Task.id).where(Task.user_id == current_user.id, Task.id.in_(task_ids))
+    )) if task_ids else set()
+    existing = _session_ids_by_client_id(db, current_user.id, list({item.client_id for item in sessions}))
 
-    db_session = PomodoroSession(**session.model_dump())
-    db.add(db_session)
+    new_items = {}
+    for item in sessions:
+        if item.task_id in owned_task_ids and item.client_id not in existing:
+            new_items.setdefault(item.client_id, item)
+    created = insert_sessions(db, current_user.id, list(new_items.values()))
+    conflicts = [client_id for client_id in new_items if client_id not in created]
+    if conflicts:
+        # Inserted by a concurrent upload since we looked
+        existing.update(_session_ids_by_client_id(db, current_user.id, conflicts))
     db.commit()
-    db.refresh(db_session)
-    return db_session
+
+    results = []
+    reported = set()
+    for index, item in enumerate(sessions):
+        if item.task_id not in owned_task_ids:
+            result = PomodoroSessionIngestResult(index=index, client_id=item.client_id, status="task_not_found")
+        elif item.client_id in created and item.client_id not in reported:
+            reported.add(item.client_id)
+            result = PomodoroSessionIngestResult(
+                index=index, client_id=item.client_id, id=created[item.client_id], status="created"
+            )
+        else:
+            result = PomodoroSessionIngestResult(
+                index=index,
+                client_id=item.client_id,
+                id=created.get(item.client_id, existing.get(item.client_id)),
+                status="duplicate",
+            )
+        results.append(result)
+    return PomodoroSessionIngestResponse(results=results)
 
 @router.get("/", response_model=List[PomodoroSessionSchema])
 def read_pomodoro_sessions(
-    skip: int = 0,
-    limit: int = 100,
+    response: Response,
+    skip: Optional[int] = Query(None, ge=0, deprecated=True, description="Offset pagination; use cursor instead"),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    order: Optional[str] = Query(None, pattern="^(asc|desc)$"),
     task_id: int = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """
-    Get all pomodoro sessions for the current user with optional task filtering.
+    Get pomodoro sessions for the current user with optional task filtering,
+    oldest first unless `order` is desc. When there are more sessions, the
+    X-Next-Cursor response header holds the `cursor` for the next page.
     """
-    query = db.query(PomodoroSession).join(Task).filter(Task.user_id == current_user.id)
+    if cursor is not None and skip is not None:
+        raise HTTPException(status_code=400, detail="Use either cursor or skip, not both")
+
+    query = db.query(PomodoroSession).filter(PomodoroSession.user_id == current_user.id)
     if task_id:
         query = query.filter(PomodoroSession.task_id == task_id)
-    sessions = query.offset(skip).limit(limit).all()
+    try:
+        sessions, next_cursor = paginate(query, SESSION_SORT_KEY, PomodoroSession.id, limit, order, cursor, skip)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     return sessions
 
 @router.get("/{session_id}", response_model=PomodoroSessionSchema)
@@ -61,9 +190,9 @@ def read_pomodoro_session(
     """
     Get a specific pomodoro session by ID.
     """
-    session = db.query(PomodoroSession).join(Task).filter(
+    session = db.query(PomodoroSession).filter(
         PomodoroSession.id == session_id,
-        Task.user_id == current_user.id
+        PomodoroSession.user_id == current_user.id
     ).first()
     if session is None:
         raise HTTPException(status_code=404, detail="Pomodoro session not found")
@@ -79,21 +208,48 @@ def update_pomodoro_session(
     """
     Update a pomodoro session (start, complete, etc.).
     """
-    session = db.query(PomodoroSession).join(Task).filter(
-        PomodoroSession.id == session_id,
-        Task.user_id == current_user.id
-    ).first()
-    if session is None:
-        raise HTTPException(status_code=404, detail="Pomodoro session not found")
-
-    # Update fields
+    table = PomodoroSession.__table__
+    owned = and_(table.c.id == session_id, table.c.user_id == current_user.id)
     update_data = session_update.model_dump(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(session, field, value)
-
+    previous = None
+    if update_data.keys() & {"completed_at", "actual_duration_minutes"}:
+        # The counters and rollups need the completion being replaced
+        previous = db.execute(
+            select(*(table.c[name] for name in SESSION_STATS_COLUMNS)).where(owned).with_for_update()
+        ).first()
+    if update_data:
+        statement = update(table).where(owned).values(update_data).returning(*table.c)
+    else:
+        statement = select(table).where(owned)
+    row = db.execute(statement).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Pomodoro session not found")
+    if previous is not None:
+        change = completion_changes(row)
+        change.update(completion_changes(previous, sign=-1))
+        add_user_stats(db, current_user.id, change)
     db.commit()
-    db.refresh(session)
-    return session
+    return PomodoroSessionSchema.model_validate(row)
+
+def _transition_failed(db: Session, session_id: int, user_id: int, errors) -> HTTPException:
+    """
+    Error for a conditional UPDATE that matched no row.
+    
+    Looks the session up again (only on this failure path) and returns the
+    400 of the first (condition, detail) in `errors` that the row meets,
+    or a 404 if the user has no such session.
+    """
+    table = PomodoroSession.__table__
+    row = db.execute(
+        select(table.c.started_at, table.c.completed_at).where(table.c.id == session_id, table.c.user_id == user_id)
+    ).first()
+    if row is None:
+        return HTTPException(status_code=404, detail="Pomodoro session not found")
+    for condition, detail in errors:
+        if condition(row):
+            return HTTPException(status_code=400, detail=detail)
+    # Changed again since the UPDATE; report it like a lost race
+    return HTTPException(status_code=409, detail="Session changed concurrently")
 
 @router.post("/{session_id}/start", response_model=PomodoroSessionSchema)
 def start_pomodoro_session(
@@ -103,21 +259,24 @@ def start_pomodoro_session(
 ):
     """
     Start a pomodoro session.
+    
+    A single `UPDATE ... WHERE started_at IS NULL`, so of two concurrent
+    starts exactly one wins and the other gets a 400.
     """
-    session = db.query(PomodoroSession).join(Task).filter(
-        PomodoroSession.id == session_id,
-        Task.user_id == current_user.id
-    ).first()
-    if session is None:
-        raise HTTPException(status_code=404, detail="Pomodoro session not found")
-
-    if session.started_at is not None:
-        raise HTTPException(status_code=400, detail="Session already started")
-
-    session.started_at = datetime.utcnow()
+    table = PomodoroSession.__table__
+    statement = (
+        update(table)
+        .where(table.c.id == session_id, table.c.user_id == current_user.id, table.c.started_at.is_(None))
+        .values(started_at=datetime.utcnow())
+        .returning(*table.c)
+    )
+    row = db.execute(statement).first()
+    if row is None:
+        raise _transition_failed(db, session_id, current_user.id, [
+            (lambda session: session.started_at is not None, "Session already started"),
+        ])
     db.commit()
-    db.refresh(session)
-    return session
+    return PomodoroSessionSchema.model_validate(row)
 
 @router.post("/{session_id}/complete", response_model=PomodoroSessionSchema)
 def complete_pomodoro_session(
@@ -127,29 +286,32 @@ def complete_pomodoro_session(
 ):
     """
     Complete a pomodoro session.
+    
+    A single conditional UPDATE that also computes actual_duration_minutes
+    from started_at in SQL, then the upsert of the user's counters.
     """
-    session = db.query(PomodoroSession).join(Task).filter(
-        PomodoroSession.id == session_id,
-        Task.user_id == current_user.id
-    ).first()
-    if session is None:
-        raise HTTPException(status_code=404, detail="Pomodoro session not found")
-
-    if session.started_at is None:
-        raise HTTPException(status_code=400, detail="Session not started")
-
-    if session.completed_at is not None:
-        raise HTTPException(status_code=400, detail="Session already completed")
-
-    session.completed_at = datetime.utcnow()
-    if session.started_at:
-        # Calculate actual duration in minutes
-        duration = (session.completed_at - session.started_at).total_seconds() / 60
-        session.actual_duration_minutes = int(duration)
-
+    table = PomodoroSession.__table__
+    now = literal(datetime.utcnow(), table.c.completed_at.type)
+    statement = (
+        update(table)
+        .where(
+            table.c.id == session_id,
+            table.c.user_id == current_user.id,
+            table.c.started_at.isnot(None),
+            table.c.completed_at.is_(None),
+        )
+        .values(completed_at=now, actual_duration_minutes=minutes_between(table.c.started_at, now))
+        .returning(*table.c)
+    )
+    row = db.execute(statement).first()
+    if row is None:
+        raise _transition_failed(db, session_id, current_user.id, [
+            (lambda session: session.started_at is None, "Session not started"),
+            (lambda session: session.completed_at is not None, "Session already completed"),
+        ])
+    add_user_stats(db, current_user.id, completion_changes(row))
     db.commit()
-    db.refresh(session)
-    return session
+    return PomodoroSessionSchema.model_validate(row)
 
 @router.delete("/{session_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_pomodoro_session(
@@ -160,13 +322,13 @@ def delete_pomodoro_session(
     """
     Delete a pomodoro session.
     """
-    session = db.query(PomodoroSession).join(Task).filter(
-        PomodoroSession.id == session_id,
-        Task.user_id == current_user.id
-    ).first()
-    if session is None:
+    table = PomodoroSession.__table__
+    statement = delete(table).where(
+        table.c.id == session_id, table.c.user_id == current_user.id
+    ).returning(*(table.c[name] for name in SESSION_STATS_COLUMNS))
+    row = db.execute(statement).first()
+    if row is None:
         raise HTTPException(status_code=404, detail="Pomodoro session not found")
-
-    db.delete(session)
+    add_user_stats(db, current_user.id, session_changes([row], sign=-1))
     db.commit()
     return {"detail": "Pomodoro session deleted successfully"}
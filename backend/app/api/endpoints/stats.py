@@ -1,103 +1,141 @@
 """
 API endpoints for statistics and dashboard data.
+
+The dashboard's all-time figures come from the user's counters row
+(user_stats, see app.core.user_stats); only today's figures are
+aggregated, over today's sessions. The summaries read every table they
+need once: one conditional-aggregate query (COUNT/SUM over CASE
+expressions, which SQLite and PostgreSQL both support) computes all of a
+table's figures in a single pass over the user's rows.
+
+/stats/timeseries reads only the user's hourly rollups
+(user_stats_hourly): one row per active UTC hour of the range, grouped
+into the buckets by local day in Python, so any time zone works from the
+same rows. /stats/heatmap and /stats/streaks read the user's single
+user_activity row, the completed work sessions of every day packed into
+arrays (see app.core.activity).
+
+Responses are cached per user until the user's next write and carry an
+ETag; a request whose If-None-Match still matches gets a 304 (see
+app.core.stats_cache).
 """
 
-from fastapi import APIRouter, Depends
+from collections import Counter
+from typing import Dict, Optional
+from fastapi import Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from datetime import datetime, timedelta
+from sqlalchemy import and_, func
+from datetime import date, datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
 from ...core.database import get_db
 from ...core.dependencies import get_current_active_user
-from ...models.task import Task, TaskStatus, PomodoroSession
+from ...core.sql import count_if, sum_if
+from ...core.stats_cache import cached_stats_response
+from ...core.activity import streaks
+from ...core.user_stats import HOURLY_STATS, read_activity, read_user_stats
+from ...models.task import Task, PomodoroSession, PomodoroSessionArchive, UserStatsHourly
 from ...models.user import User
-from ...schemas.task import DashboardStats, TaskStats, PomodoroStats
+from ...schemas.task import (
+    DashboardStats, TaskStats, PomodoroStats, TimeSeries, TimeSeriesBucket, TimeSeriesPoint, Heatmap, StreakStats,
+)
+from ..routing import SessionRouter
 
-router = APIRouter()
+router = SessionRouter()
 
-@router.get("/dashboard", response_model=DashboardStats)
-def get_dashboard_stats(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
-):
+# Per-session-type figures, as returned by session_totals_by_type
+SESSION_TOTALS = (
+    "sessions",
+    "completed_sessions",
+    "completed_minutes",  # sum of actual_duration_minutes over completed sessions
+    "timed_sessions",  # completed sessions with an actual_duration_minutes
+)
+
+# Longest /stats/timeseries range, in days
+MAX_TIMESERIES_DAYS = 731
+# Longest /stats/heatmap, in days (53 weeks)
+MAX_HEATMAP_DAYS = 371
+
+def session_totals_by_type(db: Session, user_id: int) -> Dict[str, Dict[str, int]]:
     """
-    Get comprehensive dashboard statistics for the current user.
+    SESSION_TOTALS per session type over live and archived sessions,
+    with one grouped query per table.
     """
+    completed = PomodoroSession.completed_at.isnot(None)
+    live = db.query(
+        PomodoroSession.session_type,
+        func.count(PomodoroSession.id),
+        count_if(completed),
+        sum_if(completed, PomodoroSession.actual_duration_minutes),
+        count_if(and_(completed, PomodoroSession.actual_duration_minutes.isnot(None))),
+    ).filter(
+        PomodoroSession.user_id == user_id
+    ).group_by(PomodoroSession.session_type).all()
+
+    archive = PomodoroSessionArchive
+    archived = db.query(
+        archive.session_type,
+        func.sum(archive.sessions),
+        func.sum(archive.completed_sessions),
+        func.sum(archive.completed_minutes),
+        func.sum(archive.timed_sessions),
+    ).filter(archive.user_id == user_id).group_by(archive.session_type).all()
+
+    totals = {}
+    for session_type, *values in live + archived:
+        row = totals.setdefault(session_type, dict.fromkeys(SESSION_TOTALS, 0))
+        for name, value in zip(SESSION_TOTALS, values):
+            row[name] += value or 0
+    return totals
+
+def _sum_totals(totals: Dict[str, Dict[str, int]], name: str) -> int:
+    return sum(row[name] for row in totals.values())
+
+def sessions_today(db: Session, user_id: int, today: date):
+    """Sessions created today and their completed work minutes (a range of the (user_id, created_at) index)."""
+    work_done = and_(PomodoroSession.completed_at.isnot(None), PomodoroSession.session_type == "work")
+    return db.query(
+        func.count(PomodoroSession.id).label("sessions"),
+        sum_if(work_done, PomodoroSession.actual_duration_minutes).label("work_minutes"),
+    ).filter(
+        PomodoroSession.user_id == user_id,
+        PomodoroSession.created_at >= today,
+        PomodoroSession.created_at < today + timedelta(days=1),
+    ).one()
+
+def dashboard_stats(db: Session, user_id: int, today: date) -> DashboardStats:
+    """
+    Dashboard statistics from the user's counters row plus today's
+    sessions, whatever the size of the user's history.
+    """
+    counts = read_user_stats(db, user_id)
+
     # Task statistics (filtered by user)
-    total_tasks = db.query(func.count(Task.id)).filter(Task.user_id == current_user.id).scalar()
-    completed_tasks = db.query(func.count(Task.id)).filter(
-        Task.user_id == current_user.id,
-        Task.status == TaskStatus.DONE
-    ).scalar()
-    in_progress_tasks = db.query(func.count(Task.id)).filter(
-        Task.user_id == current_user.id,
-        Task.status == TaskStatus.IN_PROGRESS
-    ).scalar()
-    todo_tasks = db.query(func.count(Task.id)).filter(
-        Task.user_id == current_user.id,
-        Task.status == TaskStatus.TODO
-    ).scalar()
-
-    completion_rate = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
+    completion_rate = (counts["done_tasks"] / counts["tasks"] * 100) if counts["tasks"] > 0 else 0
 
     task_stats = TaskStats(
-        total_tasks=total_tasks,
-        completed_tasks=completed_tasks,
-        in_progress_tasks=in_progress_tasks,
-        todo_tasks=todo_tasks,
+        total_tasks=counts["tasks"],
+        completed_tasks=counts["done_tasks"],
+        in_progress_tasks=counts["in_progress_tasks"],
+        todo_tasks=counts["todo_tasks"],
         completion_rate=round(completion_rate, 2)
     )
 
-    # Pomodoro statistics (filtered by user's tasks)
-    total_sessions = db.query(func.count(PomodoroSession.id)).join(Task).filter(
-        Task.user_id == current_user.id
-    ).scalar()
-    completed_sessions = db.query(func.count(PomodoroSession.id)).join(Task).filter(
-        Task.user_id == current_user.id,
-        PomodoroSession.completed_at.isnot(None)
-    ).scalar()
-
-    # Total work minutes (only completed work sessions)
-    total_work_minutes_result = db.query(func.sum(PomodoroSession.actual_duration_minutes)).join(Task).filter(
-        Task.user_id == current_user.id,
-        PomodoroSession.session_type == "work",
-        PomodoroSession.completed_at.isnot(None)
-    ).scalar()
-    total_work_minutes = total_work_minutes_result or 0
-
-    # Average session duration
-    avg_duration_result = db.query(func.avg(PomodoroSession.actual_duration_minutes)).join(Task).filter(
-        Task.user_id == current_user.id,
-        PomodoroSession.completed_at.isnot(None)
-    ).scalar()
-    average_session_duration = avg_duration_result or 0
-
-    # Today's statistics
-    today = datetime.utcnow().date()
-    tomorrow = today + timedelta(days=1)
+    # Pomodoro statistics, live plus archived sessions
+    today_totals = sessions_today(db, user_id, today)
 
-    sessions_today = db.query(func.count(PomodoroSession.id)).join(Task).filter(
-        Task.user_id == current_user.id,
-        PomodoroSession.created_at >= today,
-        PomodoroSession.created_at < tomorrow
-    ).scalar()
-
-    work_minutes_today_result = db.query(func.sum(PomodoroSession.actual_duration_minutes)).join(Task).filter(
-        Task.user_id == current_user.id,
-        PomodoroSession.session_type == "work",
-        PomodoroSession.completed_at.isnot(None),
-        PomodoroSession.created_at >= today,
-        PomodoroSession.created_at < tomorrow
-    ).scalar()
-    work_minutes_today = work_minutes_today_result or 0
+    # Average over completed sessions with a duration (like AVG, which skips NULLs)
+    timed_sessions = counts["timed_sessions"]
+    average_session_duration = counts["completed_minutes"] / timed_sessions if timed_sessions else 0
 
     pomodoro_stats = PomodoroStats(
-        total_sessions=total_sessions,
-        completed_sessions=completed_sessions,
-        total_work_minutes=total_work_minutes,
+        total_sessions=counts["sessions"],
+        completed_sessions=counts["completed_sessions"],
+        # Only completed work sessions count as work time
+        total_work_minutes=counts["work_minutes"],
         average_session_duration=round(average_session_duration, 2),
-        sessions_today=sessions_today,
-        work_minutes_today=work_minutes_today
+        sessions_today=today_totals.sessions,
+        work_minutes_today=today_totals.work_minutes
     )
 
     return DashboardStats(
@@ -105,42 +143,183 @@ def get_dashboard_stats(
         pomodoro_stats=pomodoro_stats
     )
 
+def task_summary(db: Session, user_id: int) -> Dict[str, int]:
+    """Task counts by status."""
+    stats = db.query(Task.status, func.count(Task.id)).filter(
+        Task.user_id == user_id
+    ).group_by(Task.status).all()
+    return {status.value: count for status, count in stats}
+
+def pomodoro_summary(db: Session, user_id: int) -> Dict:
+    """Sessions by type and the completion rate, live plus archived sessions."""
+    totals = session_totals_by_type(db, user_id)
+    total_sessions = _sum_totals(totals, "sessions")
+    completed_sessions = _sum_totals(totals, "completed_sessions")
+
+    return {
+        "sessions_by_type": {session_type: row["sessions"] for session_type, row in totals.items()},
+        "completion_rate": round((completed_sessions / total_sessions * 100), 2) if total_sessions > 0 else 0
+    }
+
+def bucket_start(day: date, bucket: TimeSeriesBucket) -> date:
+    """First day of the bucket containing `day`."""
+    if bucket == TimeSeriesBucket.WEEK:
+        return day - timedelta(days=day.weekday())
+    if bucket == TimeSeriesBucket.MONTH:
+        return day.replace(day=1)
+    return day
+
+def local_midnight(day: date, zone: ZoneInfo) -> datetime:
+    """The start of the local day `day` as a naive UTC datetime, like the stored hours."""
+    return datetime.combine(day, time.min, tzinfo=zone).astimezone(timezone.utc).replace(tzinfo=None)
+
+def timeseries(
+    db: Session, user_id: int, start: date, end: date, bucket: TimeSeriesBucket, zone: ZoneInfo
+) -> TimeSeries:
+    """
+    The user's activity per bucket over the local days start..end, from
+    the hourly rollups of that range (with every bucket, empty ones too).
+
+    Each UTC hour counts in the local day it starts in, which is exact for
+    whole-hour offsets; archived sessions are rolled up at 00:00 UTC of
+    their day, so behind UTC they count on the previous local day. The
+    first week or month bucket starts before `start` when the range does,
+    but only counts days of the range.
+    """
+    points = {}
+    day = start
+    while day <= end:
+        points.setdefault(bucket_start(day, bucket), Counter())
+        day += timedelta(days=1)
+
+    hourly = UserStatsHourly
+    rows = db.query(hourly.hour, *(getattr(hourly, name) for name in HOURLY_STATS)).filter(
+        hourly.user_id == user_id,
+        hourly.hour >= local_midnight(start, zone),
+        hourly.hour < local_midnight(end + timedelta(days=1), zone),
+    ).all()
+    for hour, *values in rows:
+        local_day = hour.replace(tzinfo=timezone.utc).astimezone(zone).date()
+        points[bucket_start(local_day, bucket)].update(dict(zip(HOURLY_STATS, values)))
+
+    return TimeSeries(
+        bucket=bucket,
+        timezone=zone.key,
+        start=start,
+        end=end,
+        points=[TimeSeriesPoint(start=point, **counts) for point, counts in sorted(points.items())],
+    )
+
+def heatmap(db: Session, user_id: int, days: int, today: date) -> Heatmap:
+    """The user's last `days` UTC days of focus, today included."""
+    start = today - timedelta(days=days - 1)
+    return Heatmap(start=start, end=today, **read_activity(db, user_id).window(start, today))
+
+def streak_stats(db: Session, user_id: int, today: date) -> StreakStats:
+    """The user's current and longest streaks."""
+    return StreakStats(**streaks(read_activity(db, user_id), today))
+
+@router.get("/dashboard", response_model=DashboardStats)
+def get_dashboard_stats(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Get comprehensive dashboard statistics for the current user.
+    """
+    # Today's figures change at midnight without any write
+    today = datetime.utcnow().date()
+    return cached_stats_response(
+        request, current_user.id, ("dashboard", today), lambda: dashboard_stats(db, current_user.id, today)
+    )
+
 @router.get("/tasks/summary")
 def get_task_summary(
+    request: Request,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """
     Get a summary of tasks by status for the current user.
     """
-    stats = db.query(Task.status, func.count(Task.id)).filter(
-        Task.user_id == current_user.id
-    ).group_by(Task.status).all()
-    return {status.value: count for status, count in stats}
+    return cached_stats_response(request, current_user.id, "tasks", lambda: task_summary(db, current_user.id))
 
 @router.get("/pomodoro/summary")
 def get_pomodoro_summary(
+    request: Request,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """
     Get a summary of pomodoro sessions for the current user.
     """
-    # Sessions by type
-    type_stats = db.query(PomodoroSession.session_type, func.count(PomodoroSession.id)).join(Task).filter(
-        Task.user_id == current_user.id
-    ).group_by(PomodoroSession.session_type).all()
+    return cached_stats_response(request, current_user.id, "pomodoro", lambda: pomodoro_summary(db, current_user.id))
+
+@router.get("/timeseries", response_model=TimeSeries)
+def get_timeseries(
+    request: Request,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    bucket: TimeSeriesBucket = TimeSeriesBucket.DAY,
+    tz: str = "UTC",
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Get the current user's activity per day, week or month between two
+    local dates of time zone `tz` (an IANA name). The range defaults to
+    the last 30 days, today included.
 
-    # Completion rate
-    total_sessions = db.query(func.count(PomodoroSession.id)).join(Task).filter(
-        Task.user_id == current_user.id
-    ).scalar()
-    completed_sessions = db.query(func.count(PomodoroSession.id)).join(Task).filter(
-        Task.user_id == current_user.id,
-        PomodoroSession.completed_at.isnot(None)
-    ).scalar()
+    Archived sessions (older than the archive horizon) only keep their UTC
+    day and count at its 00:00 UTC, so in time zones behind UTC they show
+    on the previous local day.
+    """
+    try:
+        zone = ZoneInfo(tz)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise HTTPException(status_code=400, detail=f"Unknown time zone: {tz}")
+    end = end or datetime.now(zone).date()
+    start = start or end - timedelta(days=29)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    if (end - start).days >= MAX_TIMESERIES_DAYS:
+        raise HTTPException(status_code=400, detail=f"The range can't exceed {MAX_TIMESERIES_DAYS} days")
+    return cached_stats_response(
+        request,
+        current_user.id,
+        ("timeseries", bucket.value, zone.key, start, end),
+        lambda: timeseries(db, current_user.id, start, end, bucket, zone),
+    )
 
-    return {
-        "sessions_by_type": {session_type: count for session_type, count in type_stats},
-        "completion_rate": round((completed_sessions / total_sessions * 100), 2) if total_sessions > 0 else 0
-    }
+@router.get("/heatmap", response_model=Heatmap)
+def get_heatmap(
+    request: Request,
+    days: int = Query(365, ge=1, le=MAX_HEATMAP_DAYS),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Get the current user's completed work sessions and minutes for each
+    of the last `days` UTC days, oldest first.
+    """
+    today = datetime.utcnow().date()
+    return cached_stats_response(
+        request, current_user.id, ("heatmap", today, days), lambda: heatmap(db, current_user.id, days, today)
+    )
+
+@router.get("/streaks", response_model=StreakStats)
+def get_streaks(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Get the current user's current and longest streaks of UTC days with a
+    completed work session. The current streak lasts through today while
+    yesterday had one.
+    """
+    today = datetime.utcnow().date()
+    return cached_stats_response(
+        request, current_user.id, ("streaks", today), lambda: streak_stats(db, current_user.id, today)
+    )
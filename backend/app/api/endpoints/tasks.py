@@ -2,18 +2,58 @@
 API endpoints for task management.
 """
 
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from typing import Dict, List, Optional, Set
+from fastapi import Depends, HTTPException, Query, Response, status
+from sqlalchemy import and_, case, delete, insert, literal, or_, select, update
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session, noload, selectinload
 from datetime import datetime
 
 from ...core.database import get_db
 from ...core.dependencies import get_current_active_user
-from ...models.task import Task, TaskStatus
+from ...core.pagination import NEXT_CURSOR_HEADER, InvalidCursor, SortKey, paginate
+from ...core.user_stats import (
+    SESSION_STATS_COLUMNS, TASK_STATS_COLUMNS, add_user_stats, archive_changes, session_changes, task_changes,
+)
+from ...models.task import PomodoroSession, PomodoroSessionArchive, Task, TaskStatus, PRIORITY_RANKS, task_priority_rank
 from ...models.user import User
-from ...schemas.task import TaskCreate, TaskUpdate, Task as TaskSchema
+from ...schemas.task import (
+    TaskCreate,
+    TaskUpdate,
+    Task as TaskSchema,
+    TaskBatchRequest,
+    TaskBatchUpdate,
+    TaskBatchItemResult,
+    TaskBatchResponse,
+    TaskSummary,
+)
+from ..routing import SessionRouter
 
-router = APIRouter()
+router = SessionRouter()
+
+# Sort orders for task listings, each backed by a (user_id, key, id) index
+TASK_SORT_KEYS = {
+    "created_at": SortKey("created_at", Task.created_at),
+    "due_date": SortKey("due_date", Task.due_date, nullable=True),
+    "priority": SortKey(
+        "priority",
+        task_priority_rank,
+        value=lambda task: PRIORITY_RANKS.get(task.priority, 1),
+        default_order="desc",
+    ),
+}
+
+def task_response(db: Session, row: Row, sessions: bool = True) -> TaskSchema:
+    """
+    Build the response for a task row from RETURNING.
+    
+    Rows are plain values, so unlike ORM objects they stay readable after
+    the commit expires the session; sessions are fetched as rows too.
+    """
+    task_sessions = db.execute(
+        select(PomodoroSession.__table__).where(PomodoroSession.__table__.c.task_id == row.id)
+    ).all() if sessions else []
+    return TaskSchema.model_validate({**row._mapping, "pomodoro_sessions": [dict(s._mapping) for s in task_sessions]})
 
 @router.post("/", response_model=TaskSchema, status_code=status.HTTP_201_CREATED)
 def create_task(
@@ -24,27 +64,170 @@ def create_task(
     """
     Create a new task.
     """
-    db_task = Task(**task.model_dump(), user_id=current_user.id)
-    db.add(db_task)
+    (row,) = insert_tasks(db, current_user.id, [task])
     db.commit()
-    db.refresh(db_task)
-    return db_task
+    return task_response(db, row, sessions=False)
+
+def insert_tasks(db: Session, user_id: int, items: List[TaskCreate]) -> List[Row]:
+    """Insert tasks with one multi-row INSERT ... RETURNING, rows in input order."""
+    if not items:
+        return []
+    table = Task.__table__
+    statement = insert(table).returning(*table.c)
+    rows = db.execute(statement, [{**item.model_dump(), "user_id": user_id} for item in items]).all()
+    add_user_stats(db, user_id, task_changes(rows))
+    # RETURNING order isn't guaranteed, but ids are handed out in VALUES
+    # order. (sort_by_parameter_order would make SQLite insert row by row.)
+    return sorted(rows, key=lambda row: row.id)
+
+def update_tasks(db: Session, user_id: int, items: List[TaskBatchUpdate]) -> Dict[int, Row]:
+    """
+    Apply partial updates to the user's tasks with a single UPDATE.
+    
+    Each column set by any item gets `CASE id WHEN ... END`, falling back to
+    its current value (a single item just sets the values). completed_at
+    is stamped only for tasks moving into DONE; tasks already done keep
+    theirs. Returns the updated rows by id (ids the user doesn't own are
+    missing).
+    
+    Status changes also need the previous statuses (and completion times)
+    for the counters and rollups; they are read (and locked) first, only
+    when some item sets a status.
+    """
+    if not items:
+        return {}
+    table = Task.__table__
+    owned = and_(table.c.user_id == user_id, table.c.id.in_([item.id for item in items]))
+    now = datetime.utcnow()
+    values = {"updated_at": now}
+    fields = sorted({field for item in items for field in item.model_fields_set} - {"id"})
+    for field in fields:
+        column = table.c[field]
+        if len(items) == 1:
+            values[field] = getattr(items[0], field)
+            continue
+        values[field] = case(
+            {item.id: literal(getattr(item, field), column.type) for item in items if field in item.model_fields_set},
+            value=table.c.id,
+            else_=column,
+        )
+    previous = db.execute(
+        select(*(table.c[name] for name in TASK_STATS_COLUMNS)).where(owned).with_for_update()
+    ).all() if "status" in fields else []
+    done_ids = [item.id for item in items if item.status == TaskStatus.DONE]
+    if done_ids:
+        # SET expressions see the row before the update: stamp only tasks becoming done
+        values["completed_at"] = case(
+            (and_(table.c.id.in_(done_ids), or_(table.c.status.is_(None), table.c.status != TaskStatus.DONE)), now),
+            else_=table.c.completed_at,
+        )
+    statement = update(table).where(owned).values(values).returning(*table.c)
+    rows = {row.id: row for row in db.execute(statement)}
+    if previous:
+        change = task_changes(rows.values())
+        change.update(task_changes([row for row in previous if row.id in rows], sign=-1))
+        add_user_stats(db, user_id, change)
+    return rows
+
+def delete_tasks(db: Session, user_id: int, task_ids: List[int]) -> Set[int]:
+    """Delete the user's tasks and their (archived) sessions; returns the ids deleted."""
+    if not task_ids:
+        return set()
+    sessions = PomodoroSession.__table__
+    archive = PomodoroSessionArchive.__table__
+    tasks = Task.__table__
+    change = session_changes(db.execute(
+        delete(sessions)
+        .where(sessions.c.user_id == user_id, sessions.c.task_id.in_(task_ids))
+        .returning(*(sessions.c[name] for name in SESSION_STATS_COLUMNS))
+    ), sign=-1)
+    change.update(archive_changes(db.execute(
+        delete(archive).where(archive.c.user_id == user_id, archive.c.task_id.in_(task_ids)).returning(*archive.c)
+    ), sign=-1))
+    deleted = db.execute(
+        delete(tasks).where(tasks.c.user_id == user_id, tasks.c.id.in_(task_ids)).returning(*(tasks.c[name] for name in TASK_STATS_COLUMNS))
+    ).all()
+    change.update(task_changes(deleted, sign=-1))
+    add_user_stats(db, user_id, change)
+    return {row.id for row in deleted}
+
+@router.post("/batch", response_model=TaskBatchResponse)
+def batch_tasks(
+    batch: TaskBatchRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Create, update and delete many tasks in one transaction.
+    
+    Creates are one multi-row INSERT, updates one UPDATE and deletes one
+    DELETE (plus one each for their sessions and archived sessions), each
+    scoped to the current user and followed by one upsert of the user's
+    statistics counters.
+    Updates and deletes of tasks the user doesn't have are reported as
+    not_found per item; everything else is committed together.
+    """
+    created = insert_tasks(db, current_user.id, batch.create)
+    updated = update_tasks(db, current_user.id, batch.update)
+    deleted = delete_tasks(db, current_user.id, batch.delete)
+    db.commit()
+
+    return TaskBatchResponse(
+        created=[
+            TaskBatchItemResult(index=index, id=row.id, status="created", task=TaskSummary.model_validate(row))
+            for index, row in enumerate(created)
+        ],
+        updated=[
+            TaskBatchItemResult(index=index, id=item.id, status="updated", task=TaskSummary.model_validate(updated[item.id]))
+            if item.id in updated else TaskBatchItemResult(index=index, id=item.id, status="not_found")
+            for index, item in enumerate(batch.update)
+        ],
+        deleted=[
+            TaskBatchItemResult(index=index, id=task_id, status="deleted" if task_id in deleted else "not_found")
+            for index, task_id in enumerate(batch.delete)
+        ],
+    )
 
 @router.get("/", response_model=List[TaskSchema])
 def read_tasks(
-    skip: int = 0,
-    limit: int = 100,
+    response: Response,
+    skip: Optional[int] = Query(None, ge=0, deprecated=True, description="Offset pagination; use cursor instead"),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    sort: str = Query("created_at", pattern="^(created_at|due_date|priority)$"),
+    order: Optional[str] = Query(None, pattern="^(asc|desc)$"),
     status_filter: TaskStatus = None,
+    include: str = Query("sessions", pattern="^(sessions)?$", description="'sessions' to embed pomodoro_sessions, empty to skip them"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """
-    Get all tasks for the current user with optional filtering.
+    Get tasks for the current user with optional filtering, one page at a time.
+    
+    Sorted by `sort` (created_at and due_date ascending, priority descending
+    unless `order` says otherwise; tasks without a due date come last). When
+    there are more tasks, the X-Next-Cursor response header holds the
+    `cursor` for the next page.
+    
+    Sessions of the whole page are loaded with one extra query; with an
+    empty `include` they are not loaded and pomodoro_sessions is [].
     """
+    if cursor is not None and skip is not None:
+        raise HTTPException(status_code=400, detail="Use either cursor or skip, not both")
+
     query = db.query(Task).filter(Task.user_id == current_user.id)
+    if include == "sessions":
+        query = query.options(selectinload(Task.pomodoro_sessions))
+    else:
+        query = query.options(noload(Task.pomodoro_sessions))
     if status_filter:
         query = query.filter(Task.status == status_filter)
-    tasks = query.offset(skip).limit(limit).all()
+    try:
+        tasks, next_cursor = paginate(query, TASK_SORT_KEYS[sort], Task.id, limit, order, cursor, skip)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     return tasks
 
 @router.get("/{task_id}", response_model=TaskSchema)
@@ -71,22 +254,13 @@ def update_task(
     """
     Update a task.
     """
-    task = db.query(Task).filter(Task.id == task_id, Task.user_id == current_user.id).first()
-    if task is None:
+    item = TaskBatchUpdate(id=task_id, **task_update.model_dump(exclude_unset=True))
+    row = update_tasks(db, current_user.id, [item]).get(task_id)
+    if row is None:
         raise HTTPException(status_code=404, detail="Task not found")
-
-    # Update fields
-    update_data = task_update.model_dump(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(task, field, value)
-
-    # Handle status change to completed
-    if update_data.get("status") == TaskStatus.DONE and task.status != TaskStatus.DONE:
-        task.completed_at = datetime.utcnow()
-
+    response = task_response(db, row)
     db.commit()
-    db.refresh(task)
-    return task
+    return response
 
 @router.delete("/{task_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_task(
@@ -97,10 +271,7 @@ def delete_task(
     """
     Delete a task.
     """
-    task = db.query(Task).filter(Task.id == task_id, Task.user_id == current_user.id).first()
-    if task is None:
+    if not delete_tasks(db, current_user.id, [task_id]):
         raise HTTPException(status_code=404, detail="Task not found")
-
-    db.delete(task)
     db.commit()
     return {"detail": "Task deleted successfully"}
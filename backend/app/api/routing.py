@@ -0,0 +1,88 @@
+"""
+Router that lets the sync endpoint handlers run natively in async database mode.
+
+Handlers are written once, as plain `def` functions taking a sync
+`Session` from `get_db`. In async mode (see app.core.database) each such
+handler is registered as an `async def` that receives an AsyncSession and
+runs the handler body through `AsyncSession.run_sync`: ORM I/O is awaited on
+the async driver instead of occupying a threadpool slot for the whole request.
+"""
+
+import asyncio
+import functools
+import inspect
+from typing import Any, Callable, List, Optional
+
+from fastapi import APIRouter, Depends, Response
+from fastapi.datastructures import DefaultPlaceholder
+from fastapi.params import Depends as DependsParam
+from pydantic import TypeAdapter
+
+from ..core.database import get_db, get_async_db, is_async
+
+
+def _db_parameters(endpoint: Callable) -> List[str]:
+    """Names of the endpoint parameters that depend on get_db."""
+    return [
+        name for name, param in inspect.signature(endpoint).parameters.items()
+        if isinstance(param.default, DependsParam) and param.default.dependency is get_db
+    ]
+
+
+def async_session_endpoint(endpoint: Callable, response_model: Any = None) -> Callable:
+    """
+    Wrap a sync handler so it runs against an AsyncSession via run_sync.
+
+    The response is validated against `response_model` inside run_sync,
+    so lazy-loaded relationships are still fetched on the async driver.
+    """
+    db_names = _db_parameters(endpoint)
+    signature = inspect.signature(endpoint)
+    parameters = [
+        param.replace(default=Depends(get_async_db), annotation=Any) if name in db_names else param
+        for name, param in signature.parameters.items()
+    ]
+    adapter = TypeAdapter(response_model) if response_model is not None else None
+
+    @functools.wraps(endpoint)
+    async def wrapper(**kwargs):
+        async_db = kwargs[db_names[0]]
+
+        def call(sync_db):
+            for name in db_names:
+                kwargs[name] = sync_db
+            result = endpoint(**kwargs)
+            if adapter is not None and not isinstance(result, Response):
+                result = adapter.validate_python(result, from_attributes=True)
+            return result
+
+        return await async_db.run_sync(call)
+
+    wrapper.__signature__ = signature.replace(parameters=parameters)
+    return wrapper
+
+
+class SessionRouter(APIRouter):
+    """
+    APIRouter for handlers that use `db: Session = Depends(get_db)`.
+
+    In sync mode it behaves exactly like APIRouter. In async mode sync
+    handlers are registered through `async_session_endpoint`; async handlers
+    are expected to use `get_request_db` and `run_db` themselves.
+    """
+
+    def __init__(self, *args, async_mode: Optional[bool] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.async_mode = is_async if async_mode is None else async_mode
+
+    def add_api_route(self, path: str, endpoint: Callable[..., Any], **kwargs) -> None:
+        if (
+            self.async_mode
+            and not asyncio.iscoroutinefunction(endpoint)
+            and _db_parameters(endpoint)
+        ):
+            response_model = kwargs.get("response_model")
+            if isinstance(response_model, DefaultPlaceholder):
+                response_model = None
+            endpoint = async_session_endpoint(endpoint, response_model)
+        super().add_api_route(path, endpoint, **kwargs)
@@ -0,0 +1,144 @@
+"""
+Per-day focus activity of a user, for the heatmap and streaks.
+
+user_activity keeps one row per user: the UTC day of the user's first
+completed work session and two packed arrays with an entry per day from
+there on - completed work sessions and their minutes (unsigned 16-bit,
+little-endian, saturating). A year costs under 1.5 KB, so a 365-day
+heatmap or the streaks are one small row read. Sessions count on the UTC
+day they were created, like the archive, so archival leaves the arrays
+alone. The rows are maintained by add_user_stats (see app.core.user_stats).
+"""
+
+import sys
+from array import array
+from datetime import date, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+
+MAX_DAY_VALUE = 0xFFFF
+
+# Array columns of user_activity
+ACTIVITY_STATS = ("work_sessions", "work_minutes")
+
+
+def _unpack(data: Optional[bytes]) -> array:
+    values = array("H", data or b"")
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def _pack(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array("H", values)
+        values.byteswap()
+    return values.tobytes()
+
+
+class DailyActivity:
+    """The decoded arrays of a user_activity row."""
+
+    def __init__(self, first_day: Optional[date] = None, **arrays: bytes):
+        self.first_day = first_day
+        self.arrays = {name: _unpack(arrays.get(name)) for name in ACTIVITY_STATS}
+
+    @classmethod
+    def from_row(cls, row) -> "DailyActivity":
+        if row is None:
+            return cls()
+        return cls(row.first_day, **{name: getattr(row, name) for name in ACTIVITY_STATS})
+
+    def values(self) -> Dict:
+        """Column values for the row."""
+        return {"first_day": self.first_day, **{name: _pack(self.arrays[name]) for name in ACTIVITY_STATS}}
+
+    def __len__(self) -> int:
+        return len(self.arrays[ACTIVITY_STATS[0]])
+
+    def add(self, day: date, counts: Dict[str, int]) -> None:
+        """Add `counts` (by ACTIVITY_STATS name) to the day, growing the arrays as needed."""
+        if self.first_day is None:
+            self.first_day = day
+        if day < self.first_day:
+            padding = (self.first_day - day).days
+            for name in ACTIVITY_STATS:
+                self.arrays[name] = array("H", bytes(2 * padding)) + self.arrays[name]
+            self.first_day = day
+        index = (day - self.first_day).days
+        missing = index + 1 - len(self)
+        if missing > 0:
+            for name in ACTIVITY_STATS:
+                self.arrays[name].extend([0] * missing)
+        for name in ACTIVITY_STATS:
+            values = self.arrays[name]
+            values[index] = min(max(values[index] + counts.get(name, 0), 0), MAX_DAY_VALUE)
+
+    def day(self, day: date) -> Tuple[int, ...]:
+        """The ACTIVITY_STATS values of a day (zeros outside the arrays)."""
+        if self.first_day is None or not 0 <= (day - self.first_day).days < len(self):
+            return (0,) * len(ACTIVITY_STATS)
+        index = (day - self.first_day).days
+        return tuple(self.arrays[name][index] for name in ACTIVITY_STATS)
+
+    def active_days(self) -> Dict[date, Tuple[int, ...]]:
+        """The days with any activity and their values."""
+        return {
+            self.first_day + timedelta(days=index): values
+            for index, values in enumerate(zip(*(self.arrays[name] for name in ACTIVITY_STATS)))
+            if any(values)
+        }
+
+    def window(self, start: date, end: date) -> Dict[str, list]:
+        """Each ACTIVITY_STATS array over start..end (both included), zero-filled."""
+        days = (end - start).days + 1
+        window = {name: [0] * days for name in ACTIVITY_STATS}
+        if self.first_day is None:
+            return window
+        offset = (start - self.first_day).days
+        for name in ACTIVITY_STATS:
+            values = self.arrays[name]
+            for index in range(max(0, -offset), min(days, len(values) - offset)):
+                window[name][index] = values[offset + index]
+        return window
+
+
+def streaks(activity: DailyActivity, today: date) -> Dict:
+    """
+    Runs of consecutive days with a completed work session: the current
+    one (still alive while today has none yet, if yesterday had) and the
+    longest one, with their first and last days.
+    """
+    sessions = activity.arrays["work_sessions"]
+    longest: Tuple[int, Optional[date], Optional[date]] = (0, None, None)
+    run_start = None
+    for index, value in enumerate(list(sessions) + [0]):
+        if value and run_start is None:
+            run_start = index
+        elif not value and run_start is not None:
+            if index - run_start > longest[0]:
+                first = activity.first_day + timedelta(days=run_start)
+                longest = (index - run_start, first, first + timedelta(days=index - run_start - 1))
+            run_start = None
+
+    current, current_start = 0, None
+    day = today if activity.day(today)[0] else today - timedelta(days=1)
+    while activity.day(day)[0]:
+        current += 1
+        current_start = day
+        day -= timedelta(days=1)
+    return {
+        "current_streak": current,
+        "current_streak_start": current_start,
+        "longest_streak": longest[0],
+        "longest_streak_start": longest[1],
+        "longest_streak_end": longest[2],
+        "active_days": sum(1 for value in sessions if value),
+    }
+
+
+def build_activity(days: Iterable[Tuple[date, int, int]]) -> DailyActivity:
+    """A DailyActivity from (day, work_sessions, work_minutes) rows."""
+    activity = DailyActivity()
+    for day, work_sessions, work_minutes in sorted(days):
+        activity.add(day, {"work_sessions": work_sessions, "work_minutes": work_minutes})
+    return activity
@@ -0,0 +1,155 @@
+"""
+Archival of old pomodoro sessions.
+
+Sessions created before the horizon (SESSION_ARCHIVE_HORIZON_DAYS, counted
+in whole UTC days) are folded into pomodoro_session_archive - one row of
+totals per user, day, task and session type - and deleted, a batch of
+SESSION_ARCHIVE_BATCH_SIZE at a time. Each batch adds its totals and
+deletes its sessions in one transaction, so statistics that combine both
+tables stay exact throughout; on PostgreSQL the batch rows are locked
+with SKIP LOCKED so concurrent runs (one per worker) never count a session
+twice. The batch's hourly rollups (user_stats_hourly) move to 00:00 UTC
+of their day in the same transaction, the archive's granularity, so in
+time zones behind UTC archived activity shows on the previous local day.
+On a partitioned table, monthly partitions emptied by archival are
+dropped afterwards.
+
+`run_session_maintenance` runs everything enabled in the settings and is
+what the application's periodic task and maintain_sessions.py call.
+"""
+
+from datetime import datetime, time, timedelta
+from typing import Callable, Optional
+
+from sqlalchemy import and_, case, delete, func, select
+from sqlalchemy.engine import Engine
+
+from .config import settings
+from .partitions import drop_partitions_before, ensure_session_partitions, is_partitioned
+from .sql import datetime_trunc, upsert_insert, utc_date
+from .stats_cache import stats_cache
+from ..models.task import PomodoroSession, PomodoroSessionArchive, UserStatsHourly
+
+ARCHIVE_TOTALS = ("sessions", "completed_sessions", "completed_minutes", "timed_sessions")
+
+
+def archive_cutoff(horizon_days: int, now: Optional[datetime] = None) -> datetime:
+    """Start of the oldest UTC day that is kept in pomodoro_sessions."""
+    return datetime.combine((now or datetime.utcnow()).date() - timedelta(days=horizon_days), time.min)
+
+
+def archive_sessions(
+    bind: Engine,
+    horizon_days: Optional[int] = None,
+    batch_size: Optional[int] = None,
+    progress: Optional[Callable[[int], None]] = None,
+    now: Optional[datetime] = None,
+) -> int:
+    """
+    Move sessions older than the horizon into the archive.
+
+    Returns the number of sessions archived (0 when the horizon is 0).
+    """
+    horizon_days = settings.SESSION_ARCHIVE_HORIZON_DAYS if horizon_days is None else horizon_days
+    if horizon_days <= 0:
+        return 0
+    batch_size = batch_size or settings.SESSION_ARCHIVE_BATCH_SIZE
+    cutoff = archive_cutoff(horizon_days, now)
+    sessions = PomodoroSession.__table__
+    archive = PomodoroSessionArchive.__table__
+    upsert = upsert_insert(bind.dialect.name)
+    if upsert is None:
+        raise RuntimeError(f"Session archival isn't supported on {bind.dialect.name}")
+
+    completed = sessions.c.completed_at.isnot(None)
+    day = utc_date(sessions.c.created_at)
+    keys = [sessions.c.user_id, day, sessions.c.task_id, sessions.c.session_type]
+
+    archived = 0
+    while True:
+        with bind.begin() as conn:
+            ids = conn.scalars(
+                select(sessions.c.id)
+                .where(sessions.c.created_at < cutoff)
+                .order_by(sessions.c.id)
+                .limit(batch_size)
+                .with_for_update(skip_locked=True)
+            ).all()
+            if not ids:
+                break
+            in_batch = sessions.c.id.in_(ids)
+            totals = select(
+                *keys,
+                func.count(),
+                func.count(case((completed, 1))),
+                func.coalesce(func.sum(case((completed, sessions.c.actual_duration_minutes))), 0),
+                func.count(case((and_(completed, sessions.c.actual_duration_minutes.isnot(None)), 1))),
+            ).where(in_batch).group_by(*keys)
+            statement = upsert(archive).from_select(
+                ["user_id", "day", "task_id", "session_type", *ARCHIVE_TOTALS], totals
+            )
+            statement = statement.on_conflict_do_update(
+                index_elements=[column.name for column in archive.primary_key.columns],
+                set_={name: archive.c[name] + statement.excluded[name] for name in ARCHIVE_TOTALS},
+            )
+            conn.execute(statement)
+            user_ids = _refile_rollups(conn, upsert, in_batch)
+            conn.execute(delete(sessions).where(in_batch))
+        stats_cache.invalidate(user_ids)
+        archived += len(ids)
+        if progress is not None:
+            progress(archived)
+        if len(ids) < batch_size:
+            break
+
+    if bind.dialect.name == "postgresql":
+        with bind.begin() as conn:
+            if is_partitioned(conn):
+                drop_partitions_before(conn, cutoff)
+    return archived
+
+
+def _refile_rollups(conn, upsert, in_batch) -> set:
+    """
+    Move the hourly rollups of the sessions in the batch to the start of
+    their day; returns the users concerned.
+    """
+    sessions = PomodoroSession.__table__
+    hourly = UserStatsHourly.__table__
+    completed = sessions.c.completed_at.isnot(None)
+    names = ["sessions", "completed_sessions", "work_minutes"]
+    user_ids = set()
+    # Subtract from the hours first: a batch's 00:00 hour is also its day start
+    for unit, sign in (("hour", -1), ("day", 1)):
+        hour = datetime_trunc(unit, sessions.c.created_at)
+        totals = select(
+            sessions.c.user_id,
+            hour,
+            sign * func.count(),
+            sign * func.count(case((completed, 1))),
+            sign * func.coalesce(func.sum(case(
+                (and_(completed, sessions.c.session_type == "work"), sessions.c.actual_duration_minutes)
+            )), 0),
+        ).where(in_batch).group_by(sessions.c.user_id, hour)
+        statement = upsert(hourly).from_select(["user_id", "hour", *names], totals)
+        statement = statement.on_conflict_do_update(
+            index_elements=["user_id", "hour"],
+            set_={name: hourly.c[name] + statement.excluded[name] for name in names},
+        ).returning(hourly.c.user_id)
+        user_ids.update(conn.scalars(statement))
+    if user_ids:
+        # Hours left empty
+        conn.execute(delete(hourly).where(
+            hourly.c.user_id.in_(user_ids),
+            *(hourly.c[name] == 0 for name in (*names, "tasks_completed")),
+        ))
+    return user_ids
+
+
+def run_session_maintenance(bind: Engine) -> int:
+    """Create upcoming session partitions and archive old sessions, as configured."""
+    if settings.SESSION_PARTITIONING_ENABLED and bind.dialect.name == "postgresql":
+        with bind.begin() as conn:
+            if is_partitioned(conn):
+                ensure_session_partitions(conn)
+    return archive_sessions(bind)
@@ -1,40 +1,68 @@
 """
 Database configuration and session management.
 Supports both SQLite (development) and PostgreSQL (production).
+
+Async mode is opt-in: an async driver in DATABASE_URL
+(postgresql+asyncpg://... or sqlite+aiosqlite:///...) makes request handlers
+use an AsyncSession, while scripts and DDL keep using the sync engine.
+
+Read replicas are opt-in too: with DATABASE_REPLICA_URLS set, sessions from
+get_db/get_async_db read from a replica on GET requests (see app.core.replicas).
 """
 
+from typing import Any, Callable
+
 from sqlalchemy import create_engine
-from sqlalchemy.orm import declarative_base, sessionmaker
-from sqlalchemy.pool import StaticPool, QueuePool
+from sqlalchemy.orm import declarative_base, sessionmaker, Session
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
 from .config import settings
+from .pool import (
+    InstrumentedQueuePool,
+    InstrumentedAsyncAdaptedQueuePool,
+    pool_snapshot,
+    warm_up_pool,
+    warm_up_async_pool,
+)
+from .replicas import REPLICAS_KEY, ReplicaSet, RoutingSession, route_reads
+from .sqlite_engine import create_sqlite_engine, create_async_sqlite_engine
+
+# Async drivers that select async mode when present in DATABASE_URL
+ASYNC_DRIVERS = ("+asyncpg", "+aiosqlite")
 
 # Detect database type
 is_sqlite = "sqlite" in settings.DATABASE_URL.lower()
 is_postgresql = "postgresql" in settings.DATABASE_URL.lower() or "postgres" in settings.DATABASE_URL.lower()
+is_async = any(driver in settings.DATABASE_URL for driver in ASYNC_DRIVERS)
+
+# The sync engine always uses the default (sync) driver for the same database
+sync_database_url = settings.DATABASE_URL
+for _driver in ASYNC_DRIVERS:
+    sync_database_url = sync_database_url.replace(_driver, "")
+
+# Queue pool settings shared by the sync and async engines (and SQLite files)
+pool_options = {
+    "pool_size": settings.DB_POOL_SIZE,
+    "max_overflow": settings.DB_MAX_OVERFLOW,
+    "pool_timeout": settings.DB_POOL_TIMEOUT,
+    "pool_recycle": settings.DB_POOL_RECYCLE,
+    "pool_pre_ping": settings.DB_POOL_PRE_PING,
+}
 
 # Configure connection arguments based on database type
 if is_sqlite:
-    # SQLite needs special connection args
-    connect_args = {"check_same_thread": False}
-    # Use StaticPool for SQLite to allow multiple threads
-    engine = create_engine(
-        settings.DATABASE_URL,
-        connect_args=connect_args,
-        poolclass=StaticPool,
-        echo=False
-    )
+    # Pooled connections with WAL and tuned PRAGMAs (StaticPool for :memory:)
+    engine = create_sqlite_engine(sync_database_url, pool_options)
 elif is_postgresql:
     # PostgreSQL connection pool configuration
     # Only try to create engine if psycopg2 is available
     try:
         import psycopg2  # noqa: F401
         engine = create_engine(
-            settings.DATABASE_URL,
-            poolclass=QueuePool,
-            pool_size=5,
-            max_overflow=10,
-            pool_pre_ping=True,  # Verify connections before using
-            echo=False
+            sync_database_url,
+            poolclass=InstrumentedQueuePool,
+            echo=False,
+            **pool_options
         )
     except ImportError:
         # If psycopg2 is not available, fall back to SQLite for testing
@@ -44,45 +72,160 @@ elif is_postgresql:
             "Install psycopg2-binary for PostgreSQL support.",
             UserWarning
         )
-        connect_args = {"check_same_thread": False}
-        engine = create_engine(
-            "sqlite:///./fallback.db",
-            connect_args=connect_args,
-            poolclass=StaticPool,
-            echo=False
-        )
+        engine = create_sqlite_engine("sqlite:///./fallback.db", pool_options)
 else:
     # Default configuration for other databases
     connect_args = {}
     engine = create_engine(
-        settings.DATABASE_URL,
+        sync_database_url,
         connect_args=connect_args,
-        echo=False
+        poolclass=InstrumentedQueuePool,
+        echo=False,
+        **pool_options
+    )
+
+replica_urls = settings.get_replica_urls_list()
+
+def create_replica_engine(url: str):
+    """Sync engine for a read replica, pooled like the primary."""
+    for driver in ASYNC_DRIVERS:
+        url = url.replace(driver, "")
+    if "sqlite" in url.lower():
+        return create_sqlite_engine(url, pool_options)
+    return create_engine(url, poolclass=InstrumentedQueuePool, echo=False, **pool_options)
+
+def create_async_replica_engine(url: str):
+    """Async engine for a read replica (async mode only)."""
+    from sqlalchemy.ext.asyncio import create_async_engine
+    if "sqlite" in url.lower():
+        return create_async_sqlite_engine(url, pool_options)
+    return create_async_engine(
+        url,
+        poolclass=InstrumentedAsyncAdaptedQueuePool,
+        echo=False,
+        **pool_options
     )
 
 # Create SessionLocal class
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+replica_set = None
+if replica_urls and not is_async:
+    replica_set = ReplicaSet(
+        [create_replica_engine(url) for url in replica_urls],
+        settings.DB_REPLICA_EJECT_SECONDS,
+    )
+    SessionLocal = sessionmaker(
+        autocommit=False,
+        autoflush=False,
+        bind=engine,
+        class_=RoutingSession,
+        info={REPLICAS_KEY: replica_set},
+    )
+else:
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Async engine and sessions (only in async mode)
+async_engine = None
+AsyncSessionLocal = None
+if is_async:
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+    if is_sqlite:
+        async_engine = create_async_sqlite_engine(settings.DATABASE_URL, pool_options)
+    else:
+        async_engine = create_async_engine(
+            settings.DATABASE_URL,
+            poolclass=InstrumentedAsyncAdaptedQueuePool,
+            echo=False,
+            **pool_options
+        )
+    if replica_urls:
+        # Routing happens in the sync session behind the AsyncSession
+        replica_set = ReplicaSet(
+            [create_async_replica_engine(url).sync_engine for url in replica_urls],
+            settings.DB_REPLICA_EJECT_SECONDS,
+        )
+        AsyncSessionLocal = async_sessionmaker(
+            async_engine,
+            autocommit=False,
+            autoflush=False,
+            sync_session_class=RoutingSession,
+            info={REPLICAS_KEY: replica_set},
+        )
+    else:
+        AsyncSessionLocal = async_sessionmaker(
+            async_engine, autocommit=False, autoflush=False
+        )
 
 # Base class for models
 Base = declarative_base()
 
-def get_db():
+def get_db(request: Request):
     """
     Dependency to get database session.
     Yields a database session and ensures it's closed after use.
+    On GET requests the session may read from a replica.
     """
     db = SessionLocal()
+    route_reads(db, request.method)
     try:
         yield db
     finally:
         db.close()
 
+async def get_async_db(request: Request):
+    """
+    Dependency to get an async database session (async mode only).
+    """
+    async with AsyncSessionLocal() as db:
+        route_reads(db, request.method)
+        yield db
+
+# Session dependency for async handlers and dependencies: an AsyncSession in
+# async mode, otherwise the regular sync session (so overrides of get_db apply)
+get_request_db = get_async_db if is_async else get_db
+
+
+async def run_db(db, fn: Callable[..., Any], *args: Any) -> Any:
+    """
+    Run `fn(session, *args)` from an async handler without blocking the event loop.
+    
+    With an AsyncSession the sync ORM code runs through `run_sync`, so its I/O
+    is awaited on the async driver; with a sync Session it runs in the threadpool.
+    """
+    if isinstance(db, Session):
+        return await run_in_threadpool(fn, db, *args)
+    return await db.run_sync(fn, *args)
+
+async def warm_up_database_pools() -> None:
+    """Pre-open pooled connections at startup (see DB_POOL_WARMUP_CONNECTIONS)."""
+    try:
+        if async_engine is not None:
+            await warm_up_async_pool(async_engine, settings.DB_POOL_WARMUP_CONNECTIONS)
+        else:
+            await run_in_threadpool(warm_up_pool, engine, settings.DB_POOL_WARMUP_CONNECTIONS)
+    except Exception as e:
+        # The pool fills lazily anyway; don't refuse to start
+        print(f"Warning: database pool warm-up failed: {e}")
+
+
+def database_pool_status() -> dict:
+    """Pool gauges and checkout metrics for every engine."""
+    status = {"primary": pool_snapshot(engine.pool)}
+    if async_engine is not None:
+        status["async"] = pool_snapshot(async_engine.sync_engine.pool)
+    if replica_set is not None:
+        status["replicas"] = replica_set.status()
+    return status
+
 def create_tables():
     """
-    Create all database tables.
-    Call this once when the application starts.
+    Create all database tables and stamp them with the latest migration.
+    Deployments use `alembic upgrade head` instead; this is for tests,
+    scripts and reset-db.
     """
-    Base.metadata.create_all(bind=engine)
+    from .migrations import stamp_head
+    with engine.begin() as conn:
+        Base.metadata.create_all(bind=conn)
+        stamp_head(conn)
 
 
 def drop_all_tables():
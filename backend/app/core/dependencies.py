@@ -8,16 +8,25 @@ from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from jose import JWTError
 
-from ..core.database import get_db
+from ..core.database import get_request_db, run_db
 from ..core.security import decode_access_token
+from ..core.principal_cache import get_cached_principal, cache_principal
 from ..models.user import User
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login", auto_error=False)
 
 
+def load_user(db: Session, user_id: int) -> Optional[User]:
+    """Load a user by id, detached so the row can be shared across requests."""
+    user = db.query(User).filter(User.id == user_id).first()
+    if user is not None:
+        db.expunge(user)
+    return user
+
+
 async def get_current_user(
     token: Optional[str] = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_request_db)
 ) -> User:
     """
     Dependency to get the current authenticated user from JWT token.
@@ -55,7 +64,12 @@ async def get_current_user(
     else:
         raise credentials_exception
     
-    user = db.query(User).filter(User.id == user_id).first()
+    # Only active users are cached, so a hit can be returned directly
+    user = get_cached_principal(user_id, token)
+    if user is not None:
+        return user
+    
+    user = await run_db(db, load_user, user_id)
     if user is None:
         raise credentials_exception
     
@@ -65,6 +79,7 @@ async def get_current_user(
             detail="User account is inactive"
         )
     
+    cache_principal(user, token)
     return user
 
 
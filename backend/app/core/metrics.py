@@ -0,0 +1,55 @@
+"""
+Lightweight in-process metrics used by the admin metrics endpoint.
+"""
+
+import threading
+from typing import Dict, Sequence
+
+# Default latency buckets in milliseconds (upper bounds, inclusive)
+DEFAULT_LATENCY_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class LatencyHistogram:
+    """
+    Thread-safe fixed-bucket latency histogram.
+    Values are recorded in milliseconds.
+    """
+
+    def __init__(self, buckets_ms: Sequence[float] = DEFAULT_LATENCY_BUCKETS_MS):
+        self._buckets = tuple(sorted(buckets_ms))
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Clear all recorded values."""
+        with self._lock:
+            self._counts = [0] * (len(self._buckets) + 1)
+            self._count = 0
+            self._sum_ms = 0.0
+            self._max_ms = 0.0
+
+    def observe(self, value_ms: float) -> None:
+        """Record a single latency value."""
+        with self._lock:
+            index = len(self._buckets)
+            for i, bound in enumerate(self._buckets):
+                if value_ms <= bound:
+                    index = i
+                    break
+            self._counts[index] += 1
+            self._count += 1
+            self._sum_ms += value_ms
+            if value_ms > self._max_ms:
+                self._max_ms = value_ms
+
+    def snapshot(self) -> Dict:
+        """Return the histogram as a JSON-serializable dictionary."""
+        with self._lock:
+            buckets = {f"le_{bound:g}ms": count for bound, count in zip(self._buckets, self._counts)}
+            buckets["le_inf"] = self._counts[-1]
+            return {
+                "count": self._count,
+                "avg_ms": round(self._sum_ms / self._count, 3) if self._count else 0.0,
+                "max_ms": round(self._max_ms, 3),
+                "buckets": buckets,
+            }
@@ -0,0 +1,62 @@
+"""
+Schema revision helpers built on the Alembic environment in backend/alembic.
+
+The application never migrates on its own: deployments run
+`alembic upgrade head`, and startup only checks that the database is at
+the head revision (verify_schema).
+"""
+
+from pathlib import Path
+from typing import Optional
+
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+
+ALEMBIC_INI = Path(__file__).resolve().parents[2] / "alembic.ini"
+
+
+class SchemaVersionError(RuntimeError):
+    """Raised when the database schema is not at the expected revision."""
+
+
+def alembic_config() -> Config:
+    """Alembic configuration for this backend."""
+    return Config(str(ALEMBIC_INI))
+
+
+def head_revision() -> str:
+    """Latest migration revision."""
+    return ScriptDirectory.from_config(alembic_config()).get_current_head()
+
+
+def current_revision(connection) -> Optional[str]:
+    """Revision recorded in the database (None if it was never migrated)."""
+    return MigrationContext.configure(connection).get_current_revision()
+
+
+def stamp_head(connection) -> None:
+    """Record the head revision, for schemas built from the models (create_all)."""
+    script = ScriptDirectory.from_config(alembic_config())
+    MigrationContext.configure(connection).stamp(script, "head")
+
+
+def verify_schema(engine) -> str:
+    """
+    Check that the database is at the head revision.
+    
+    Returns:
+        The head revision
+    
+    Raises:
+        SchemaVersionError: If the database is behind, ahead or unmanaged
+    """
+    head = head_revision()
+    with engine.connect() as connection:
+        current = current_revision(connection)
+    if current != head:
+        raise SchemaVersionError(
+            f"Database schema is at revision {current or 'none'}, expected {head}. "
+            "Run `alembic upgrade head` from the backend directory."
+        )
+    return head
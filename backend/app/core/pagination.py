@@ -0,0 +1,178 @@
+"""
+Keyset (cursor) pagination.
+
+A page is fetched with `WHERE key >= :last_key AND (key > :last_key OR
+id > :last_id) ORDER BY key, id LIMIT n` (mirrored for descending order).
+The first condition lets the database seek straight to the position in an
+index on (owner, key, id) - also for expression keys, where row-value
+comparisons aren't used for seeking - so every page costs the same however
+deep it is, and rows inserted or deleted meanwhile don't shift the pages.
+
+Nullable sort keys are paged in two phases, non-NULL values first and
+then the NULL rows by id, so NULLs come last in both orders and each
+phase is still an index range scan.
+
+Cursors are opaque URL-safe tokens naming the sort, the order and the
+last row's position; they are not tied to a user, since every listing
+filters by owner independently of the cursor.
+"""
+
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Callable, List, Optional, Tuple
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Query
+
+# Response header carrying the cursor of the next page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class InvalidCursor(ValueError):
+    """Raised for cursors that can't be decoded or belong to another sort."""
+
+
+class SortKey:
+    """
+    A sort order usable for keyset pagination.
+
+    Args:
+        name: Value of the `sort` query parameter
+        column: Column or SQL expression to sort on (ties broken by id)
+        value: Returns the sort value of a loaded row (defaults to the column attribute)
+        nullable: Whether the column can be NULL
+        default_order: "asc" or "desc" when the request doesn't say
+    """
+
+    def __init__(
+        self,
+        name: str,
+        column: Any,
+        value: Optional[Callable[[Any], Any]] = None,
+        nullable: bool = False,
+        default_order: str = "asc",
+    ):
+        self.name = name
+        self.column = column
+        self.value = value or (lambda row: getattr(row, name))
+        self.nullable = nullable
+        self.default_order = default_order
+
+
+def encode_cursor(payload: dict) -> str:
+    """Encode a cursor payload as an opaque token."""
+    data = json.dumps(payload, separators=(",", ":"), default=_encode_value).encode()
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> dict:
+    """Decode a token from encode_cursor."""
+    try:
+        data = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        payload = json.loads(data, object_hook=_decode_value)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise InvalidCursor("Invalid cursor") from e
+    if (
+        not isinstance(payload, dict)
+        or not isinstance(payload.get("id"), int)
+        or not isinstance(payload.get("value"), (type(None), int, float, str, datetime))
+    ):
+        raise InvalidCursor("Invalid cursor")
+    return payload
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"$dt": value.isoformat()}
+    raise TypeError(f"Can't encode {type(value).__name__} in a cursor")
+
+
+def _decode_value(obj: dict) -> Any:
+    if set(obj) == {"$dt"}:
+        return datetime.fromisoformat(obj["$dt"])
+    return obj
+
+
+def _ordered(query: Query, key: SortKey, id_column, descending: bool, nulls_last: bool = False) -> Query:
+    column = key.column.desc() if descending else key.column.asc()
+    if nulls_last:
+        column = column.nulls_last()
+    return query.order_by(column, id_column.desc() if descending else id_column.asc())
+
+
+def _after(left, right, descending: bool):
+    return left < right if descending else left > right
+
+
+def _after_position(key: SortKey, id_column, value: Any, last_id: int, descending: bool):
+    at_or_after = key.column <= value if descending else key.column >= value
+    return and_(at_or_after, or_(_after(key.column, value, descending), _after(id_column, last_id, descending)))
+
+
+def paginate(
+    query: Query,
+    key: SortKey,
+    id_column,
+    limit: int,
+    order: Optional[str] = None,
+    cursor: Optional[str] = None,
+    offset: Optional[int] = None,
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    Fetch one page of `query` sorted by `key` then `id_column`.
+
+    Args:
+        query: Filtered query (ownership, status, ...) without ordering
+        key: Sort key
+        id_column: Unique tie-breaker column
+        limit: Page size
+        order: "asc" or "desc" (key.default_order if None)
+        cursor: Token from a previous page's next cursor
+        offset: Deprecated offset pagination (same ordering, not constant time)
+
+    Returns:
+        (rows, next_cursor) - next_cursor is None on the last page
+
+    Raises:
+        InvalidCursor: If the cursor is malformed or was issued for another sort or order
+    """
+    order = order or key.default_order
+    descending = order == "desc"
+
+    if offset is not None:
+        rows = _ordered(query, key, id_column, descending, nulls_last=key.nullable)
+        rows = rows.offset(offset).limit(limit + 1).all()
+    else:
+        position = decode_cursor(cursor) if cursor else None
+        if position is not None and (position.get("sort"), position.get("order")) != (key.name, order):
+            raise InvalidCursor("Cursor was issued for a different sort order")
+
+        rows = []
+        in_nulls = position is not None and position.get("value") is None
+        if not in_nulls:
+            values = query.filter(key.column.isnot(None)) if key.nullable else query
+            if position is not None:
+                values = values.filter(
+                    _after_position(key, id_column, position["value"], position["id"], descending)
+                )
+            rows = _ordered(values, key, id_column, descending).limit(limit + 1).all()
+        if key.nullable and len(rows) <= limit:
+            nulls = query.filter(key.column.is_(None))
+            if in_nulls:
+                nulls = nulls.filter(_after(id_column, position["id"], descending))
+            nulls = nulls.order_by(id_column.desc() if descending else id_column.asc())
+            rows += nulls.limit(limit + 1 - len(rows)).all()
+
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    next_cursor = encode_cursor({
+        "sort": key.name,
+        "order": order,
+        "value": key.value(last),
+        "id": last.id,
+    })
+    return rows, next_cursor
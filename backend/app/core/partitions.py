@@ -0,0 +1,169 @@
+"""
+Monthly range partitioning of pomodoro_sessions on PostgreSQL.
+
+Opt-in (SESSION_PARTITIONING_ENABLED): `partition_sessions_table` converts
+the table once, and `ensure_session_partitions` keeps the next
+SESSION_PARTITION_MONTHS_AHEAD months created (run at startup and by the
+periodic session maintenance). Rows outside every monthly partition,
+e.g. old offline uploads, land in a DEFAULT partition; a month created
+later takes its rows out of DEFAULT first, since PostgreSQL refuses to
+add a partition whose rows DEFAULT still holds.
+
+PostgreSQL requires the partition key in every unique index, so once
+partitioned the primary key is (id, created_at), created_at is NOT NULL
+and the client_id index is unique on (user_id, client_id, created_at);
+offline uploads set created_at from the client's own start time, so a
+retried upload still conflicts (see session_conflict_columns).
+"""
+
+import re
+from datetime import date, datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.schema import AddConstraint
+
+from .config import settings
+from ..models.task import PomodoroSession
+
+TABLE = PomodoroSession.__tablename__
+DEFAULT_PARTITION = f"{TABLE}_default"
+_PARTITION_NAME = re.compile(rf"^{TABLE}_p(\d{{4}})_(\d{{2}})$")
+
+
+def month_start(day: date) -> date:
+    return date(day.year, day.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{TABLE}_p{month.year:04d}_{month.month:02d}"
+
+
+def partition_bounds(name: str) -> Optional[Tuple[date, date]]:
+    """[start, end) of a monthly partition from its name (None for other tables)."""
+    match = _PARTITION_NAME.match(name)
+    if match is None:
+        return None
+    start = date(int(match.group(1)), int(match.group(2)), 1)
+    return start, add_months(start, 1)
+
+
+def session_conflict_columns(dialect_name: str) -> List[str]:
+    """Columns of the unique index that deduplicates offline uploads."""
+    if settings.SESSION_PARTITIONING_ENABLED and dialect_name == "postgresql":
+        return ["user_id", "client_id", "created_at"]
+    return ["user_id", "client_id"]
+
+
+def is_partitioned(conn: Connection) -> bool:
+    """Whether pomodoro_sessions is a partitioned table."""
+    if conn.dialect.name != "postgresql":
+        return False
+    return conn.scalar(text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:table)"), {"table": TABLE}) == "p"
+
+
+def _exists(conn: Connection, name: str) -> bool:
+    return conn.scalar(text("SELECT to_regclass(:name)"), {"name": name}) is not None
+
+
+def _create_partition(conn: Connection, month: date) -> None:
+    """
+    Add the month's partition, moving its rows out of DEFAULT.
+
+    The partition is filled as a plain table and then attached; DEFAULT
+    stays locked meanwhile so no new row for the month can land there.
+    """
+    name = partition_name(month)
+    if _exists(conn, name):
+        return
+    conn.exec_driver_sql(f"LOCK TABLE {DEFAULT_PARTITION} IN ACCESS EXCLUSIVE MODE")
+    if _exists(conn, name):
+        return
+    start, end = month.isoformat(), add_months(month, 1).isoformat()
+    conn.exec_driver_sql(f"CREATE TABLE {name} (LIKE {TABLE} INCLUDING DEFAULTS)")
+    conn.exec_driver_sql(
+        f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} "
+        f"WHERE created_at >= '{start}' AND created_at < '{end}' RETURNING *) "
+        f"INSERT INTO {name} SELECT * FROM moved"
+    )
+    conn.exec_driver_sql(f"ALTER TABLE {TABLE} ATTACH PARTITION {name} FOR VALUES FROM ('{start}') TO ('{end}')")
+
+
+def ensure_session_partitions(conn: Connection, months_ahead: Optional[int] = None, today: Optional[date] = None) -> None:
+    """Create the partitions for this month and the next `months_ahead` months."""
+    months_ahead = settings.SESSION_PARTITION_MONTHS_AHEAD if months_ahead is None else months_ahead
+    current = month_start(today or datetime.utcnow().date())
+    for offset in range(months_ahead + 1):
+        _create_partition(conn, add_months(current, offset))
+
+
+def drop_partitions_before(conn: Connection, cutoff: datetime) -> List[str]:
+    """Drop the empty monthly partitions that end before `cutoff` (after archival)."""
+    names = conn.scalars(text(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "WHERE pg_inherits.inhparent = to_regclass(:table)"
+    ), {"table": TABLE}).all()
+    dropped = []
+    for name in sorted(names):
+        bounds = partition_bounds(name)
+        if bounds is None or datetime.combine(bounds[1], datetime.min.time()) > cutoff:
+            continue
+        if conn.scalar(text(f"SELECT EXISTS (SELECT 1 FROM {name})")):
+            continue
+        conn.exec_driver_sql(f"DROP TABLE {name}")
+        dropped.append(name)
+    return dropped
+
+
+def partition_sessions_table(conn: Connection) -> None:
+    """
+    Convert pomodoro_sessions into a table partitioned by month of created_at.
+
+    Runs in the caller's transaction and holds an exclusive lock on the
+    table while copying it, so schedule it for a quiet moment.
+    """
+    if conn.dialect.name != "postgresql":
+        raise RuntimeError("Session partitioning requires PostgreSQL")
+    if is_partitioned(conn):
+        return
+    table = PomodoroSession.__table__
+    old = f"{TABLE}_unpartitioned"
+    sequence = conn.scalar(text("SELECT pg_get_serial_sequence(:table, 'id')"), {"table": TABLE})
+
+    conn.exec_driver_sql(f"LOCK TABLE {TABLE} IN ACCESS EXCLUSIVE MODE")
+    conn.exec_driver_sql(f"UPDATE {TABLE} SET created_at = COALESCE(started_at, now()) WHERE created_at IS NULL")
+    conn.exec_driver_sql(f"ALTER TABLE {TABLE} RENAME TO {old}")
+    conn.exec_driver_sql(f"ALTER SEQUENCE {sequence} OWNED BY NONE")
+    conn.exec_driver_sql(
+        f"CREATE TABLE {TABLE} (LIKE {old} INCLUDING DEFAULTS) PARTITION BY RANGE (created_at)"
+    )
+    conn.exec_driver_sql(f"ALTER TABLE {TABLE} ALTER COLUMN created_at SET NOT NULL")
+    conn.exec_driver_sql(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {TABLE} DEFAULT")
+
+    first = conn.scalar(text(f"SELECT min(created_at) FROM {old}"))
+    month = month_start(first.date()) if first is not None else month_start(datetime.utcnow().date())
+    last = add_months(month_start(datetime.utcnow().date()), settings.SESSION_PARTITION_MONTHS_AHEAD)
+    while month <= last:
+        _create_partition(conn, month)
+        month = add_months(month, 1)
+
+    conn.exec_driver_sql(f"INSERT INTO {TABLE} SELECT * FROM {old}")
+    conn.exec_driver_sql(f"DROP TABLE {old}")
+    conn.exec_driver_sql(f"ALTER SEQUENCE {sequence} OWNED BY {TABLE}.id")
+
+    conn.exec_driver_sql(f"ALTER TABLE {TABLE} ADD CONSTRAINT {TABLE}_pkey PRIMARY KEY (id, created_at)")
+    for constraint in table.foreign_key_constraints:
+        conn.execute(AddConstraint(constraint))
+    for index in table.indexes:
+        columns = [column.name for column in index.columns]
+        if index.unique and "created_at" not in columns:
+            columns.append("created_at")
+        unique = "UNIQUE " if index.unique else ""
+        conn.exec_driver_sql(f"CREATE {unique}INDEX {index.name} ON {TABLE} ({', '.join(columns)})")
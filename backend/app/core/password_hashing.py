@@ -0,0 +1,145 @@
+"""
+Async password hashing service.
+
+bcrypt is CPU-bound and holds a request worker for the whole hash, so the
+auth endpoints hand the work to a bounded process pool and await the result.
+"""
+
+import asyncio
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, Optional, Tuple
+
+from .config import settings
+from .metrics import LatencyHistogram
+from .security import get_password_hash, verify_password, verify_and_update_password
+
+
+class PasswordHashingUnavailable(Exception):
+    """Raised when the hashing pool is saturated, timed out or broken."""
+
+
+class PasswordHashingService:
+    """
+    Runs password hashing and verification in a process pool.
+
+    At most `pool_size + queue_depth` jobs may be outstanding at once;
+    further submissions are rejected immediately instead of queueing
+    behind a login burst.
+    """
+
+    def __init__(self, pool_size: int, queue_depth: int, timeout: float):
+        self.pool_size = max(1, pool_size)
+        self.queue_depth = max(0, queue_depth)
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._latency = LatencyHistogram()
+        self._in_flight = 0
+        self._peak_in_flight = 0
+        self._completed = 0
+        self._rejected = 0
+        self._timeouts = 0
+        self._errors = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn avoids forking a process that already runs server threads
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.pool_size,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    def _release(self, _future: Future) -> None:
+        with self._lock:
+            self._in_flight -= 1
+
+    async def _run(self, fn: Callable, *args):
+        with self._lock:
+            if self._in_flight >= self.pool_size + self.queue_depth:
+                self._rejected += 1
+                raise PasswordHashingUnavailable("Password hashing queue is full")
+            self._in_flight += 1
+            self._peak_in_flight = max(self._peak_in_flight, self._in_flight)
+
+        start = time.perf_counter()
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except (BrokenProcessPool, RuntimeError) as e:
+            with self._lock:
+                self._in_flight -= 1
+                self._errors += 1
+            self._discard_executor()
+            raise PasswordHashingUnavailable(f"Password hashing pool unavailable: {e}")
+        # The slot is released when the job actually finishes (or is cancelled
+        # before starting), not when the caller gives up waiting on it.
+        future.add_done_callback(self._release)
+
+        try:
+            result = await asyncio.wait_for(asyncio.wrap_future(future), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self._timeouts += 1
+            raise PasswordHashingUnavailable("Password hashing timed out")
+        except BrokenProcessPool as e:
+            with self._lock:
+                self._errors += 1
+            self._discard_executor()
+            raise PasswordHashingUnavailable(f"Password hashing pool unavailable: {e}")
+
+        self._latency.observe((time.perf_counter() - start) * 1000)
+        with self._lock:
+            self._completed += 1
+        return result
+
+    def _discard_executor(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    async def hash(self, password: str) -> str:
+        """Hash a password in the pool."""
+        return await self._run(get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """Verify a password against a stored hash in the pool."""
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    async def verify_and_update(self, plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """Verify a password and compute an upgraded hash if needed, in one pool job."""
+        return await self._run(verify_and_update_password, plain_password, hashed_password)
+
+    def metrics(self) -> Dict:
+        """Return queue depth, counters and latency histogram."""
+        with self._lock:
+            in_flight = self._in_flight
+            data = {
+                "pool_size": self.pool_size,
+                "queue_capacity": self.queue_depth,
+                "in_flight": in_flight,
+                "queued": max(0, in_flight - self.pool_size),
+                "peak_in_flight": self._peak_in_flight,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "timeouts": self._timeouts,
+                "errors": self._errors,
+            }
+        data["latency"] = self._latency.snapshot()
+        return data
+
+    def shutdown(self) -> None:
+        """Stop the worker processes. A new pool is created on next use."""
+        self._discard_executor()
+
+
+password_hasher = PasswordHashingService(
+    pool_size=settings.PASSWORD_HASH_POOL_SIZE,
+    queue_depth=settings.PASSWORD_HASH_QUEUE_DEPTH,
+    timeout=settings.PASSWORD_HASH_TIMEOUT_SECONDS,
+)
@@ -0,0 +1,214 @@
+"""
+Password hashing policy.
+
+A policy knows a set of hash schemes, identifies which one produced a
+stored hash (and at what cost) from its prefix, verifies with that backend
+directly, and reports whether a hash should be upgraded to the target
+scheme and cost after a successful login.
+"""
+
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import bcrypt
+
+# bcrypt only uses the first 72 bytes of a password
+BCRYPT_MAX_PASSWORD_BYTES = 72
+
+
+def _to_bytes(value: Union[str, bytes]) -> bytes:
+    return value if isinstance(value, bytes) else str(value).encode("utf-8")
+
+
+def _to_str(value: Union[str, bytes]) -> str:
+    return value.decode("utf-8") if isinstance(value, bytes) else str(value)
+
+
+class PasswordScheme(ABC):
+    """
+    Base class for a password hash scheme. Subclasses implement identify,
+    verify and hash; a scheme missing one can't be instantiated.
+    """
+
+    name: str = ""
+
+    @abstractmethod
+    def identify(self, hashed: str) -> bool:
+        """Return True if `hashed` was produced by this scheme."""
+
+    def cost(self, hashed: str) -> Optional[int]:
+        """Return the work factor encoded in `hashed`, if the scheme has one."""
+        return None
+
+    @abstractmethod
+    def verify(self, password: str, hashed: str) -> bool:
+        """Return True if `password` matches `hashed`."""
+
+    @abstractmethod
+    def hash(self, password: str, cost: Optional[int] = None) -> str:
+        """Hash `password`, at `cost` if given (else the scheme's default)."""
+
+
+class BcryptScheme(PasswordScheme):
+    """Native bcrypt ($2a$, $2b$, $2y$ hashes, including passlib-generated ones)."""
+
+    name = "bcrypt"
+    prefixes = ("$2a$", "$2b$", "$2y$")
+
+    def identify(self, hashed: str) -> bool:
+        return hashed.startswith(self.prefixes)
+
+    def cost(self, hashed: str) -> Optional[int]:
+        try:
+            return int(hashed[4:6])
+        except ValueError:
+            return None
+
+    def verify(self, password: str, hashed: str) -> bool:
+        password_bytes = _to_bytes(password)[:BCRYPT_MAX_PASSWORD_BYTES]
+        try:
+            return bcrypt.checkpw(password_bytes, _to_bytes(hashed))
+        except ValueError:
+            # Malformed hash
+            return False
+
+    def hash(self, password: str, cost: Optional[int] = None) -> str:
+        password_bytes = _to_bytes(password)[:BCRYPT_MAX_PASSWORD_BYTES]
+        salt = bcrypt.gensalt(rounds=cost) if cost else bcrypt.gensalt()
+        return bcrypt.hashpw(password_bytes, salt).decode("utf-8")
+
+
+class PasslibScheme(PasswordScheme):
+    """
+    Legacy schemes understood by passlib (e.g. pbkdf2_sha256, sha256_crypt).
+
+    The CryptContext is built once, on first use. If passlib is not
+    installed the scheme identifies nothing.
+    """
+
+    name = "passlib"
+
+    def __init__(self, schemes: Sequence[str] = ("pbkdf2_sha256", "sha256_crypt", "sha512_crypt")):
+        self.schemes = list(schemes)
+        self._context = None
+        self._available = True
+
+    def _get_context(self):
+        if self._context is None and self._available:
+            try:
+                from passlib.context import CryptContext
+            except ImportError:
+                self._available = False
+                return None
+            self._context = CryptContext(schemes=self.schemes)
+        return self._context
+
+    def identify(self, hashed: str) -> bool:
+        context = self._get_context()
+        if context is None:
+            return False
+        try:
+            return context.identify(hashed) is not None
+        except ValueError:
+            return False
+
+    def verify(self, password: str, hashed: str) -> bool:
+        context = self._get_context()
+        if context is None:
+            return False
+        try:
+            return context.verify(_to_str(password), hashed)
+        except ValueError:
+            return False
+
+    def hash(self, password: str, cost: Optional[int] = None) -> str:
+        context = self._get_context()
+        if context is None:
+            raise RuntimeError("passlib is not installed")
+        return context.hash(_to_str(password))
+
+
+class PasswordPolicy:
+    """
+    Dispatches verification to the scheme that produced a hash and hashes
+    new passwords with the target scheme and cost.
+    """
+
+    def __init__(self, schemes: List[PasswordScheme], target_scheme: str, target_cost: Optional[int] = None):
+        self.schemes: Dict[str, PasswordScheme] = {scheme.name: scheme for scheme in schemes}
+        if target_scheme not in self.schemes:
+            raise ValueError(f"Unknown target scheme: {target_scheme}")
+        self.target = self.schemes[target_scheme]
+        self.target_cost = target_cost
+
+    def identify(self, hashed: Union[str, bytes]) -> Optional[PasswordScheme]:
+        """Return the scheme that produced `hashed`, or None if unrecognised."""
+        hashed_str = _to_str(hashed)
+        # Check the target first: nearly every stored hash uses it
+        if self.target.identify(hashed_str):
+            return self.target
+        for scheme in self.schemes.values():
+            if scheme is not self.target and scheme.identify(hashed_str):
+                return scheme
+        return None
+
+    def hash(self, password: Union[str, bytes]) -> str:
+        """Hash a password with the target scheme and cost."""
+        return self.target.hash(password, self.target_cost)
+
+    def verify(self, password: Union[str, bytes], hashed: Union[str, bytes]) -> bool:
+        """Verify a password with the scheme that produced the stored hash."""
+        if not password or not hashed:
+            return False
+        scheme = self.identify(hashed)
+        if scheme is None:
+            return False
+        return scheme.verify(password, _to_str(hashed))
+
+    def needs_update(self, hashed: Union[str, bytes]) -> bool:
+        """Return True if the hash uses another scheme or a lower cost than the target."""
+        hashed_str = _to_str(hashed)
+        scheme = self.identify(hashed_str)
+        if scheme is not self.target:
+            return True
+        if self.target_cost is None:
+            return False
+        cost = scheme.cost(hashed_str)
+        return cost is not None and cost < self.target_cost
+
+    def verify_and_update(self, password: Union[str, bytes], hashed: Union[str, bytes]) -> Tuple[bool, Optional[str]]:
+        """
+        Verify a password and, if it matches a legacy or low-cost hash,
+        return a replacement hash to store.
+
+        Returns:
+            (valid, new_hash) where new_hash is None if no upgrade is needed
+        """
+        if not self.verify(password, hashed):
+            return False, None
+        if self.needs_update(hashed):
+            return True, self.hash(password)
+        return True, None
+
+
+def calibrate_bcrypt_cost(budget_ms: float, min_cost: int = 10, max_cost: int = 16) -> Tuple[int, Dict[int, float]]:
+    """
+    Pick the highest bcrypt cost whose hash time fits a latency budget on
+    this machine. Each cost step doubles the work, so costs above the first
+    one over budget are not measured.
+
+    Returns:
+        (recommended cost, {cost: measured milliseconds})
+    """
+    scheme = BcryptScheme()
+    timings: Dict[int, float] = {}
+    recommended = min_cost
+    for cost in range(min_cost, max_cost + 1):
+        start = time.perf_counter()
+        scheme.hash("calibration-password", cost)
+        timings[cost] = (time.perf_counter() - start) * 1000
+        if timings[cost] > budget_ms:
+            break
+        recommended = cost
+    return recommended, timings
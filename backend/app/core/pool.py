@@ -0,0 +1,138 @@
+"""
+Connection pool instrumentation, warm-up and telemetry.
+
+The instrumented pool classes time every checkout that has to go through
+the pool queue, so we can see how long requests wait for a connection and
+how often they give up (pool timeout) when sizing DB_POOL_SIZE and
+DB_MAX_OVERFLOW.
+"""
+
+import asyncio
+import threading
+import time
+from typing import Dict, Optional
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+from .metrics import LatencyHistogram
+
+# Checkout waits are normally sub-millisecond; the tail is what matters
+POOL_WAIT_BUCKETS_MS = (0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000, 5000, 30000)
+
+
+class PoolMetrics:
+    """Counters and checkout wait-time histogram for one pool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.wait_time = LatencyHistogram(POOL_WAIT_BUCKETS_MS)
+        self.checkouts = 0
+        self.timeouts = 0
+
+    def record_checkout(self, wait_ms: float, timed_out: bool) -> None:
+        self.wait_time.observe(wait_ms)
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+
+
+class PoolInstrumentation:
+    """Mixin for QueuePool subclasses that records checkout waits and timeouts."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            timed_out = True
+            raise
+        finally:
+            self.metrics.record_checkout((time.perf_counter() - start) * 1000, timed_out)
+
+    def recreate(self):
+        # engine.dispose() recreates the pool; keep the history
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+class InstrumentedQueuePool(PoolInstrumentation, QueuePool):
+    """QueuePool with checkout metrics."""
+
+
+class InstrumentedAsyncAdaptedQueuePool(PoolInstrumentation, AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool with checkout metrics."""
+
+
+def pool_snapshot(pool: Pool) -> Dict:
+    """Return gauges and metrics for a pool as a JSON-serializable dictionary."""
+    data: Dict = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        data.update({
+            "size": pool.size(),
+            "max_overflow": pool._max_overflow,
+            "timeout_seconds": pool.timeout(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            # QueuePool counts overflow from -size; only report connections beyond size
+            "overflow": max(0, pool.overflow()),
+        })
+    else:
+        data["status"] = pool.status()
+    metrics: Optional[PoolMetrics] = getattr(pool, "metrics", None)
+    if metrics is not None:
+        data.update({
+            "checkouts": metrics.checkouts,
+            "checkout_timeouts": metrics.timeouts,
+            "checkout_wait": metrics.wait_time.snapshot(),
+        })
+    return data
+
+
+def _warm_up_count(pool: Pool, connections: int) -> int:
+    # Only queue pools keep idle connections around; never open more than they keep
+    if not isinstance(pool, QueuePool):
+        return 0
+    return max(0, min(connections, pool.size()))
+
+
+def warm_up_pool(engine, connections: int) -> int:
+    """
+    Open up to `connections` connections at once and return them to the pool,
+    so the first requests after start-up don't pay connection setup.
+
+    Returns:
+        Number of connections opened
+    """
+    opened = []
+    try:
+        for _ in range(_warm_up_count(engine.pool, connections)):
+            opened.append(engine.connect())
+    finally:
+        for conn in opened:
+            conn.close()
+    return len(opened)
+
+
+async def warm_up_async_pool(async_engine, connections: int) -> int:
+    """Async-engine counterpart of warm_up_pool."""
+    count = _warm_up_count(async_engine.sync_engine.pool, connections)
+    results = await asyncio.gather(
+        *(async_engine.connect().start() for _ in range(count)),
+        return_exceptions=True,
+    )
+    opened = [conn for conn in results if not isinstance(conn, BaseException)]
+    for conn in opened:
+        await conn.close()
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    return len(opened)
@@ -0,0 +1,68 @@
+"""
+Cache of authenticated users for get_current_user.
+
+Entries are keyed by (user id, token signature) and hold a detached User
+row, so protected endpoints skip the per-request user lookup. Any flushed
+update or delete of a User drops that user's entries; bulk deletes that
+bypass the ORM (admin endpoints) must call `clear_principals`.
+"""
+
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from .cache import TTLCache
+from .config import settings
+from ..models.user import User
+
+principal_cache = TTLCache(
+    max_size=settings.PRINCIPAL_CACHE_MAX_SIZE,
+    ttl_seconds=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+)
+
+
+def token_signature(token: str) -> str:
+    """Return the signature segment of a JWT."""
+    return token.rsplit(".", 1)[-1]
+
+
+def get_cached_principal(user_id: int, token: str) -> Optional[User]:
+    """Return the cached user for this token, if any."""
+    return principal_cache.get((user_id, token_signature(token)))
+
+
+def cache_principal(user: User, token: str) -> None:
+    """Cache an active user loaded for this token."""
+    principal_cache.set((user.id, token_signature(token)), user)
+
+
+def invalidate_user(user_id: int) -> None:
+    """Drop every cached principal for a user (all of their tokens)."""
+    principal_cache.discard_where(lambda key: key[0] == user_id)
+
+
+def clear_principals() -> None:
+    """Drop all cached principals."""
+    principal_cache.clear()
+
+
+@event.listens_for(Session, "after_flush")
+def _invalidate_changed_users(session, flush_context):
+    """Invalidate users updated or deleted in this flush, and again on commit."""
+    changed = {
+        obj.id for obj in list(session.dirty) + list(session.deleted)
+        if isinstance(obj, User) and obj.id is not None
+    }
+    if not changed:
+        return
+    for user_id in changed:
+        invalidate_user(user_id)
+    session.info.setdefault("invalidated_user_ids", set()).update(changed)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_users(session):
+    # A concurrent request may have re-cached the old row between flush and commit
+    for user_id in session.info.pop("invalidated_user_ids", ()):
+        invalidate_user(user_id)
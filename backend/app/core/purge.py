@@ -0,0 +1,126 @@
+"""
+Bulk data removal that doesn't hold long table locks.
+
+`purge_all` empties every application table. On PostgreSQL that is one
+`TRUNCATE ... RESTART IDENTITY`, which doesn't scan the tables; where
+TRUNCATE isn't available (SQLite, or a role without the privilege) rows
+are deleted in batches of PURGE_BATCH_SIZE, each in its own short
+transaction, children before parents.
+
+`purge_user` removes one account the same way: the user is deactivated
+first so no new rows appear, then their rows are deleted in batches from
+every table with a user_id column (through the per-user indexes), and
+finally the user row itself. Other users' rows are never locked.
+
+Both report progress through an optional callback called after each
+TRUNCATE or batch with the table name and the rows removed from it so far
+(None for a TRUNCATE).
+"""
+
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import Table, delete, select, tuple_, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import ProgrammingError
+
+from .config import settings
+from .database import Base
+from .principal_cache import invalidate_user
+from .stats_cache import stats_cache
+from ..models import task  # noqa: F401  Register every table with Base
+from ..models.user import User
+
+ProgressCallback = Callable[[str, Optional[int]], None]
+
+
+def _tables_children_first() -> List[Table]:
+    return list(reversed(Base.metadata.sorted_tables))
+
+
+def _delete_in_batches(
+    bind: Engine,
+    table: Table,
+    where=None,
+    batch_size: Optional[int] = None,
+    progress: Optional[ProgressCallback] = None,
+) -> int:
+    """Delete the rows matching `where` a batch at a time; returns the rows deleted."""
+    batch_size = batch_size or settings.PURGE_BATCH_SIZE
+    key_columns = list(table.primary_key.columns)
+    key = key_columns[0] if len(key_columns) == 1 else tuple_(*key_columns)
+    batch = select(*key_columns).limit(batch_size)
+    if where is not None:
+        batch = batch.where(where)
+    statement = delete(table).where(key.in_(batch))
+
+    deleted = 0
+    while True:
+        with bind.begin() as conn:
+            count = conn.execute(statement).rowcount
+        deleted += count
+        if progress is not None:
+            progress(table.name, deleted)
+        if count < batch_size:
+            return deleted
+
+
+def purge_all(
+    bind: Engine,
+    batch_size: Optional[int] = None,
+    progress: Optional[ProgressCallback] = None,
+) -> Dict[str, Optional[int]]:
+    """
+    Remove every row from the application tables, keeping the schema.
+
+    Returns the rows deleted per table (None for truncated tables, which
+    aren't counted).
+    """
+    tables = _tables_children_first()
+    if bind.dialect.name == "postgresql":
+        names = ", ".join(bind.dialect.identifier_preparer.format_table(table) for table in tables)
+        try:
+            with bind.begin() as conn:
+                conn.exec_driver_sql(f"TRUNCATE TABLE {names} RESTART IDENTITY")
+        except ProgrammingError:
+            # No TRUNCATE privilege; fall back to deleting
+            pass
+        else:
+            if progress is not None:
+                for table in tables:
+                    progress(table.name, None)
+            stats_cache.invalidate_all()
+            return {table.name: None for table in tables}
+
+    deleted = {table.name: _delete_in_batches(bind, table, None, batch_size, progress) for table in tables}
+    # Ids are handed out again from the start
+    stats_cache.invalidate_all()
+    return deleted
+
+
+def purge_user(
+    bind: Engine,
+    user_id: int,
+    batch_size: Optional[int] = None,
+    progress: Optional[ProgressCallback] = None,
+) -> Optional[Dict[str, int]]:
+    """
+    Remove a user and all of their rows.
+
+    Returns the rows deleted per table, or None if there is no such user.
+    """
+    users = User.__table__
+    with bind.begin() as conn:
+        found = conn.execute(update(users).where(users.c.id == user_id).values(is_active=False)).rowcount
+    if not found:
+        return None
+    # Cached principals would still let the user's requests through
+    invalidate_user(user_id)
+    # A new user may get the id again
+    stats_cache.invalidate([user_id])
+
+    counts = {}
+    for table in _tables_children_first():
+        if table is not users and "user_id" in table.c:
+            counts[table.name] = _delete_in_batches(bind, table, table.c.user_id == user_id, batch_size, progress)
+    counts[users.name] = _delete_in_batches(bind, users, users.c.id == user_id, batch_size, progress)
+    return counts
@@ -0,0 +1,267 @@
+"""
+Token-bucket admission control for the CPU-heavy auth endpoints.
+
+Every login or registration attempt takes one token from a bucket per
+identity (client address, username, email). A request is rejected before
+any database lookup or password hashing if any of its buckets is empty.
+Buckets refill continuously at `attempts / window` tokens per second.
+
+Buckets live in process memory by default. Setting AUTH_RATE_LIMIT_STORE_PATH
+keeps them in a local SQLite file instead, so the limits hold across all
+uvicorn workers on the host. Async handlers call `RateLimiter.hit_async`,
+which runs the SQLite store (whose takes can wait for the file lock) in
+the threadpool.
+"""
+
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from .config import settings
+
+# (key, capacity, refill tokens per second)
+BucketSpec = Tuple[str, float, float]
+
+
+class MemoryBucketStore:
+    """Per-process token buckets with LRU eviction of idle keys."""
+
+    name = "memory"
+    blocking = False
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    def take(self, specs: List[BucketSpec], now: float) -> Optional[float]:
+        """
+        Take one token from every bucket, or none if any bucket is empty.
+
+        Returns:
+            None if admitted, otherwise seconds until a token is available
+        """
+        with self._lock:
+            levels = []
+            retry_after = 0.0
+            for key, capacity, rate in specs:
+                tokens, updated_at = self._buckets.get(key, (capacity, now))
+                tokens = min(capacity, tokens + (now - updated_at) * rate)
+                levels.append(tokens)
+                if tokens < 1:
+                    retry_after = max(retry_after, (1 - tokens) / rate)
+            if retry_after > 0:
+                return retry_after
+            for (key, _capacity, _rate), tokens in zip(specs, levels):
+                self._buckets[key] = (tokens - 1, now)
+                self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return None
+
+    def size(self) -> int:
+        with self._lock:
+            return len(self._buckets)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+
+class SQLiteBucketStore:
+    """
+    Token buckets in a local SQLite file shared by every worker process.
+    Each take runs in a single IMMEDIATE transaction, so concurrent workers
+    cannot both spend the last token; it blocks while another holds the
+    file lock (up to the 5 s busy timeout).
+    """
+
+    name = "sqlite"
+    blocking = True
+
+    def __init__(self, path: str, idle_seconds: float = 3600):
+        self.path = path
+        self.idle_seconds = idle_seconds
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._takes = 0
+        self._connect().execute(
+            "CREATE TABLE IF NOT EXISTS rate_limit_buckets ("
+            "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def take(self, specs: List[BucketSpec], now: float) -> Optional[float]:
+        """Same contract as MemoryBucketStore.take."""
+        conn = self._connect()
+        keys = [key for key, _capacity, _rate in specs]
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = dict(
+                (key, (tokens, updated_at)) for key, tokens, updated_at in conn.execute(
+                    f"SELECT key, tokens, updated_at FROM rate_limit_buckets "
+                    f"WHERE key IN ({','.join('?' * len(keys))})",
+                    keys,
+                )
+            )
+            levels = []
+            retry_after = 0.0
+            for key, capacity, rate in specs:
+                tokens, updated_at = rows.get(key, (capacity, now))
+                tokens = min(capacity, tokens + (now - updated_at) * rate)
+                levels.append(tokens)
+                if tokens < 1:
+                    retry_after = max(retry_after, (1 - tokens) / rate)
+            if retry_after == 0:
+                conn.executemany(
+                    "INSERT INTO rate_limit_buckets (key, tokens, updated_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated_at = excluded.updated_at",
+                    [(key, tokens - 1, now) for key, tokens in zip(keys, levels)],
+                )
+            # Drop long-idle buckets every so often; they would be full anyway
+            with self._lock:
+                self._takes += 1
+                prune = self._takes % 1000 == 0
+            if prune:
+                conn.execute(
+                    "DELETE FROM rate_limit_buckets WHERE updated_at < ?",
+                    (now - self.idle_seconds,),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return retry_after or None
+
+    def size(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM rate_limit_buckets").fetchone()[0]
+
+    def clear(self) -> None:
+        self._connect().execute("DELETE FROM rate_limit_buckets")
+
+
+class RateLimiter:
+    """
+    Applies per-identity token buckets to one endpoint.
+
+    `rules` maps an identity kind (e.g. "ip", "username") to
+    (attempts, window_seconds).
+    """
+
+    def __init__(self, store, scope: str, rules: Dict[str, Tuple[int, float]], enabled: bool = True):
+        self.store = store
+        self.scope = scope
+        self.rules = rules
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._allowed = 0
+        self._rejected: Dict[str, int] = {kind: 0 for kind in rules}
+
+    def hit(self, **identities: Optional[str]) -> Optional[int]:
+        """
+        Record an attempt for the given identities (kind=value).
+
+        Returns:
+            None if the attempt is admitted, otherwise Retry-After seconds
+        """
+        if not self.enabled:
+            return None
+        specs = []
+        kinds = []
+        for kind, value in identities.items():
+            if not value or kind not in self.rules:
+                continue
+            attempts, window = self.rules[kind]
+            specs.append((f"{self.scope}:{kind}:{value.strip().lower()}", attempts, attempts / window))
+            kinds.append(kind)
+        if not specs:
+            return None
+
+        retry_after = self.store.take(specs, time.time())
+        with self._lock:
+            if retry_after is None:
+                self._allowed += 1
+                return None
+            for kind in kinds:
+                self._rejected[kind] += 1
+        return max(1, math.ceil(retry_after))
+
+    async def hit_async(self, **identities: Optional[str]) -> Optional[int]:
+        """`hit` for async handlers, off the event loop when the store blocks."""
+        if self.enabled and self.store.blocking:
+            return await run_in_threadpool(self.hit, **identities)
+        return self.hit(**identities)
+
+    def state(self) -> Dict:
+        """Return configuration and counters for monitoring."""
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "rules": {
+                    kind: {"attempts": attempts, "window_seconds": window}
+                    for kind, (attempts, window) in self.rules.items()
+                },
+                "allowed": self._allowed,
+                "rejected": sum(self._rejected.values()),
+                "rejected_by_kind": dict(self._rejected),
+            }
+
+    def reset(self) -> None:
+        """Clear counters (bucket state lives in the store)."""
+        with self._lock:
+            self._allowed = 0
+            self._rejected = {kind: 0 for kind in self.rules}
+
+
+def _create_store():
+    if settings.AUTH_RATE_LIMIT_STORE_PATH:
+        return SQLiteBucketStore(settings.AUTH_RATE_LIMIT_STORE_PATH)
+    return MemoryBucketStore()
+
+
+bucket_store = _create_store()
+
+_window = settings.AUTH_RATE_LIMIT_WINDOW_SECONDS
+
+login_limiter = RateLimiter(
+    bucket_store,
+    scope="login",
+    rules={
+        "ip": (settings.AUTH_RATE_LIMIT_IP_ATTEMPTS, _window),
+        "username": (settings.AUTH_RATE_LIMIT_ATTEMPTS, _window),
+    },
+    enabled=settings.AUTH_RATE_LIMIT_ENABLED,
+)
+
+register_limiter = RateLimiter(
+    bucket_store,
+    scope="register",
+    rules={
+        "ip": (settings.AUTH_RATE_LIMIT_IP_ATTEMPTS, _window),
+        "username": (settings.AUTH_RATE_LIMIT_ATTEMPTS, _window),
+        "email": (settings.AUTH_RATE_LIMIT_ATTEMPTS, _window),
+    },
+    enabled=settings.AUTH_RATE_LIMIT_ENABLED,
+)
+
+
+def rate_limit_state() -> Dict:
+    """Snapshot of every auth limiter and the shared bucket store."""
+    return {
+        "store": bucket_store.name,
+        "tracked_buckets": bucket_store.size(),
+        "login": login_limiter.state(),
+        "register": register_limiter.state(),
+    }
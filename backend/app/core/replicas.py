@@ -0,0 +1,120 @@
+"""
+Read-replica routing.
+
+When DATABASE_REPLICA_URLS is set, sessions handed out for read-only
+requests (GET/HEAD) send their SELECTs to a replica. Replicas are picked
+round-robin, one per session, so a request sees a single snapshot. Everything else stays on the primary:
+
+- any flush or INSERT/UPDATE/DELETE, and every statement after it in the
+  same session, so a request always reads its own writes;
+- every statement of a non-read-only request.
+
+A replica whose connection fails is ejected for DB_REPLICA_EJECT_SECONDS
+and then tried again; with no healthy replica, reads go to the primary.
+The statement that hit the failure still fails - the next request is routed
+elsewhere.
+"""
+
+import threading
+import time
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+
+from .pool import pool_snapshot
+
+# Session.info keys
+REPLICAS_KEY = "replicas"
+READ_ONLY_KEY = "read_only"
+WROTE_KEY = "wrote"
+REPLICA_KEY = "replica"
+
+# Request methods whose sessions may read from a replica
+READ_ONLY_METHODS = ("GET", "HEAD")
+
+
+class ReplicaSet:
+    """Round-robin over replica engines, skipping ejected ones."""
+
+    def __init__(self, engines: List[Engine], eject_seconds: float):
+        self.engines = list(engines)
+        self.eject_seconds = eject_seconds
+        self._lock = threading.Lock()
+        self._next = 0
+        self._ejected_until: Dict[int, float] = {}
+        self._ejections: Dict[int, int] = {}
+        self._reads: Dict[int, int] = {}
+        for engine in self.engines:
+            event.listen(engine, "handle_error", self._on_error)
+
+    def choose(self) -> Optional[Engine]:
+        """Next healthy replica, or None if all of them are ejected."""
+        now = time.monotonic()
+        with self._lock:
+            for _ in range(len(self.engines)):
+                engine = self.engines[self._next]
+                self._next = (self._next + 1) % len(self.engines)
+                if self._ejected_until.get(id(engine), 0) <= now:
+                    self._reads[id(engine)] = self._reads.get(id(engine), 0) + 1
+                    return engine
+        return None
+
+    def eject(self, engine: Engine) -> None:
+        """Take a replica out of rotation for eject_seconds."""
+        with self._lock:
+            self._ejected_until[id(engine)] = time.monotonic() + self.eject_seconds
+            self._ejections[id(engine)] = self._ejections.get(id(engine), 0) + 1
+
+    def _on_error(self, context) -> None:
+        # Connection problems (refused, dropped, replica restarting) eject the
+        # replica; ordinary statement errors say nothing about its health
+        if (
+            context.is_disconnect
+            or context.connection is None
+            or isinstance(context.sqlalchemy_exception, OperationalError)
+        ):
+            self.eject(context.engine)
+
+    def status(self) -> List[Dict]:
+        """Per-replica health, routing counters and pool gauges."""
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    "url": engine.url.render_as_string(hide_password=True),
+                    "healthy": self._ejected_until.get(id(engine), 0) <= now,
+                    "reads": self._reads.get(id(engine), 0),
+                    "ejections": self._ejections.get(id(engine), 0),
+                    "pool": pool_snapshot(engine.pool),
+                }
+                for engine in self.engines
+            ]
+
+
+class RoutingSession(Session):
+    """
+    Session that sends reads to a replica when its info has a ReplicaSet
+    under REPLICAS_KEY and READ_ONLY_KEY is set (see route_reads).
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        primary = super().get_bind(mapper=mapper, clause=clause, **kw)
+        replicas: Optional[ReplicaSet] = self.info.get(REPLICAS_KEY)
+        if replicas is None or not self.info.get(READ_ONLY_KEY) or self.info.get(WROTE_KEY):
+            return primary
+        if self._flushing or not isinstance(clause, Select):
+            # A write (or anything we can't tell is a read): stick to the primary
+            self.info[WROTE_KEY] = True
+            return primary
+        if REPLICA_KEY not in self.info:
+            self.info[REPLICA_KEY] = replicas.choose()
+        return self.info[REPLICA_KEY] or primary
+
+
+def route_reads(db, method: str) -> None:
+    """Let a request's session read from replicas if the method is read-only."""
+    db.info[READ_ONLY_KEY] = method.upper() in READ_ONLY_METHODS
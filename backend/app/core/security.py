@@ -2,89 +2,58 @@
 Security utilities for password hashing and JWT token management.
 """
 
+import time
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 from jose import JWTError, jwt
-import bcrypt
+from ..core.cache import TTLCache
 from ..core.config import settings
+from ..core.password_policy import PasswordPolicy, BcryptScheme, PasslibScheme
 
 # Bcrypt rounds (12 is a good balance between security and performance)
-BCRYPT_ROUNDS = 12
+BCRYPT_ROUNDS = settings.BCRYPT_ROUNDS
+
+# New hashes use bcrypt at BCRYPT_ROUNDS; other schemes are only verified
+# and get upgraded on the next successful login
+password_policy = PasswordPolicy(
+    schemes=[BcryptScheme(), PasslibScheme()],
+    target_scheme="bcrypt",
+    target_cost=BCRYPT_ROUNDS,
+)
+
+# Verified token payloads, keyed by the raw token string
+token_cache = TTLCache(
+    max_size=settings.TOKEN_CACHE_MAX_SIZE,
+    ttl_seconds=settings.TOKEN_CACHE_TTL_SECONDS,
+)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
     Verify a plain password against a hashed password.
-    Supports both bcrypt direct and passlib formats.
+    The stored hash's scheme is detected from its prefix and verified
+    with the matching backend.
     """
-    if not plain_password or not hashed_password:
-        return False
-    
-    # Ensure password is a string
-    if isinstance(plain_password, bytes):
-        password_str = plain_password.decode('utf-8')
-    else:
-        password_str = str(plain_password)
-    
-    # Ensure hashed_password is a string
-    if isinstance(hashed_password, bytes):
-        hashed_str = hashed_password.decode('utf-8')
-    else:
-        hashed_str = str(hashed_password)
-    
-    # Try bcrypt direct first (for new hashes)
-    try:
-        password_bytes = password_str.encode('utf-8')
-        hashed_bytes = hashed_str.encode('utf-8')
-        result = bcrypt.checkpw(password_bytes, hashed_bytes)
-        if result:
-            return True
-    except Exception as e:
-        # Log the error for debugging but continue to try passlib
-        print(f"Bcrypt direct verification failed: {e}")
-    
-    # Fallback: try with passlib (for old hashes or if bcrypt fails)
-    try:
-        from passlib.context import CryptContext
-        pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-        result = pwd_context.verify(password_str, hashed_str)
-        if result:
-            return True
-    except Exception as e:
-        print(f"Passlib verification failed: {e}")
-        return False
+    return password_policy.verify(plain_password, hashed_password)
+
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password and return a replacement hash if the stored one uses
+    a legacy scheme or a cost below BCRYPT_ROUNDS.
     
-    return False
+    Returns:
+        (valid, new_hash) where new_hash is None if no upgrade is needed
+    """
+    return password_policy.verify_and_update(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
     """
-    Hash a password using bcrypt.
-    Bcrypt has a 72 byte limit, so we ensure the password is properly handled.
+    Hash a password using bcrypt at the configured cost.
+    Bcrypt has a 72 byte limit, so longer passwords are truncated.
     """
-    # Ensure password is a string and encode to bytes
-    if isinstance(password, bytes):
-        password_bytes = password
-    else:
-        password_str = str(password)
-        password_bytes = password_str.encode('utf-8')
-    
-    # Bcrypt has a 72 byte limit - truncate if necessary
-    if len(password_bytes) > 72:
-        password_bytes = password_bytes[:72]
-    
-    try:
-        # Generate salt and hash password
-        salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
-        hashed = bcrypt.hashpw(password_bytes, salt)
-        # Return as string (decode from bytes)
-        return hashed.decode('utf-8')
-    except Exception as e:
-        # Fallback: try with passlib if bcrypt fails
-        from passlib.context import CryptContext
-        pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-        password_str = password_bytes.decode('utf-8', errors='ignore')
-        return pwd_context.hash(password_str)
+    return password_policy.hash(password)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -113,16 +82,28 @@ def decode_access_token(token: str) -> Optional[dict]:
     """
     Decode and verify a JWT access token.
     
+    Verified payloads are cached until the token's `exp` claim (or the cache
+    TTL, whichever comes first), so repeated requests with the same bearer
+    token skip parsing and signature verification.
+    
     Args:
         token: JWT token string
         
     Returns:
         Decoded token data if valid, None otherwise
     """
+    cached = token_cache.get(token)
+    if cached is not None:
+        return dict(cached)
+    
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
-        return payload
     except JWTError as e:
         # Only log errors, not successful operations
         return None
+    
+    exp = payload.get("exp")
+    if isinstance(exp, (int, float)):
+        token_cache.set(token, dict(payload), ttl=exp - time.time())
+    return payload
 
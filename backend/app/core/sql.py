@@ -0,0 +1,104 @@
+"""
+Portable SQL expressions for the dialects we run on (PostgreSQL, SQLite).
+"""
+
+from typing import Callable, Optional
+
+from sqlalchemy import Date, DateTime, Integer, case, func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+from sqlalchemy.sql.visitors import InternalTraversal
+
+# insert() constructs with ON CONFLICT support
+_UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def upsert_insert(dialect_name: str) -> Optional[Callable]:
+    """The dialect's insert() with on_conflict_do_nothing/do_update, if it has one."""
+    return _UPSERT_INSERTS.get(dialect_name)
+
+
+def count_if(condition):
+    """COUNT of the rows meeting `condition`, for single-pass aggregates."""
+    return func.count(case((condition, 1)))
+
+
+def sum_if(condition, value):
+    """SUM of `value` over the rows meeting `condition` (0 when there are none)."""
+    return func.coalesce(func.sum(case((condition, value))), 0)
+
+
+class minutes_between(FunctionElement):
+    """
+    Whole minutes from `start` to `end` (two DateTime expressions),
+    truncated like `int(timedelta.total_seconds() / 60)`.
+    """
+    type = Integer()
+    name = "minutes_between"
+    inherit_cache = True
+
+
+@compiles(minutes_between)
+def _minutes_between(element, compiler, **kw):
+    start, end = (compiler.process(clause, **kw) for clause in element.clauses)
+    return f"CAST(FLOOR(EXTRACT(EPOCH FROM ({end} - {start})) / 60) AS INTEGER)"
+
+
+@compiles(minutes_between, "sqlite")
+def _minutes_between_sqlite(element, compiler, **kw):
+    start, end = (compiler.process(clause, **kw) for clause in element.clauses)
+    # julianday() is a float in days; rounding to milliseconds first keeps
+    # exact minutes exact. CAST truncates towards zero.
+    return f"CAST(ROUND((julianday({end}) - julianday({start})) * 86400000) / 60000 AS INTEGER)"
+
+
+class utc_date(FunctionElement):
+    """Calendar date of a (naive UTC) DateTime expression."""
+    type = Date()
+    name = "utc_date"
+    inherit_cache = True
+
+
+@compiles(utc_date)
+def _utc_date(element, compiler, **kw):
+    return f"CAST({compiler.process(element.clauses, **kw)} AS DATE)"
+
+
+@compiles(utc_date, "sqlite")
+def _utc_date_sqlite(element, compiler, **kw):
+    # Same 'YYYY-MM-DD' text the Date type stores
+    return f"date({compiler.process(element.clauses, **kw)})"
+
+
+class datetime_trunc(FunctionElement):
+    """
+    A (naive UTC) DateTime expression truncated to the start of its
+    "hour" or "day": datetime_trunc("hour", column).
+    """
+    type = DateTime()
+    name = "datetime_trunc"
+    inherit_cache = True
+    # The unit is part of the statement cache key
+    _traverse_internals = FunctionElement._traverse_internals + [("unit", InternalTraversal.dp_string)]
+
+    def __init__(self, unit, expression):
+        if unit not in _TRUNC_FORMATS:
+            raise ValueError(f"Unsupported unit: {unit}")
+        self.unit = unit
+        super().__init__(expression)
+
+
+# SQLite keeps the text the DateTime type stores, so truncated values
+# compare equal to the same instants bound from Python
+_TRUNC_FORMATS = {"hour": "%Y-%m-%d %H:00:00.000000", "day": "%Y-%m-%d 00:00:00.000000"}
+
+
+@compiles(datetime_trunc)
+def _datetime_trunc(element, compiler, **kw):
+    return f"date_trunc('{element.unit}', {compiler.process(element.clauses, **kw)})"
+
+
+@compiles(datetime_trunc, "sqlite")
+def _datetime_trunc_sqlite(element, compiler, **kw):
+    return f"strftime('{_TRUNC_FORMATS[element.unit]}', {compiler.process(element.clauses, **kw)})"
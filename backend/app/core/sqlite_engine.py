@@ -0,0 +1,93 @@
+"""
+SQLite engine setup for small single-host deployments.
+
+File databases get a real connection pool (one connection per concurrent
+request instead of one shared StaticPool connection) and every new
+connection is tuned with PRAGMAs from the SQLITE_* settings:
+
+- journal_mode=WAL: readers never block the writer and vice versa
+- synchronous=NORMAL: safe with WAL, fsyncs only at checkpoints
+- cache_size / mmap_size: keep hot pages in memory
+- busy_timeout: wait for the write lock instead of failing with
+  "database is locked"
+
+pysqlite only opens a transaction right before the first INSERT/UPDATE/
+DELETE, so a writer waiting on busy_timeout never holds an older read
+snapshot that would make the wait pointless.
+
+In-memory databases keep StaticPool: each new connection would otherwise
+see its own, empty, database.
+"""
+
+from typing import Any, Dict, List, Tuple
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import StaticPool
+
+from .config import settings
+from .pool import InstrumentedAsyncAdaptedQueuePool, InstrumentedQueuePool
+
+
+def is_memory_database(url: str) -> bool:
+    """True for sqlite:// and sqlite:///:memory: style URLs."""
+    database = make_url(url).database
+    return not database or database == ":memory:" or "mode=memory" in url
+
+
+def sqlite_pragmas() -> List[Tuple[str, Any]]:
+    """PRAGMAs applied to every new SQLite connection, in order."""
+    return [
+        ("journal_mode", settings.SQLITE_JOURNAL_MODE),
+        ("synchronous", settings.SQLITE_SYNCHRONOUS),
+        # Negative cache_size is in KiB rather than pages
+        ("cache_size", -settings.SQLITE_CACHE_SIZE_KB),
+        ("mmap_size", settings.SQLITE_MMAP_SIZE_MB * 1024 * 1024),
+        ("busy_timeout", settings.SQLITE_BUSY_TIMEOUT_MS),
+    ]
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """`connect` event handler that applies sqlite_pragmas()."""
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in sqlite_pragmas():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
+def _pool_arguments(url: str, pool_options: Dict[str, Any], poolclass) -> Dict[str, Any]:
+    if is_memory_database(url):
+        return {"poolclass": StaticPool}
+    return {"poolclass": poolclass, **pool_options}
+
+
+def create_sqlite_engine(url: str, pool_options: Dict[str, Any]) -> Engine:
+    """Sync engine for a SQLite URL with pooling and PRAGMAs configured."""
+    engine = create_engine(
+        url,
+        # Pooled connections move between request threads; the pool makes
+        # sure only one thread uses a connection at a time
+        connect_args={
+            "check_same_thread": False,
+            "timeout": settings.SQLITE_BUSY_TIMEOUT_MS / 1000,
+        },
+        echo=False,
+        **_pool_arguments(url, pool_options, InstrumentedQueuePool)
+    )
+    event.listen(engine, "connect", set_sqlite_pragmas)
+    return engine
+
+
+def create_async_sqlite_engine(url: str, pool_options: Dict[str, Any]):
+    """aiosqlite counterpart of create_sqlite_engine."""
+    from sqlalchemy.ext.asyncio import create_async_engine
+    async_engine = create_async_engine(
+        url,
+        connect_args={"timeout": settings.SQLITE_BUSY_TIMEOUT_MS / 1000},
+        echo=False,
+        **_pool_arguments(url, pool_options, InstrumentedAsyncAdaptedQueuePool)
+    )
+    event.listen(async_engine.sync_engine, "connect", set_sqlite_pragmas)
+    return async_engine
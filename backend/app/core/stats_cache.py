@@ -0,0 +1,247 @@
+"""
+Cache of the per-user statistics responses (/stats/*).
+
+Entries hold a rendered JSON body and its ETag, keyed by the user, the
+user's statistics version and the endpoint. Every write that can change
+a user's statistics marks its session (`stats_changed`, called by
+add_user_stats), and the user's version is bumped once that transaction
+commits: later requests look up a new key and recompute, while entries
+of old versions just age out of the LRU. The version is read before
+computing, so a response computed concurrently with a write is stored
+under the old version and never served after the commit.
+
+Versions live in process memory by default. Setting STATS_CACHE_STORE_PATH
+keeps them in a local SQLite file instead, so a write handled by one
+uvicorn worker invalidates the entries of every worker on the host (each
+worker still caches its own bodies).
+
+Concurrent misses for the same entry compute it once: the first request
+computes, the others wait for its result (awaiting in async database
+mode, where handlers share the event loop).
+"""
+
+import asyncio
+import hashlib
+import sqlite3
+import threading
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from sqlalchemy.util import await_only
+
+from .cache import TTLCache
+from .config import settings
+
+# (generation, user version); the generation changes when every user's data goes
+Version = Tuple[int, int]
+
+
+class MemoryVersionStore:
+    """Per-process statistics versions."""
+
+    name = "memory"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._versions: Dict[int, int] = {}
+
+    def version(self, user_id: int) -> Version:
+        with self._lock:
+            return self._generation, self._versions.get(user_id, 0)
+
+    def bump(self, user_ids: Iterable[int]) -> None:
+        with self._lock:
+            for user_id in user_ids:
+                self._versions[user_id] = self._versions.get(user_id, 0) + 1
+
+    def bump_all(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._versions.clear()
+
+
+class SQLiteVersionStore:
+    """
+    Statistics versions in a local SQLite file shared by every worker
+    process. The generation is stored as the row of user_id 0.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._connect().execute(
+            "CREATE TABLE IF NOT EXISTS stats_versions (user_id INTEGER PRIMARY KEY, version INTEGER NOT NULL)"
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def version(self, user_id: int) -> Version:
+        rows = dict(self._connect().execute(
+            "SELECT user_id, version FROM stats_versions WHERE user_id IN (0, ?)", (user_id,)
+        ).fetchall())
+        return rows.get(0, 0), rows.get(user_id, 0)
+
+    def bump(self, user_ids: Iterable[int]) -> None:
+        self._connect().executemany(
+            "INSERT INTO stats_versions (user_id, version) VALUES (?, 1) "
+            "ON CONFLICT(user_id) DO UPDATE SET version = version + 1",
+            [(user_id,) for user_id in user_ids],
+        )
+
+    def bump_all(self) -> None:
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM stats_versions WHERE user_id <> 0")
+            conn.execute(
+                "INSERT INTO stats_versions (user_id, version) VALUES (0, 1) "
+                "ON CONFLICT(user_id) DO UPDATE SET version = version + 1"
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+
+class _Flight:
+    """A computation other requests for the same entry can wait for."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Optional[Tuple[bytes, str]] = None
+
+
+class StatsCache:
+    """
+    Rendered statistics bodies by (user, version, key), with single-flight
+    computation of misses. Waiters give up after `wait_seconds` and
+    compute the body themselves.
+    """
+
+    def __init__(self, entries: TTLCache, versions, wait_seconds: float = 10.0):
+        self.entries = entries
+        self.versions = versions
+        self.wait_seconds = wait_seconds
+        self._lock = threading.Lock()
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._coalesced = 0
+
+    def get_or_compute(self, user_id: int, key: Hashable, compute: Callable[[], Any]) -> Tuple[bytes, str]:
+        """The (body, ETag) of `key` for the user, computing it on a miss."""
+        if not self.entries.enabled:
+            return render(compute())
+        entry_key = (user_id, self.versions.version(user_id), key)
+        value = self.entries.get(entry_key)
+        if value is not None:
+            return value
+
+        with self._lock:
+            flight = self._flights.get(entry_key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[entry_key] = _Flight()
+            else:
+                self._coalesced += 1
+        if not leader:
+            if _wait(flight.done, self.wait_seconds) and flight.value is not None:
+                return flight.value
+            return render(compute())
+
+        try:
+            flight.value = render(compute())
+            self.entries.set(entry_key, flight.value)
+            return flight.value
+        finally:
+            with self._lock:
+                del self._flights[entry_key]
+            flight.done.set()
+
+    def invalidate(self, user_ids: Iterable[int]) -> None:
+        """Make the users' cached responses unreachable."""
+        user_ids = set(user_ids)
+        if user_ids:
+            self.versions.bump(user_ids)
+
+    def invalidate_all(self) -> None:
+        """Make every cached response unreachable (all workers, with a shared store)."""
+        self.versions.bump_all()
+        self.entries.clear()
+
+    def clear(self) -> None:
+        """Drop this process's entries."""
+        self.entries.clear()
+
+    def stats(self) -> Dict:
+        """Entry cache counters plus the version store and coalesced misses."""
+        with self._lock:
+            coalesced = self._coalesced
+        return {**self.entries.stats(), "version_store": self.versions.name, "coalesced_misses": coalesced}
+
+
+def _wait(done: threading.Event, timeout: float) -> bool:
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return done.wait(timeout)
+    # Async database mode runs handlers in a greenlet on the event loop: wait in a thread, not on the loop
+    return await_only(loop.run_in_executor(None, done.wait, timeout))
+
+
+def render(value: Any) -> Tuple[bytes, str]:
+    """The JSON body FastAPI would send for `value`, and its ETag."""
+    body = JSONResponse(jsonable_encoder(value)).body
+    return body, f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+def _create_versions():
+    if settings.STATS_CACHE_STORE_PATH:
+        return SQLiteVersionStore(settings.STATS_CACHE_STORE_PATH)
+    return MemoryVersionStore()
+
+
+stats_cache = StatsCache(
+    TTLCache(max_size=settings.STATS_CACHE_MAX_SIZE, ttl_seconds=settings.STATS_CACHE_TTL_SECONDS),
+    _create_versions(),
+)
+
+
+def cached_stats_response(request: Request, user_id: int, key: Hashable, compute: Callable[[], Any]) -> Response:
+    """
+    Response for a statistics endpoint: the cached (or computed) body with
+    its ETag, or 304 Not Modified when the request's If-None-Match has it.
+    """
+    body, etag = stats_cache.get_or_compute(user_id, key, compute)
+    # Clients revalidate every time; a 304 costs no queries while the entry lives
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in (tag.strip() for tag in if_none_match.split(",")) or if_none_match.strip() == "*":
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def stats_changed(db: Session, user_id: int) -> None:
+    """Invalidate the user's cached statistics when `db` commits."""
+    db.info.setdefault("stats_changed_user_ids", set()).add(user_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_stats(session):
+    stats_cache.invalidate(session.info.pop("stats_changed_user_ids", ()))
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back_stats(session):
+    session.info.pop("stats_changed_user_ids", None)
@@ -0,0 +1,473 @@
+"""
+Per-user statistics counters, hourly activity rollups and daily focus.
+
+user_stats holds each user's task counts by status and all-time session
+totals (live and archived sessions), so the dashboard reads one row
+however long the user's history is; user_stats_hourly holds the user's
+activity per UTC hour, so charts over any range read one row per active
+hour; user_activity packs the completed work sessions per day into one
+row for the heatmap and streaks (see app.core.activity). The task and
+pomodoro write paths add what they changed with `add_user_stats`, in the
+transaction of the write itself: the changes come from the rows their
+INSERT/UPDATE/DELETE ... RETURNING statements hand back (plus the
+previous values, read with FOR UPDATE, when an update can change a
+counted column). Archival moves sessions without changing the counters
+or the daily focus (their rollups move to the start of their day), and
+purges delete the rows along with the user's other rows. Each call also
+invalidates the user's cached statistics responses once the transaction
+commits.
+
+Writes that bypass the endpoints (scripts, manual SQL) make them drift;
+`verify_user_stats` reports the difference with the tables and
+`rebuild_user_stats` recomputes them (see maintain_stats.py).
+"""
+
+from collections import Counter, defaultdict
+from datetime import date, datetime, time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, delete, func, insert, select, update
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from .activity import ACTIVITY_STATS, DailyActivity, build_activity
+from .archive import ARCHIVE_TOTALS
+from .config import settings
+from .sql import count_if, datetime_trunc, sum_if, upsert_insert, utc_date
+from .stats_cache import stats_changed
+from ..models.task import (
+    PomodoroSession, PomodoroSessionArchive, Task, TaskStatus, UserActivity, UserStats, UserStatsHourly,
+)
+from ..models.user import User
+
+# Counter columns of user_stats
+USER_STATS = (
+    "tasks",
+    "todo_tasks",
+    "in_progress_tasks",
+    "done_tasks",
+    "sessions",
+    "completed_sessions",
+    "completed_minutes",
+    "timed_sessions",
+    "work_minutes",
+)
+
+# Rollup columns of user_stats_hourly
+HOURLY_STATS = ("sessions", "completed_sessions", "work_minutes", "tasks_completed")
+
+TASK_STATUS_STATS = {
+    TaskStatus.TODO: "todo_tasks",
+    TaskStatus.IN_PROGRESS: "in_progress_tasks",
+    TaskStatus.DONE: "done_tasks",
+}
+
+# Columns the counters and rollups depend on (to RETURN from writes)
+SESSION_STATS_COLUMNS = ("session_type", "completed_at", "actual_duration_minutes", "created_at")
+TASK_STATS_COLUMNS = ("id", "status", "completed_at")
+
+
+def truncate_hour(value: datetime) -> datetime:
+    """The start of the hour of `value` (a user_stats_hourly key)."""
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+class StatsChange:
+    """
+    What a write changes for one user: counter deltas (`totals`), rollup
+    deltas by hour (`hours`) and focus deltas by day (`days`). Changes of
+    several row sets are combined with `update`.
+    """
+
+    def __init__(self):
+        self.totals = Counter()
+        self.hours: Dict[datetime, Counter] = defaultdict(Counter)
+        self.days: Dict[date, Counter] = defaultdict(Counter)
+
+    def update(self, other: "StatsChange") -> None:
+        self.totals.update(other.totals)
+        for hour, counts in other.hours.items():
+            self.hours[hour].update(counts)
+        for day, counts in other.days.items():
+            self.days[day].update(counts)
+
+    def changed_hours(self) -> Dict[datetime, Counter]:
+        return {hour: counts for hour, counts in self.hours.items() if any(counts.values())}
+
+    def changed_days(self) -> Dict[date, Counter]:
+        return {day: counts for day, counts in self.days.items() if any(counts.values())}
+
+
+def task_changes(rows: Iterable, sign: int = 1) -> StatsChange:
+    """Changes for adding (sign=1) or removing (sign=-1) task rows (TASK_STATS_COLUMNS)."""
+    change = StatsChange()
+    for row in rows:
+        change.totals["tasks"] += sign
+        if row.status in TASK_STATUS_STATS:
+            change.totals[TASK_STATUS_STATS[row.status]] += sign
+        if row.status == TaskStatus.DONE and row.completed_at is not None:
+            change.hours[truncate_hour(row.completed_at)]["tasks_completed"] += sign
+    return change
+
+
+def completion_changes(row, sign: int = 1) -> StatsChange:
+    """Changes for the completion of a session row (none if it isn't completed)."""
+    change = StatsChange()
+    if row.completed_at is None:
+        return change
+    minutes = row.actual_duration_minutes or 0
+    work_minutes = minutes if row.session_type == "work" else 0
+    change.totals["completed_sessions"] += sign
+    change.totals["completed_minutes"] += sign * minutes
+    change.totals["timed_sessions"] += sign * (row.actual_duration_minutes is not None)
+    change.totals["work_minutes"] += sign * work_minutes
+    if row.created_at is not None:
+        hour = change.hours[truncate_hour(row.created_at)]
+        hour["completed_sessions"] += sign
+        hour["work_minutes"] += sign * work_minutes
+        if row.session_type == "work":
+            day = change.days[row.created_at.date()]
+            day["work_sessions"] += sign
+            day["work_minutes"] += sign * work_minutes
+    return change
+
+
+def session_changes(rows: Iterable, sign: int = 1) -> StatsChange:
+    """Changes for adding or removing session rows (SESSION_STATS_COLUMNS)."""
+    change = StatsChange()
+    for row in rows:
+        change.totals["sessions"] += sign
+        if row.created_at is not None:
+            change.hours[truncate_hour(row.created_at)]["sessions"] += sign
+        change.update(completion_changes(row, sign))
+    return change
+
+
+def archive_changes(rows: Iterable, sign: int = 1) -> StatsChange:
+    """Changes for adding or removing pomodoro_session_archive rows."""
+    change = StatsChange()
+    for row in rows:
+        work_minutes = row.completed_minutes if row.session_type == "work" else 0
+        for name in ARCHIVE_TOTALS:
+            change.totals[name] += sign * getattr(row, name)
+        change.totals["work_minutes"] += sign * work_minutes
+        hour = change.hours[datetime.combine(row.day, time.min)]
+        hour["sessions"] += sign * row.sessions
+        hour["completed_sessions"] += sign * row.completed_sessions
+        hour["work_minutes"] += sign * work_minutes
+        if row.session_type == "work":
+            day = change.days[row.day]
+            day["work_sessions"] += sign * row.completed_sessions
+            day["work_minutes"] += sign * work_minutes
+    return change
+
+
+def _add_rows(db: Session, table, keys: Tuple[str, ...], names: Tuple[str, ...], rows: List[Dict]) -> None:
+    """Add the `names` values of `rows` to the rows of `table` with the same `keys` (inserting missing ones)."""
+    upsert = upsert_insert(db.get_bind().dialect.name)
+    if upsert is None:
+        for row in rows:
+            changed = db.execute(
+                update(table)
+                .where(*(table.c[key] == row[key] for key in keys))
+                .values({name: table.c[name] + row[name] for name in names})
+            ).rowcount
+            if not changed:
+                db.execute(insert(table).values(row))
+        return
+    statement = upsert(table).values(rows)
+    db.execute(statement.on_conflict_do_update(
+        index_elements=[table.c[key] for key in keys],
+        set_={name: table.c[name] + statement.excluded[name] for name in names},
+    ))
+
+
+def _add_activity(db: Session, user_id: int, days: Dict[date, Counter]) -> None:
+    """Add the focus changes to the user's user_activity row, rewriting its arrays."""
+    table = UserActivity.__table__
+    # Locked for the read-modify-write of the arrays
+    locked = select(table).where(table.c.user_id == user_id).with_for_update()
+    row = db.execute(locked).first()
+    upsert = upsert_insert(db.get_bind().dialect.name)
+    if row is None and upsert is not None:
+        # Concurrent first writes then wait on the new row instead of colliding
+        db.execute(upsert(table).values(user_id=user_id, **DailyActivity(min(days)).values()).on_conflict_do_nothing(
+            index_elements=[table.c.user_id]
+        ))
+        row = db.execute(locked).first()
+    activity = DailyActivity.from_row(row)
+    for day, counts in sorted(days.items()):
+        activity.add(day, counts)
+    if row is None:
+        db.execute(insert(table).values(user_id=user_id, **activity.values()))
+    else:
+        db.execute(update(table).where(table.c.user_id == user_id).values(activity.values()))
+
+
+def add_user_stats(db: Session, user_id: int, change: StatsChange) -> None:
+    """
+    Apply `change` to the user's counters and rollups in the current
+    transaction (one upsert each, skipped when nothing changed), and to
+    the daily focus when work sessions were completed or removed.
+    """
+    stats_changed(db, user_id)
+    if any(change.totals.values()):
+        _add_rows(db, UserStats.__table__, ("user_id",), USER_STATS, [
+            {"user_id": user_id, **{name: change.totals[name] for name in USER_STATS}}
+        ])
+    hours = change.changed_hours()
+    if hours:
+        _add_rows(db, UserStatsHourly.__table__, ("user_id", "hour"), HOURLY_STATS, [
+            {"user_id": user_id, "hour": hour, **{name: counts[name] for name in HOURLY_STATS}}
+            for hour, counts in sorted(hours.items())
+        ])
+    days = change.changed_days()
+    if days:
+        _add_activity(db, user_id, days)
+
+
+def read_user_stats(db: Session, user_id: int) -> Counter:
+    """The user's counters (zeros when the user has no row yet)."""
+    table = UserStats.__table__
+    row = db.execute(select(table).where(table.c.user_id == user_id)).first()
+    return Counter({name: getattr(row, name) for name in USER_STATS} if row is not None else {})
+
+
+def read_activity(db: Session, user_id: int) -> DailyActivity:
+    """The user's daily focus (empty when the user has no row yet)."""
+    table = UserActivity.__table__
+    return DailyActivity.from_row(db.execute(select(table).where(table.c.user_id == user_id)).first())
+
+
+def compute_user_stats(conn: Connection, user_ids: Optional[List[int]] = None) -> Dict[int, Counter]:
+    """
+    The counters recomputed from the tables, by user.
+
+    One grouped query each over tasks, pomodoro_sessions and the archive;
+    users without tasks or sessions are left out.
+    """
+    tasks = Task.__table__
+    sessions = PomodoroSession.__table__
+    archive = PomodoroSessionArchive.__table__
+    completed = sessions.c.completed_at.isnot(None)
+    minutes = sessions.c.actual_duration_minutes
+    queries = [
+        (tasks, ("tasks", *TASK_STATUS_STATS.values()), [
+            func.count(),
+            *(count_if(tasks.c.status == status) for status in TASK_STATUS_STATS),
+        ]),
+        (sessions, ("sessions", *ARCHIVE_TOTALS[1:], "work_minutes"), [
+            func.count(),
+            count_if(completed),
+            sum_if(completed, minutes),
+            count_if(and_(completed, minutes.isnot(None))),
+            sum_if(and_(completed, sessions.c.session_type == "work"), minutes),
+        ]),
+        (archive, (*ARCHIVE_TOTALS, "work_minutes"), [
+            *(func.sum(archive.c[name]) for name in ARCHIVE_TOTALS),
+            sum_if(archive.c.session_type == "work", archive.c.completed_minutes),
+        ]),
+    ]
+
+    stats = {}
+    for table, names, columns in queries:
+        statement = select(table.c.user_id, *columns).group_by(table.c.user_id)
+        if user_ids is not None:
+            statement = statement.where(table.c.user_id.in_(user_ids))
+        for user_id, *values in conn.execute(statement):
+            stats.setdefault(user_id, Counter()).update({name: value or 0 for name, value in zip(names, values)})
+    return stats
+
+
+def compute_rollups(conn: Connection, user_ids: Optional[List[int]] = None) -> Dict[int, Dict[datetime, Counter]]:
+    """
+    The hourly rollups recomputed from the tables, by user and hour
+    (archived sessions at the start of their day). Hours without
+    activity are left out.
+    """
+    tasks = Task.__table__
+    sessions = PomodoroSession.__table__
+    archive = PomodoroSessionArchive.__table__
+    completed = sessions.c.completed_at.isnot(None)
+    session_hour = datetime_trunc("hour", sessions.c.created_at)
+    task_hour = datetime_trunc("hour", tasks.c.completed_at)
+    queries = [
+        (sessions, session_hour, ("sessions", "completed_sessions", "work_minutes"), [
+            func.count(),
+            count_if(completed),
+            sum_if(and_(completed, sessions.c.session_type == "work"), sessions.c.actual_duration_minutes),
+        ], sessions.c.created_at.isnot(None)),
+        (archive, archive.c.day, ("sessions", "completed_sessions", "work_minutes"), [
+            func.sum(archive.c.sessions),
+            func.sum(archive.c.completed_sessions),
+            sum_if(archive.c.session_type == "work", archive.c.completed_minutes),
+        ], None),
+        (tasks, task_hour, ("tasks_completed",), [
+            func.count(),
+        ], and_(tasks.c.status == TaskStatus.DONE, tasks.c.completed_at.isnot(None))),
+    ]
+
+    rollups = {}
+    for table, hour, names, columns, condition in queries:
+        statement = select(table.c.user_id, hour, *columns).group_by(table.c.user_id, hour)
+        if condition is not None:
+            statement = statement.where(condition)
+        if user_ids is not None:
+            statement = statement.where(table.c.user_id.in_(user_ids))
+        for user_id, hour_value, *values in conn.execute(statement):
+            if not isinstance(hour_value, datetime):
+                hour_value = datetime.combine(hour_value, time.min)
+            counts = rollups.setdefault(user_id, {}).setdefault(hour_value, Counter())
+            counts.update({name: value or 0 for name, value in zip(names, values)})
+    return rollups
+
+
+def compute_activity(conn: Connection, user_ids: Optional[List[int]] = None) -> Dict[int, DailyActivity]:
+    """The daily focus recomputed from the sessions and the archive, by user."""
+    sessions = PomodoroSession.__table__
+    archive = PomodoroSessionArchive.__table__
+    day = utc_date(sessions.c.created_at)
+    queries = [
+        select(
+            sessions.c.user_id, day, func.count(), func.coalesce(func.sum(sessions.c.actual_duration_minutes), 0)
+        ).where(
+            sessions.c.session_type == "work", sessions.c.completed_at.isnot(None), sessions.c.created_at.isnot(None)
+        ).group_by(sessions.c.user_id, day),
+        select(
+            archive.c.user_id, archive.c.day, func.sum(archive.c.completed_sessions), func.sum(archive.c.completed_minutes)
+        ).where(archive.c.session_type == "work").group_by(archive.c.user_id, archive.c.day),
+    ]
+
+    rows = {}
+    for statement in queries:
+        if user_ids is not None:
+            statement = statement.where(statement.selected_columns[0].in_(user_ids))
+        for user_id, *values in conn.execute(statement):
+            rows.setdefault(user_id, []).append(tuple(values))
+    activity = {user_id: build_activity(user_rows) for user_id, user_rows in rows.items()}
+    return {user_id: days for user_id, days in activity.items() if days.active_days()}
+
+
+def rebuild_user_stats(conn: Connection, user_ids: Optional[List[int]] = None) -> int:
+    """
+    Recompute the counters, rollups and daily focus of `user_ids` (every
+    user when None) in the caller's transaction; returns the number of users with
+    statistics.
+
+    The old rows are deleted before the tables are read, so writers of
+    those users wait for the rebuild instead of adding to rows that are
+    being replaced (the whole tables are locked for a full rebuild on
+    PostgreSQL, where new rows couldn't be locked otherwise).
+    """
+    tables = (UserStats.__table__, UserStatsHourly.__table__, UserActivity.__table__)
+    for table in tables:
+        statement = delete(table)
+        if user_ids is not None:
+            statement = statement.where(table.c.user_id.in_(user_ids))
+        elif conn.dialect.name == "postgresql":
+            conn.exec_driver_sql(f"LOCK TABLE {table.name} IN EXCLUSIVE MODE")
+        conn.execute(statement)
+
+    stats = compute_user_stats(conn, user_ids)
+    if stats:
+        conn.execute(insert(UserStats.__table__), [
+            {"user_id": user_id, **{name: counts[name] for name in USER_STATS}}
+            for user_id, counts in stats.items()
+        ])
+    rollups = compute_rollups(conn, user_ids)
+    if rollups:
+        conn.execute(insert(UserStatsHourly.__table__), [
+            {"user_id": user_id, "hour": hour, **{name: counts[name] for name in HOURLY_STATS}}
+            for user_id, hours in rollups.items()
+            for hour, counts in hours.items()
+        ])
+    activity = compute_activity(conn, user_ids)
+    if activity:
+        conn.execute(insert(UserActivity.__table__), [
+            {"user_id": user_id, **days.values()} for user_id, days in activity.items()
+        ])
+    return len(stats.keys() | rollups.keys() | activity.keys())
+
+
+def backfill_user_stats(
+    bind: Engine,
+    batch_size: Optional[int] = None,
+    progress: Optional[Callable[[int], None]] = None,
+) -> int:
+    """
+    Rebuild every user's statistics, STATS_BACKFILL_BATCH_USERS
+    users per transaction (so writers only wait for their own batch).
+
+    Returns the number of users processed.
+    """
+    batch_size = batch_size or settings.STATS_BACKFILL_BATCH_USERS
+    users = User.__table__
+    done = 0
+    last_id = 0
+    while True:
+        with bind.begin() as conn:
+            user_ids = conn.scalars(
+                select(users.c.id).where(users.c.id > last_id).order_by(users.c.id).limit(batch_size)
+            ).all()
+            if not user_ids:
+                break
+            rebuild_user_stats(conn, user_ids)
+        done += len(user_ids)
+        last_id = user_ids[-1]
+        if progress is not None:
+            progress(done)
+        if len(user_ids) < batch_size:
+            break
+    return done
+
+
+def verify_user_stats(conn: Connection, user_ids: Optional[List[int]] = None) -> Dict[int, Dict[str, Tuple[int, int]]]:
+    """
+    Counters, rollups and daily focus that differ from the tables:
+    {user_id: {name: (stored, actual)}}, rollups named "<hour> <column>"
+    and days "<day> <array>".
+    """
+    table = UserStats.__table__
+    statement = select(table)
+    if user_ids is not None:
+        statement = statement.where(table.c.user_id.in_(user_ids))
+    stored = {row.user_id: Counter({name: getattr(row, name) for name in USER_STATS}) for row in conn.execute(statement)}
+    actual = compute_user_stats(conn, user_ids)
+
+    hourly = UserStatsHourly.__table__
+    statement = select(hourly)
+    if user_ids is not None:
+        statement = statement.where(hourly.c.user_id.in_(user_ids))
+    stored_rollups = {}
+    for row in conn.execute(statement):
+        stored_rollups.setdefault(row.user_id, {})[row.hour] = Counter({name: getattr(row, name) for name in HOURLY_STATS})
+    actual_rollups = compute_rollups(conn, user_ids)
+
+    activity = UserActivity.__table__
+    statement = select(activity)
+    if user_ids is not None:
+        statement = statement.where(activity.c.user_id.in_(user_ids))
+    stored_days = {row.user_id: DailyActivity.from_row(row).active_days() for row in conn.execute(statement)}
+    actual_days = {user_id: days.active_days() for user_id, days in compute_activity(conn, user_ids).items()}
+
+    drift = {}
+    users = stored.keys() | actual.keys() | stored_rollups.keys() | actual_rollups.keys() | stored_days.keys() | actual_days.keys()
+    for user_id in sorted(users):
+        have, want = stored.get(user_id, Counter()), actual.get(user_id, Counter())
+        differences = {name: (have[name], want[name]) for name in USER_STATS if have[name] != want[name]}
+        have_hours, want_hours = stored_rollups.get(user_id, {}), actual_rollups.get(user_id, {})
+        # A row of zeros is the same as no row
+        for hour in sorted(have_hours.keys() | want_hours.keys()):
+            have, want = have_hours.get(hour, Counter()), want_hours.get(hour, Counter())
+            for name in HOURLY_STATS:
+                if have[name] != want[name]:
+                    differences[f"{hour:%Y-%m-%d %H:00} {name}"] = (have[name], want[name])
+        have_days, want_days = stored_days.get(user_id, {}), actual_days.get(user_id, {})
+        for day in sorted(have_days.keys() | want_days.keys()):
+            have, want = have_days.get(day, (0, 0)), want_days.get(day, (0, 0))
+            for name, stored_value, actual_value in zip(ACTIVITY_STATS, have, want):
+                if stored_value != actual_value:
+                    differences[f"{day:%Y-%m-%d} {name}"] = (stored_value, actual_value)
+        if differences:
+            drift[user_id] = differences
+    return drift
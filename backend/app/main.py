@@ -3,21 +3,53 @@ Pomodoro Task Manager - FastAPI Backend
 Main application entry point with API routes and configuration.
 """
 
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from starlette.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from .api.api import api_router
+from .core.archive import run_session_maintenance
 from .core.config import settings
-from .core.database import create_tables
+from .core.database import engine, warm_up_database_pools
+from .core.migrations import verify_schema
+from .core.pagination import NEXT_CURSOR_HEADER
+from .core.password_hashing import password_hasher
 from .models import user, task  # Import models to register them
 
-# Create database tables on startup
-create_tables()
+async def session_maintenance_loop():
+    """Create upcoming session partitions and archive old sessions periodically"""
+    while True:
+        try:
+            await run_in_threadpool(run_session_maintenance, engine)
+        except Exception as e:
+            print(f"Session maintenance failed: {e}")
+        await asyncio.sleep(settings.SESSION_MAINTENANCE_INTERVAL_MINUTES * 60)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application startup and shutdown hooks"""
+    # The schema is managed by Alembic (`alembic upgrade head`); only check it
+    if settings.DB_VERIFY_SCHEMA:
+        await run_in_threadpool(verify_schema, engine)
+    await warm_up_database_pools()
+    maintenance = None
+    if settings.SESSION_MAINTENANCE_INTERVAL_MINUTES > 0 and (
+        settings.SESSION_ARCHIVE_HORIZON_DAYS > 0 or settings.SESSION_PARTITIONING_ENABLED
+    ):
+        maintenance = asyncio.create_task(session_maintenance_loop())
+    yield
+    if maintenance is not None:
+        maintenance.cancel()
+    # Stop the password hashing worker processes
+    password_hasher.shutdown()
 
 app = FastAPI(
     title="Pomodoro Task Manager API",
     description="A productivity app combining task management with Pomodoro technique",
     version="1.0.0",
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan
 )
 
 # Set up CORS
@@ -29,6 +61,8 @@ if cors_origins:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        # Let browser clients read pagination cursors
+        expose_headers=[NEXT_CURSOR_HEADER],
     )
 
 # Include API routes
@@ -1,11 +1,28 @@
 """
 Database models for tasks and pomodoro sessions.
+
+PomodoroSession.user_id is a copy of its task's owner, so sessions can be
+scoped to a user without joining tasks. It is filled in on insert and
+follows the task when the task changes owner through the ORM (bulk
+UPDATEs of tasks.user_id must update pomodoro_sessions themselves).
+
+Sessions older than the archive horizon are folded into
+PomodoroSessionArchive (see app.core.archive), one row of totals per
+user, day, task and session type.
+
+UserStats keeps each user's running totals for the dashboard,
+UserStatsHourly their activity per hour for charts and UserActivity
+their focus per day for the heatmap and streaks (see app.core.user_stats
+and app.core.activity).
 """
 
 from datetime import datetime
 from typing import Optional
-from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, ForeignKey, Enum as SQLEnum
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Date, DateTime, Text, Boolean, ForeignKey, Index, LargeBinary, Enum as SQLEnum
+from sqlalchemy import case, event, inspect, literal_column, select, update
+from sqlalchemy.orm import object_session, relationship
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.sql.expression import Grouping
 from ..core.database import Base
 import enum
 
@@ -49,9 +66,27 @@ class Task(Base):
     owner = relationship("User", back_populates="tasks")
     pomodoro_sessions = relationship("PomodoroSession", back_populates="task", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index("ix_tasks_user_id_status", "user_id", "status"),
+        # Keyset pagination sort keys (see app.core.pagination)
+        Index("ix_tasks_user_id_created_at_id", "user_id", "created_at", "id"),
+        Index("ix_tasks_user_id_due_date_id", "user_id", "due_date", "id"),
+    )
+
     def __repr__(self):
         return f"<Task(id={self.id}, title='{self.title}', status={self.status})>"
 
+# Sort rank of a priority: LOW < MEDIUM < HIGH, NULL counts as MEDIUM.
+# Written with literals only, so queries match the expression index below.
+PRIORITY_RANKS = {TaskPriority.LOW: 0, TaskPriority.MEDIUM: 1, TaskPriority.HIGH: 2}
+task_priority_rank = case(
+    (Task.__table__.c.priority == literal_column("'LOW'"), literal_column("0")),
+    (Task.__table__.c.priority == literal_column("'HIGH'"), literal_column("2")),
+    else_=literal_column("1"),
+)
+# PostgreSQL needs expression index elements in parentheses
+Index("ix_tasks_user_id_priority_rank_id", Task.user_id, Grouping(task_priority_rank), Task.id)
+
 class PomodoroSession(Base):
     """
     Pomodoro session model tracking work sessions for tasks.
@@ -60,11 +95,15 @@ class PomodoroSession(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     task_id = Column(Integer, ForeignKey("tasks.id"), nullable=False)
+    # Owner of the task, denormalized (see module docstring)
+    user_id = Column(Integer, ForeignKey("users.id", name="fk_pomodoro_sessions_user_id_users"), nullable=False)
 
     # Session details
     duration_minutes = Column(Integer, nullable=False)  # Planned duration
     actual_duration_minutes = Column(Integer, nullable=True)  # Actual completed time
     session_type = Column(String(20), nullable=False)  # "work", "short_break", "long_break"
+    # Client-generated id of sessions uploaded by offline clients, unique per user
+    client_id = Column(String(64), nullable=True)
 
     # Timestamps
     started_at = Column(DateTime, nullable=True)
@@ -74,5 +113,139 @@ class PomodoroSession(Base):
     # Relationships
     task = relationship("Task", back_populates="pomodoro_sessions")
 
+    __table_args__ = (
+        # Also serves lookups and joins on task_id alone
+        Index("ix_pomodoro_sessions_task_id_created_at", "task_id", "created_at"),
+        Index("ix_pomodoro_sessions_user_id_created_at", "user_id", "created_at"),
+        Index("ix_pomodoro_sessions_user_id_client_id", "user_id", "client_id", unique=True),
+    )
+
     def __repr__(self):
         return f"<PomodoroSession(id={self.id}, task_id={self.task_id}, type='{self.session_type}')>"
+
+class PomodoroSessionArchive(Base):
+    """
+    Totals of archived pomodoro sessions per user, day, task and type.
+    
+    Keeps the all-time statistics exact after old sessions are removed
+    from pomodoro_sessions; rows go away with their task like sessions do.
+    """
+    __tablename__ = "pomodoro_session_archive"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    day = Column(Date, primary_key=True)  # UTC date of the sessions' created_at
+    task_id = Column(Integer, ForeignKey("tasks.id", ondelete="CASCADE"), primary_key=True)
+    session_type = Column(String(20), primary_key=True)
+
+    sessions = Column(Integer, nullable=False, default=0)
+    completed_sessions = Column(Integer, nullable=False, default=0)
+    # Sum and count of actual_duration_minutes over completed sessions
+    completed_minutes = Column(Integer, nullable=False, default=0)
+    timed_sessions = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        # Deleting a task's archived totals
+        Index("ix_pomodoro_session_archive_task_id", "task_id"),
+    )
+
+    def __repr__(self):
+        return f"<PomodoroSessionArchive(user_id={self.user_id}, day={self.day}, task_id={self.task_id}, type='{self.session_type}')>"
+
+class UserStats(Base):
+    """
+    Dashboard counters of a user: tasks by status and all-time session totals.
+    
+    Updated by the task and pomodoro write paths in the same transaction as
+    the write; archived sessions stay counted. A missing row means zeros.
+    """
+    __tablename__ = "user_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+
+    tasks = Column(Integer, nullable=False, default=0)
+    todo_tasks = Column(Integer, nullable=False, default=0)
+    in_progress_tasks = Column(Integer, nullable=False, default=0)
+    done_tasks = Column(Integer, nullable=False, default=0)
+
+    sessions = Column(Integer, nullable=False, default=0)
+    completed_sessions = Column(Integer, nullable=False, default=0)
+    # Sum and count of actual_duration_minutes over completed sessions
+    completed_minutes = Column(Integer, nullable=False, default=0)
+    timed_sessions = Column(Integer, nullable=False, default=0)
+    # completed_minutes of work sessions only
+    work_minutes = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<UserStats(user_id={self.user_id}, tasks={self.tasks}, sessions={self.sessions})>"
+
+class UserStatsHourly(Base):
+    """
+    Activity rollup of a user per UTC hour, for charts over any range.
+    
+    Sessions count in the hour they were created, completed tasks in the
+    hour of completed_at. Hourly rather than daily so charts can cut days
+    at the user's local midnight; archived sessions are kept at 00:00 UTC
+    of their day, the archive's granularity.
+    """
+    __tablename__ = "user_stats_hourly"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    hour = Column(DateTime, primary_key=True)  # UTC, truncated to the hour
+
+    sessions = Column(Integer, nullable=False, default=0)
+    completed_sessions = Column(Integer, nullable=False, default=0)
+    # actual_duration_minutes of completed work sessions
+    work_minutes = Column(Integer, nullable=False, default=0)
+    tasks_completed = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<UserStatsHourly(user_id={self.user_id}, hour={self.hour}, sessions={self.sessions})>"
+
+class UserActivity(Base):
+    """
+    Completed work sessions and their minutes per UTC day, packed into
+    one row per user (see app.core.activity for the format).
+    """
+    __tablename__ = "user_activity"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    first_day = Column(Date, nullable=False)  # day of the arrays' first entry
+    work_sessions = Column(LargeBinary, nullable=False)
+    work_minutes = Column(LargeBinary, nullable=False)
+
+    def __repr__(self):
+        return f"<UserActivity(user_id={self.user_id}, first_day={self.first_day})>"
+
+def _task_owner(session: PomodoroSession):
+    """Owner of the session's task: from the loaded task, else a subquery in the statement."""
+    task = session.__dict__.get("task")
+    if task is not None and task.user_id is not None:
+        return task.user_id
+    return select(Task.user_id).where(Task.id == session.task_id).scalar_subquery()
+
+@event.listens_for(PomodoroSession, "before_insert")
+def _set_session_owner(mapper, connection, target):
+    if target.user_id is None:
+        target.user_id = _task_owner(target)
+
+@event.listens_for(PomodoroSession, "before_update")
+def _update_session_owner(mapper, connection, target):
+    if inspect(target).attrs.task_id.history.has_changes():
+        target.user_id = _task_owner(target)
+
+@event.listens_for(Task, "after_update")
+def _move_sessions_with_task(mapper, connection, target):
+    history = inspect(target).attrs.user_id.history
+    if not history.has_changes():
+        return
+    for table in (PomodoroSession.__table__, PomodoroSessionArchive.__table__):
+        connection.execute(update(table).where(table.c.task_id == target.id).values(user_id=target.user_id))
+    for session in target.__dict__.get("pomodoro_sessions", []):
+        set_committed_value(session, "user_id", target.user_id)
+    # Rare enough to just recount both owners (imported here: it imports this module)
+    from ..core.stats_cache import stats_changed
+    from ..core.user_stats import rebuild_user_stats
+    owners = [*history.deleted, target.user_id]
+    rebuild_user_stats(connection, owners)
+    for user_id in owners:
+        stats_changed(object_session(target), user_id)
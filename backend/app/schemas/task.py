@@ -3,9 +3,9 @@ Pydantic schemas for task and pomodoro session API endpoints.
 """
 from __future__ import annotations
 
-from datetime import datetime
+from datetime import date, datetime, timedelta, timezone
 from typing import Optional, List
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 import enum
 
 class TaskStatus(str, enum.Enum):
@@ -50,6 +50,55 @@ class Task(TaskBase):
     class Config:
         from_attributes = True
 
+# Batch Task Schemas
+# Items per list in one batch request
+TASK_BATCH_MAX_ITEMS = 500
+
+class TaskBatchUpdate(TaskUpdate):
+    """Partial update of one task in a batch"""
+    id: int
+
+class TaskBatchRequest(BaseModel):
+    """Creates, partial updates and deletes applied in one transaction"""
+    create: List[TaskCreate] = Field(default_factory=list, max_length=TASK_BATCH_MAX_ITEMS)
+    update: List[TaskBatchUpdate] = Field(default_factory=list, max_length=TASK_BATCH_MAX_ITEMS)
+    delete: List[int] = Field(default_factory=list, max_length=TASK_BATCH_MAX_ITEMS)
+
+    @model_validator(mode="after")
+    def check_ids(self) -> "TaskBatchRequest":
+        """Reject batches that touch the same task twice"""
+        update_ids = [item.id for item in self.update]
+        if len(set(update_ids)) != len(update_ids):
+            raise ValueError("A task can only be updated once per batch")
+        if len(set(self.delete)) != len(self.delete):
+            raise ValueError("A task can only be deleted once per batch")
+        if set(update_ids) & set(self.delete):
+            raise ValueError("A task can't be both updated and deleted in one batch")
+        return self
+
+class TaskSummary(TaskBase):
+    """Task without its pomodoro sessions"""
+    id: int
+    created_at: datetime
+    updated_at: datetime
+    completed_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class TaskBatchItemResult(BaseModel):
+    """Outcome of one batch item"""
+    index: int  # position in the request list
+    id: Optional[int] = None
+    status: str  # "created", "updated", "deleted" or "not_found"
+    task: Optional[TaskSummary] = None
+
+class TaskBatchResponse(BaseModel):
+    """Per-item results of a batch, in request order"""
+    created: List[TaskBatchItemResult] = []
+    updated: List[TaskBatchItemResult] = []
+    deleted: List[TaskBatchItemResult] = []
+
 # Pomodoro Session Schemas
 class PomodoroSessionBase(BaseModel):
     """Base pomodoro session schema"""
@@ -70,6 +119,7 @@ class PomodoroSession(PomodoroSessionBase):
     """Schema for pomodoro session responses"""
     id: int
     task_id: int
+    client_id: Optional[str] = None
     actual_duration_minutes: Optional[int] = None
     started_at: Optional[datetime] = None
     completed_at: Optional[datetime] = None
@@ -78,6 +128,61 @@ class PomodoroSession(PomodoroSessionBase):
     class Config:
         from_attributes = True
 
+# Offline Session Ingest Schemas
+# Sessions per ingest request
+SESSION_INGEST_MAX_ITEMS = 500
+# Longest session, like actual_duration_minutes (le=60)
+SESSION_INGEST_MAX_MINUTES = 60
+# Oldest offline session accepted, and the client clock skew tolerated
+SESSION_INGEST_MAX_AGE_DAYS = 366
+SESSION_INGEST_CLOCK_SKEW = timedelta(minutes=5)
+
+class PomodoroSessionIngest(PomodoroSessionBase):
+    """A finished session recorded offline"""
+    client_id: str = Field(..., min_length=1, max_length=64)
+    task_id: int
+    actual_duration_minutes: Optional[int] = Field(None, gt=0, le=SESSION_INGEST_MAX_MINUTES)
+    started_at: datetime
+    completed_at: datetime
+
+    @model_validator(mode="after")
+    def check_times(self) -> "PomodoroSessionIngest":
+        """
+        Store naive UTC like the rest of the API and check the time range:
+        the span (the duration when none is given) is bounded like
+        actual_duration_minutes, and sessions from the future or older
+        than SESSION_INGEST_MAX_AGE_DAYS are refused.
+        """
+        for field in ("started_at", "completed_at"):
+            value = getattr(self, field)
+            if value.tzinfo is not None:
+                setattr(self, field, value.astimezone(timezone.utc).replace(tzinfo=None))
+        if self.completed_at < self.started_at:
+            raise ValueError("completed_at must not be before started_at")
+        if self.completed_at - self.started_at > timedelta(minutes=SESSION_INGEST_MAX_MINUTES):
+            raise ValueError(f"A session can't span more than {SESSION_INGEST_MAX_MINUTES} minutes")
+        now = datetime.utcnow()
+        if self.completed_at > now + SESSION_INGEST_CLOCK_SKEW:
+            raise ValueError("completed_at must not be in the future")
+        if self.started_at < now - timedelta(days=SESSION_INGEST_MAX_AGE_DAYS):
+            raise ValueError(f"Sessions older than {SESSION_INGEST_MAX_AGE_DAYS} days can't be uploaded")
+        return self
+
+class PomodoroSessionIngestRequest(BaseModel):
+    """Batch of offline sessions to store"""
+    sessions: List[PomodoroSessionIngest] = Field(..., max_length=SESSION_INGEST_MAX_ITEMS)
+
+class PomodoroSessionIngestResult(BaseModel):
+    """Outcome of one uploaded session"""
+    index: int  # position in the request list
+    client_id: str
+    id: Optional[int] = None
+    status: str  # "created", "duplicate" or "task_not_found"
+
+class PomodoroSessionIngestResponse(BaseModel):
+    """Per-session results, in request order"""
+    results: List[PomodoroSessionIngestResult] = []
+
 # Statistics Schemas
 class TaskStats(BaseModel):
     """Statistics for tasks"""
@@ -101,5 +206,43 @@ class DashboardStats(BaseModel):
     task_stats: TaskStats
     pomodoro_stats: PomodoroStats
 
+class TimeSeriesBucket(str, enum.Enum):
+    """Period of a time series point"""
+    DAY = "day"
+    WEEK = "week"  # ISO weeks, starting on Monday
+    MONTH = "month"
+
+class TimeSeriesPoint(BaseModel):
+    """Activity of one bucket, starting on its first local day"""
+    start: date
+    sessions: int = 0
+    completed_sessions: int = 0
+    work_minutes: int = 0
+    tasks_completed: int = 0
+
+class TimeSeries(BaseModel):
+    """Activity per bucket over a range of local days (both ends included)"""
+    bucket: TimeSeriesBucket
+    timezone: str
+    start: date
+    end: date
+    points: List[TimeSeriesPoint] = []
+
+class Heatmap(BaseModel):
+    """Completed work sessions and their minutes per UTC day, start to end"""
+    start: date
+    end: date
+    work_sessions: List[int] = []
+    work_minutes: List[int] = []
+
+class StreakStats(BaseModel):
+    """Runs of consecutive UTC days with a completed work session"""
+    current_streak: int
+    current_streak_start: Optional[date] = None
+    longest_streak: int
+    longest_streak_start: Optional[date] = None
+    longest_streak_end: Optional[date] = None
+    active_days: int
+
 # Rebuild models to resolve forward references
 Task.model_rebuild()
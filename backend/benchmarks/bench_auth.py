@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark per-request authentication overhead (get_current_user).
+
+Compares the uncached path (JWT decode + user SELECT on every request)
+with the verified-token and principal caches enabled.
+
+Usage: python benchmarks/bench_auth.py [iterations]
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+# Add the backend directory to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_db_file = os.path.join(tempfile.mkdtemp(), "bench_auth.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_file}"
+
+from app.core.database import SessionLocal, create_tables
+from app.core.dependencies import get_current_user
+from app.core.principal_cache import principal_cache
+from app.core.security import create_access_token, token_cache
+from app.models.user import User
+
+
+def run(iterations: int, token: str) -> float:
+    """Return the mean get_current_user latency in microseconds."""
+    async def loop():
+        db = SessionLocal()
+        try:
+            for _ in range(iterations):
+                await get_current_user(token=token, db=db)
+        finally:
+            db.close()
+
+    start = time.perf_counter()
+    asyncio.run(loop())
+    return (time.perf_counter() - start) / iterations * 1_000_000
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+
+    create_tables()
+    db = SessionLocal()
+    user = User(email="bench@example.com", username="bench", hashed_password="x")
+    db.add(user)
+    db.commit()
+    token = create_access_token({"sub": str(user.id), "username": user.username})
+    db.close()
+
+    token_max, principal_max = token_cache.max_size, principal_cache.max_size
+
+    # Before: every request decodes the JWT and loads the user
+    token_cache.max_size = principal_cache.max_size = 0
+    uncached = run(iterations, token)
+
+    # Token cache only
+    token_cache.max_size = token_max
+    token_cache.clear()
+    token_only = run(iterations, token)
+
+    # After: token and principal caches
+    principal_cache.max_size = principal_max
+    principal_cache.clear()
+    cached = run(iterations, token)
+
+    print(f"get_current_user over {iterations} requests (mean per request)")
+    print(f"  no caches:               {uncached:8.1f} us")
+    print(f"  token cache:             {token_only:8.1f} us")
+    print(f"  token + principal cache: {cached:8.1f} us  ({uncached / cached:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Benchmark user registration throughput (signups/sec) and database round
+trips per signup through POST /api/v1/auth/register.
+
+Usage: python benchmarks/bench_register.py [signups] [bcrypt_rounds]
+
+Low bcrypt rounds (default 4) isolate the database/request overhead; pass
+the production cost (e.g. 12) to see end-to-end throughput.
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+# Add the backend directory to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_db_file = os.path.join(tempfile.mkdtemp(), "bench_register.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_file}"
+os.environ.setdefault("BCRYPT_ROUNDS", sys.argv[2] if len(sys.argv) > 2 else "4")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.main import app
+from app.core.database import engine, create_tables
+from app.core.rate_limit import register_limiter
+
+statements = 0
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _count(conn, cursor, statement, parameters, context, executemany):
+    global statements
+    statements += 1
+
+
+def main():
+    global statements
+    signups = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    create_tables()
+    register_limiter.enabled = False
+
+    with TestClient(app) as client:
+        # Warm up the hashing pool so process start-up is not measured
+        client.post("/api/v1/auth/register", json={
+            "username": "warmup", "email": "warmup@example.com", "password": "secret123"
+        })
+        statements = 0
+        start = time.perf_counter()
+        for i in range(signups):
+            response = client.post("/api/v1/auth/register", json={
+                "username": f"user{i}", "email": f"user{i}@example.com", "password": "secret123"
+            })
+            assert response.status_code == 201, response.text
+        elapsed = time.perf_counter() - start
+        signup_statements = statements
+
+        statements = 0
+        response = client.post("/api/v1/auth/register", json={
+            "username": "user0", "email": "other@example.com", "password": "secret123"
+        })
+        assert response.status_code == 400
+        conflict_statements = statements
+
+    print(f"{signups} signups (BCRYPT_ROUNDS={os.environ['BCRYPT_ROUNDS']})")
+    print(f"  throughput:            {signups / elapsed:8.1f} signups/sec")
+    print(f"  statements per signup: {signup_statements / signups:8.1f}")
+    print(f"  statements on conflict:{conflict_statements:8d}")
+
+
+if __name__ == "__main__":
+    main()
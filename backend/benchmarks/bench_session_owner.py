@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Compare per-user pomodoro session queries that join tasks to find the
+owner with the same queries filtering on pomodoro_sessions.user_id.
+
+Prints the query plan for both forms and the mean latency over random
+users, for the queries the pomodoro and stats endpoints run.
+
+Usage: python benchmarks/bench_session_owner.py [sessions] [users] [iterations]
+
+Runs against a temporary SQLite file; set BENCH_DATABASE_URL to a scratch
+PostgreSQL database (its tables are dropped and recreated) to compare
+plans there.
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Add the backend directory to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_db_file = os.path.join(tempfile.mkdtemp(), "bench_session_owner.db")
+os.environ["DATABASE_URL"] = os.environ.get("BENCH_DATABASE_URL", f"sqlite:///{_db_file}")
+
+from sqlalchemy import func, insert, select
+
+from app.core.database import Base, engine
+from app.models.task import PomodoroSession, Task
+from app.models.user import User
+
+TASKS_PER_USER = 20
+CHUNK = 50000
+
+sessions = PomodoroSession.__table__
+tasks = Task.__table__
+
+
+def populate(total_sessions: int, users: int) -> None:
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(insert(User.__table__), [
+            {"id": u, "email": f"user{u}@example.com", "username": f"user{u}", "hashed_password": "x"}
+            for u in range(1, users + 1)
+        ])
+        conn.execute(insert(tasks), [
+            {"id": t, "title": f"Task {t}", "user_id": (t - 1) // TASKS_PER_USER + 1}
+            for t in range(1, users * TASKS_PER_USER + 1)
+        ])
+    for start in range(0, total_sessions, CHUNK):
+        rows = []
+        for _ in range(min(CHUNK, total_sessions - start)):
+            task_id = rng.randint(1, users * TASKS_PER_USER)
+            created = now - timedelta(minutes=rng.randint(0, 60 * 24 * 365))
+            rows.append({
+                "task_id": task_id,
+                "user_id": (task_id - 1) // TASKS_PER_USER + 1,
+                "duration_minutes": 25,
+                "actual_duration_minutes": 25,
+                "session_type": rng.choice(("work", "work", "short_break", "long_break")),
+                "started_at": created,
+                "completed_at": created + timedelta(minutes=25),
+                "created_at": created,
+            })
+        with engine.begin() as conn:
+            conn.execute(insert(sessions), rows)
+
+
+def queries(user_id: int):
+    """(name, joined form, direct form) for the main per-user session queries."""
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    joined = select(sessions).join(tasks, tasks.c.id == sessions.c.task_id).where(tasks.c.user_id == user_id)
+    direct = select(sessions).where(sessions.c.user_id == user_id)
+
+    def count(base):
+        return base.with_only_columns(func.count(sessions.c.id))
+
+    def work_minutes_today(base):
+        return base.with_only_columns(func.sum(sessions.c.actual_duration_minutes)).where(
+            sessions.c.session_type == "work",
+            sessions.c.completed_at.isnot(None),
+            sessions.c.created_at >= today,
+            sessions.c.created_at < today + timedelta(days=1),
+        )
+
+    def by_type(base):
+        return base.with_only_columns(sessions.c.session_type, func.count(sessions.c.id)).group_by(
+            sessions.c.session_type
+        )
+
+    def listing(base):
+        return base.limit(100)
+
+    return [
+        (name, build(joined), build(direct))
+        for name, build in (
+            ("count", count),
+            ("work minutes today", work_minutes_today),
+            ("sessions by type", by_type),
+            ("list (limit 100)", listing),
+        )
+    ]
+
+
+def explain(conn, statement) -> str:
+    compiled = statement.compile(engine, compile_kwargs={"literal_binds": True})
+    prefix = "EXPLAIN QUERY PLAN " if engine.dialect.name == "sqlite" else "EXPLAIN ANALYZE "
+    rows = conn.exec_driver_sql(prefix + str(compiled)).all()
+    return "\n".join("    " + " | ".join(str(column) for column in row[-1:]) for row in rows)
+
+
+def mean_ms(conn, build, users: int, iterations: int) -> float:
+    rng = random.Random(7)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        conn.execute(build(rng.randint(1, users))).all()
+    return (time.perf_counter() - start) / iterations * 1000
+
+
+def main():
+    total_sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    users = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    iterations = int(sys.argv[3]) if len(sys.argv) > 3 else 200
+
+    start = time.perf_counter()
+    populate(total_sessions, users)
+    print(f"{total_sessions} sessions, {users} users ({engine.dialect.name}, "
+          f"loaded in {time.perf_counter() - start:.1f}s)")
+
+    with engine.connect() as conn:
+        # Fresh planner statistics on both databases
+        conn.exec_driver_sql("ANALYZE")
+        for index, (name, joined, direct) in enumerate(queries(1)):
+            print(f"\n{name}")
+            print("  join tasks plan:")
+            print(explain(conn, joined))
+            print("  user_id plan:")
+            print(explain(conn, direct))
+            joined_ms = mean_ms(conn, lambda u, i=index: queries(u)[i][1], users, iterations)
+            direct_ms = mean_ms(conn, lambda u, i=index: queries(u)[i][2], users, iterations)
+            print(f"  join tasks: {joined_ms:8.3f} ms   user_id: {direct_ms:8.3f} ms   "
+                  f"({joined_ms / direct_ms:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
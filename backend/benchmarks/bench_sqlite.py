@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Benchmark concurrent read/write throughput on a SQLite file database.
+
+Compares the old setup (one StaticPool connection shared by every thread,
+default rollback journal) with the pooled WAL engine from
+app.core.sqlite_engine. Each worker thread runs a mix of task listings
+(reads) and task inserts (writes) through ORM sessions, like request
+handlers do.
+
+Usage: python benchmarks/bench_sqlite.py [threads] [seconds] [write_percent]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+# Add the backend directory to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_db_dir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'bench_app.db')}"
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.database import Base, pool_options
+from app.core.sqlite_engine import create_sqlite_engine
+from app.models.task import Task
+from app.models.user import User
+
+USERS = 20
+
+
+def static_pool_engine(url: str):
+    """The previous configuration: one connection shared across threads."""
+    return create_engine(url, connect_args={"check_same_thread": False}, poolclass=StaticPool)
+
+
+def prepare(engine) -> None:
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine)() as db:
+        for i in range(USERS):
+            user = User(username=f"user{i}", email=f"user{i}@example.com", hashed_password="x")
+            user.tasks = [Task(title=f"Task {j}") for j in range(50)]
+            db.add(user)
+        db.commit()
+
+
+def run(engine, threads: int, seconds: float, write_percent: int) -> dict:
+    SessionLocal = sessionmaker(bind=engine, autoflush=False)
+    counts = {"reads": 0, "writes": 0, "errors": 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def worker():
+        rng = random.Random()
+        local = {"reads": 0, "writes": 0, "errors": 0}
+        while time.perf_counter() < deadline:
+            user_id = rng.randint(1, USERS)
+            db = SessionLocal()
+            try:
+                if rng.randrange(100) < write_percent:
+                    db.add(Task(title="Benchmark task", user_id=user_id))
+                    db.commit()
+                    local["writes"] += 1
+                else:
+                    db.query(Task).filter(Task.user_id == user_id).limit(50).all()
+                    local["reads"] += 1
+            except Exception:
+                db.rollback()
+                local["errors"] += 1
+            finally:
+                db.close()
+        with lock:
+            for key, value in local.items():
+                counts[key] += value
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    counts["elapsed"] = time.perf_counter() - start
+    return counts
+
+
+def main():
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 5
+    write_percent = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+
+    setups = [
+        ("StaticPool (shared connection)", static_pool_engine),
+        ("Pooled WAL", lambda url: create_sqlite_engine(url, pool_options)),
+    ]
+    print(f"{threads} threads, {seconds:g}s, {write_percent}% writes")
+    for i, (label, factory) in enumerate(setups):
+        engine = factory(f"sqlite:///{os.path.join(_db_dir, f'bench_{i}.db')}")
+        prepare(engine)
+        counts = run(engine, threads, seconds, write_percent)
+        engine.dispose()
+        total = counts["reads"] + counts["writes"]
+        print(f"{label}")
+        print(f"  throughput: {total / counts['elapsed']:9.1f} ops/sec")
+        print(f"  reads:      {counts['reads'] / counts['elapsed']:9.1f} /sec")
+        print(f"  writes:     {counts['writes'] / counts['elapsed']:9.1f} /sec")
+        print(f"  errors:     {counts['errors']:9d}")
+
+
+if __name__ == "__main__":
+    main()
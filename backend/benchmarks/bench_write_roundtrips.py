@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Count database round trips per write request, before and after the write
+handlers moved to INSERT/UPDATE/DELETE ... RETURNING.
+
+"Before" replays the previous handler bodies (load the row to check
+ownership, write, commit, db.refresh); "after" calls the current handlers
+in app.api.endpoints. Both responses are serialized after the handler
+returns, like FastAPI does, so reloads of expired objects are counted.
+A round trip is a statement sent to the database or a COMMIT.
+
+Usage: python benchmarks/bench_write_roundtrips.py [iterations]
+
+Runs against a temporary SQLite file; set BENCH_DATABASE_URL to a scratch
+PostgreSQL database (its tables are dropped and recreated) to time the
+round trips over a network.
+"""
+
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# Add the backend directory to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_db_file = os.path.join(tempfile.mkdtemp(), "bench_write_roundtrips.db")
+os.environ["DATABASE_URL"] = os.environ.get("BENCH_DATABASE_URL", f"sqlite:///{_db_file}")
+
+from fastapi import HTTPException
+from sqlalchemy import event
+
+from app.api.endpoints import pomodoro, tasks
+from app.core.database import Base, SessionLocal, engine
+from app.models.task import PomodoroSession, Task, TaskStatus
+from app.models.user import User
+from app.schemas.task import (
+    PomodoroSession as PomodoroSessionSchema,
+    PomodoroSessionCreate,
+    PomodoroSessionUpdate,
+    Task as TaskSchema,
+    TaskCreate,
+    TaskUpdate,
+)
+
+
+# Previous handler bodies
+def legacy_create_task(task, db, current_user):
+    db_task = Task(**task.model_dump(), user_id=current_user.id)
+    db.add(db_task)
+    db.commit()
+    db.refresh(db_task)
+    return db_task
+
+
+def legacy_update_task(task_id, task_update, db, current_user):
+    task = db.query(Task).filter(Task.id == task_id, Task.user_id == current_user.id).first()
+    if task is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    update_data = task_update.model_dump(exclude_unset=True)
+    for field, value in update_data.items():
+        setattr(task, field, value)
+    if update_data.get("status") == TaskStatus.DONE and task.status != TaskStatus.DONE:
+        task.completed_at = datetime.utcnow()
+    db.commit()
+    db.refresh(task)
+    return task
+
+
+def legacy_delete_task(task_id, db, current_user):
+    task = db.query(Task).filter(Task.id == task_id, Task.user_id == current_user.id).first()
+    if task is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    db.delete(task)
+    db.commit()
+
+
+def legacy_create_session(session, db, current_user):
+    task = db.query(Task).filter(Task.id == session.task_id, Task.user_id == current_user.id).first()
+    if task is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    db_session = PomodoroSession(**session.model_dump(), user_id=current_user.id)
+    db.add(db_session)
+    db.commit()
+    db.refresh(db_session)
+    return db_session
+
+
+def legacy_update_session(session_id, session_update, db, current_user):
+    session = db.query(PomodoroSession).filter(
+        PomodoroSession.id == session_id, PomodoroSession.user_id == current_user.id
+    ).first()
+    if session is None:
+        raise HTTPException(status_code=404, detail="Pomodoro session not found")
+    for field, value in session_update.model_dump(exclude_unset=True).items():
+        setattr(session, field, value)
+    db.commit()
+    db.refresh(session)
+    return session
+
+
+def legacy_delete_session(session_id, db, current_user):
+    session = db.query(PomodoroSession).filter(
+        PomodoroSession.id == session_id, PomodoroSession.user_id == current_user.id
+    ).first()
+    if session is None:
+        raise HTTPException(status_code=404, detail="Pomodoro session not found")
+    db.delete(session)
+    db.commit()
+
+
+class RoundTrips:
+    """Counts statements and commits on the engine."""
+
+    def __init__(self):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self.statement)
+        event.listen(engine, "commit", self.commit)
+
+    def statement(self, *args):
+        self.count += 1
+
+    def commit(self, *args):
+        self.count += 1
+
+
+def operations(user, handlers):
+    """(name, call(db, state), response schema) for each write, run in order."""
+    create_task, update_task, delete_task, create_session, update_session, delete_session = handlers
+    return [
+        ("create task", lambda db, state: state.update(
+            task=create_task(TaskCreate(title="Benchmark task"), db=db, current_user=user)), "task", TaskSchema),
+        ("create session", lambda db, state: state.update(session=create_session(
+            PomodoroSessionCreate(task_id=state["task"].id, duration_minutes=25, session_type="work"),
+            db=db, current_user=user)), "session", PomodoroSessionSchema),
+        ("update task", lambda db, state: state.update(task=update_task(
+            state["task"].id, TaskUpdate(status=TaskStatus.DONE), db=db, current_user=user)), "task", TaskSchema),
+        ("update session", lambda db, state: state.update(session=update_session(
+            state["session"].id, PomodoroSessionUpdate(actual_duration_minutes=20), db=db, current_user=user)),
+         "session", PomodoroSessionSchema),
+        ("delete session", lambda db, state: delete_session(state["session"].id, db=db, current_user=user), None, None),
+        ("delete task", lambda db, state: delete_task(state["task"].id, db=db, current_user=user), None, None),
+    ]
+
+
+def measure(user, handlers, iterations: int):
+    """Round trips and mean latency per operation."""
+    counter = RoundTrips()
+    results = {}
+    for _ in range(iterations):
+        state = {}
+        for name, call, key, schema in operations(user, handlers):
+            db = SessionLocal()
+            before = counter.count
+            start = time.perf_counter()
+            try:
+                call(db, state)
+                if schema is not None:
+                    # Serialization happens after the handler, as in FastAPI
+                    state[key] = schema.model_validate(state[key], from_attributes=True)
+            finally:
+                db.close()
+            elapsed = time.perf_counter() - start
+            _, total = results.get(name, (0, 0.0))
+            results[name] = (counter.count - before, total + elapsed)
+    return {name: (trips, total / iterations * 1000) for name, (trips, total) in results.items()}
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        user = User(username="bench", email="bench@example.com", hashed_password="x")
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+        db.expunge(user)
+
+    legacy = (
+        legacy_create_task, legacy_update_task, legacy_delete_task,
+        legacy_create_session, legacy_update_session, legacy_delete_session,
+    )
+    current = (
+        tasks.create_task, tasks.update_task, tasks.delete_task,
+        pomodoro.create_pomodoro_session, pomodoro.update_pomodoro_session, pomodoro.delete_pomodoro_session,
+    )
+    before = measure(user, legacy, iterations)
+    after = measure(user, current, iterations)
+
+    print(f"{engine.dialect.name}, {iterations} iterations (round trips include COMMIT)")
+    print(f"{'operation':16} {'before':>14} {'after':>14}")
+    for name in before:
+        print(f"{name:16} {before[name][0]:3d} {before[name][1]:7.3f} ms {after[name][0]:3d} {after[name][1]:7.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""
+Measure bcrypt hash time per cost on this machine and recommend the
+BCRYPT_ROUNDS setting that fits a per-login latency budget.
+
+Usage: python benchmarks/calibrate_bcrypt.py [budget_ms]
+"""
+
+import os
+import sys
+
+# Add the backend directory to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.password_policy import calibrate_bcrypt_cost
+
+
+def main():
+    budget_ms = float(sys.argv[1]) if len(sys.argv) > 1 else 250.0
+    recommended, timings = calibrate_bcrypt_cost(budget_ms)
+
+    print(f"bcrypt hash time (budget {budget_ms:g} ms)")
+    for cost, elapsed_ms in timings.items():
+        marker = "  <- recommended" if cost == recommended else ""
+        print(f"  cost {cost:2d}: {elapsed_ms:8.1f} ms{marker}")
+    print(f"\nSet BCRYPT_ROUNDS={recommended}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Pomodoro session history maintenance.
+
+    python maintain_sessions.py partition      # convert pomodoro_sessions to monthly partitions (PostgreSQL)
+    python maintain_sessions.py partitions     # create the upcoming monthly partitions
+    python maintain_sessions.py archive [days] # archive sessions older than `days` (default SESSION_ARCHIVE_HORIZON_DAYS)
+
+The application runs the last two periodically when they are enabled in
+the settings; this script is for the one-off conversion, cron and
+catching up after enabling archival.
+"""
+
+import sys
+import os
+
+# Add the parent directory to the path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.archive import archive_sessions
+from app.core.database import engine
+from app.core.partitions import ensure_session_partitions, partition_sessions_table
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+
+    if command == "partition":
+        print("Partitioning pomodoro_sessions (the table is locked while rows are copied)...")
+        with engine.begin() as conn:
+            partition_sessions_table(conn)
+        print("✅ pomodoro_sessions is partitioned by month.")
+    elif command == "partitions":
+        with engine.begin() as conn:
+            ensure_session_partitions(conn)
+        print("✅ Upcoming partitions created.")
+    elif command == "archive":
+        horizon_days = int(sys.argv[2]) if len(sys.argv) > 2 else None
+        archived = archive_sessions(
+            engine, horizon_days, progress=lambda count: print(f"   {count} sessions archived")
+        )
+        print(f"✅ Archived {archived} sessions.")
+    else:
+        print(__doc__)
+        sys.exit(1)
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Per-user statistics counters and hourly rollups maintenance.
+
+    python maintain_stats.py verify                 # list users whose statistics differ from their data
+    python maintain_stats.py rebuild [user_id ...]  # recompute them in one transaction (every user by default)
+    python maintain_stats.py backfill               # recompute every user's, a batch of users per transaction
+
+The write paths keep the statistics up to date; run verify after writes
+that bypassed the API (scripts, manual SQL) and rebuild what it reports.
+verify exits with status 1 when it finds drift.
+"""
+
+import sys
+import os
+
+# Add the parent directory to the path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.database import engine
+from app.core.user_stats import backfill_user_stats, rebuild_user_stats, verify_user_stats
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+
+    if command == "verify":
+        with engine.connect() as conn:
+            drift = verify_user_stats(conn)
+        for user_id, differences in drift.items():
+            details = ", ".join(f"{name} {stored} != {actual}" for name, (stored, actual) in differences.items())
+            print(f"   user {user_id}: {details}")
+        if drift:
+            print(f"❌ {len(drift)} users have drifted statistics; run `python maintain_stats.py rebuild`.")
+            sys.exit(1)
+        print("✅ All counters and rollups match the data.")
+    elif command == "rebuild":
+        user_ids = [int(user_id) for user_id in sys.argv[2:]] or None
+        with engine.begin() as conn:
+            rebuilt = rebuild_user_stats(conn, user_ids)
+        print(f"✅ Rebuilt the statistics of {rebuilt} users.")
+    elif command == "backfill":
+        done = backfill_user_stats(engine, progress=lambda done: print(f"   {done} users..."))
+        print(f"✅ Backfilled the statistics of {done} users.")
+    else:
+        print(__doc__)
+        sys.exit(1)
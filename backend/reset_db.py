@@ -1,6 +1,9 @@
 """
 Script to reset the database.
 This will delete all data and recreate all tables.
+
+With --keep-schema the tables are emptied in place instead (TRUNCATE on
+PostgreSQL, batched deletes elsewhere), printing progress as it goes.
 """
 
 import sys
@@ -10,6 +13,7 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from app.core.database import reset_database, engine
+from app.core.purge import purge_all
 from app.models import user, task  # Import models to register them
 
 if __name__ == "__main__":
@@ -21,6 +25,14 @@ if __name__ == "__main__":
         sys.exit(0)
     
     try:
+        if "--keep-schema" in sys.argv:
+            print("Emptying tables...")
+            purge_all(engine, progress=lambda table, rows: print(
+                f"   {table}: {'truncated' if rows is None else f'{rows} rows deleted'}"
+            ))
+            print("✅ Database reset successfully!")
+            print("All tables have been emptied.")
+            sys.exit(0)
         print("Resetting database...")
         reset_database()
         print("✅ Database reset successfully!")
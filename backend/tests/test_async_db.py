@@ -0,0 +1,106 @@
+"""
+Tests for running the endpoint handlers in async database mode.
+"""
+
+import os
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+pytest.importorskip("aiosqlite")
+
+# Set DATABASE_URL to SQLite BEFORE importing app to avoid psycopg2 dependency
+os.environ["DATABASE_URL"] = "sqlite:///./test.db"
+os.environ["SECRET_KEY"] = "test-secret-key"
+
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from app.api.endpoints import tasks, pomodoro, stats
+from app.api.routing import SessionRouter
+from app.core.database import Base, get_async_db
+from app.core.dependencies import get_current_active_user
+from app.models.user import User
+
+# Import models to ensure they're registered with Base
+from app.models import user, task
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_async.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+async_engine = create_async_engine("sqlite+aiosqlite:///./test_async.db")
+AsyncTestingSessionLocal = async_sessionmaker(async_engine, autoflush=False)
+
+async def override_get_async_db():
+    async with AsyncTestingSessionLocal() as db:
+        yield db
+
+def override_get_current_user():
+    db = TestingSessionLocal()
+    try:
+        return db.query(User).filter(User.username == "asyncuser").first()
+    finally:
+        db.close()
+
+def build_async_app() -> FastAPI:
+    """Register the real task/pomodoro/stats handlers on async-mode routers"""
+    app = FastAPI()
+    for prefix, source in (("/tasks", tasks.router), ("/pomodoro", pomodoro.router), ("/stats", stats.router)):
+        router = SessionRouter(async_mode=True)
+        for route in source.routes:
+            router.add_api_route(
+                route.path,
+                route.endpoint,
+                response_model=route.response_model,
+                status_code=route.status_code,
+                methods=list(route.methods),
+            )
+        app.include_router(router, prefix=prefix)
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.dependency_overrides[get_current_active_user] = override_get_current_user
+    return app
+
+@pytest.fixture(scope="function")
+def client():
+    Base.metadata.create_all(bind=engine)
+    db = TestingSessionLocal()
+    db.add(User(username="asyncuser", email="async@example.com", hashed_password="x", is_active=True))
+    db.commit()
+    db.close()
+
+    yield TestClient(build_async_app())
+
+    Base.metadata.drop_all(bind=engine)
+
+def test_async_routes_are_coroutines():
+    """Test that sync handlers are registered as coroutines in async mode"""
+    import asyncio
+    router = SessionRouter(async_mode=True)
+    router.add_api_route("/", tasks.read_tasks, methods=["GET"])
+    assert asyncio.iscoroutinefunction(router.routes[0].endpoint)
+
+def test_task_and_session_flow(client):
+    """Test creating, listing and completing through the async session"""
+    response = client.post("/tasks/", json={"title": "Async task"})
+    assert response.status_code == 201
+    task_id = response.json()["id"]
+
+    response = client.post("/pomodoro/", json={"task_id": task_id, "duration_minutes": 25, "session_type": "work"})
+    assert response.status_code == 201
+    session_id = response.json()["id"]
+    assert client.post(f"/pomodoro/{session_id}/start").status_code == 200
+    assert client.post(f"/pomodoro/{session_id}/complete").status_code == 200
+
+    # The task listing batch-loads pomodoro_sessions through the async session
+    response = client.get("/tasks/")
+    assert response.status_code == 200
+    assert response.json()[0]["pomodoro_sessions"][0]["id"] == session_id
+
+    response = client.get("/stats/dashboard")
+    assert response.status_code == 200
+    assert response.json()["pomodoro_stats"]["completed_sessions"] == 1
+
+def test_not_found_in_async_mode(client):
+    """Test that HTTP errors raised inside run_sync propagate"""
+    assert client.get("/tasks/999").status_code == 404
@@ -0,0 +1,336 @@
+"""
+Tests for authentication endpoints.
+"""
+
+import asyncio
+import os
+import sqlite3
+import time
+from datetime import timedelta
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+
+# Set DATABASE_URL to SQLite BEFORE importing app to avoid psycopg2 dependency
+os.environ["DATABASE_URL"] = "sqlite:///./test.db"
+os.environ["SECRET_KEY"] = "test-secret-key"
+
+from app.main import app
+from app.api.endpoints.auth import duplicate_user_detail
+from app.core.database import Base, get_db
+from app.core.dependencies import get_current_active_user
+from app.core.password_hashing import PasswordHashingService, PasswordHashingUnavailable
+from app.core.principal_cache import principal_cache
+from app.core.security import create_access_token, decode_access_token, token_cache, BCRYPT_ROUNDS
+from app.core.password_policy import BcryptScheme, PasswordScheme
+from app.core.rate_limit import bucket_store, login_limiter, MemoryBucketStore, SQLiteBucketStore, RateLimiter
+from app.models.user import User
+
+# Import models to ensure they're registered with Base
+from app.models import user, task
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+@pytest.fixture(scope="function")
+def client():
+    Base.metadata.create_all(bind=engine)
+    # User ids are reused across tests, so start from an empty cache
+    principal_cache.clear()
+    bucket_store.clear()
+
+    # Use the real authentication dependency for these tests
+    saved_overrides = dict(app.dependency_overrides)
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides.pop(get_current_active_user, None)
+
+    yield TestClient(app)
+
+    app.dependency_overrides.clear()
+    app.dependency_overrides.update(saved_overrides)
+    Base.metadata.drop_all(bind=engine)
+
+def register(client, username="alice", email="alice@example.com", password="secret123"):
+    return client.post(
+        "/api/v1/auth/register",
+        json={"username": username, "email": email, "password": password}
+    )
+
+def login(client, username="alice", password="secret123"):
+    return client.post(
+        "/api/v1/auth/login",
+        data={"username": username, "password": password}
+    )
+
+def test_register_and_login(client):
+    """Test registering a user then logging in with username and email"""
+    response = register(client)
+    assert response.status_code == 201
+    assert response.json()["username"] == "alice"
+
+    response = login(client)
+    assert response.status_code == 200
+    token = response.json()["access_token"]
+
+    response = login(client, username="alice@example.com")
+    assert response.status_code == 200
+
+    me = client.get("/api/v1/auth/me", headers={"Authorization": f"Bearer {token}"})
+    assert me.status_code == 200
+    assert me.json()["email"] == "alice@example.com"
+
+def test_auth_database_work_runs_off_the_event_loop(client, monkeypatch):
+    """Test that register and login run their queries and commits in the threadpool, not on the event loop"""
+    from app.api.endpoints import auth
+    called, on_loop = [], []
+    def recording(fn):
+        def wrapper(*args):
+            called.append(fn.__name__)
+            try:
+                asyncio.get_running_loop()
+                on_loop.append(fn.__name__)
+            except RuntimeError:
+                pass
+            return fn(*args)
+        return wrapper
+    for name in ("insert_user", "find_login_user"):
+        monkeypatch.setattr(auth, name, recording(getattr(auth, name)))
+
+    assert register(client).status_code == 201
+    assert login(client).status_code == 200
+    assert called == ["insert_user", "find_login_user"]
+    assert on_loop == []
+
+def test_register_duplicate_email(client):
+    """Test that a duplicate email is rejected"""
+    register(client)
+    response = register(client, username="alice2")
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Email already registered"
+
+def test_register_duplicate_username(client):
+    """Test that a duplicate username is rejected and no row is left behind"""
+    register(client)
+    response = register(client, email="other@example.com")
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Username already taken"
+
+    db = TestingSessionLocal()
+    assert db.query(User).count() == 1
+    db.close()
+
+def test_duplicate_user_detail_matches_the_constraint():
+    """Test that duplicates map by constraint, not by words in the conflicting value"""
+    class Diag:
+        constraint_name = "ix_users_username"
+
+    class UniqueViolation(Exception):
+        diag = Diag()
+
+    # PostgreSQL's message quotes the duplicate value
+    postgresql = UniqueViolation(
+        'duplicate key value violates unique constraint "ix_users_username"\n'
+        "DETAIL:  Key (username)=(email_fan) already exists."
+    )
+    assert duplicate_user_detail(IntegrityError("INSERT", {}, postgresql)) == "Username already taken"
+    Diag.constraint_name = "ix_users_email"
+    assert duplicate_user_detail(IntegrityError("INSERT", {}, postgresql)) == "Email already registered"
+    Diag.constraint_name = "users_pkey"
+    assert duplicate_user_detail(IntegrityError("INSERT", {}, postgresql)) == "User already exists"
+
+    sqlite = Exception("UNIQUE constraint failed: users.username")
+    assert duplicate_user_detail(IntegrityError("INSERT", {}, sqlite)) == "Username already taken"
+
+def test_register_duplicate_username_containing_email(client):
+    """Test that a duplicate username mentioning "email" is still reported as a username"""
+    register(client, username="email_fan")
+    response = register(client, username="email_fan", email="other@example.com")
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Username already taken"
+
+def test_login_wrong_password(client):
+    """Test that a wrong password is rejected"""
+    register(client)
+    response = login(client, password="wrong-password")
+    assert response.status_code == 401
+
+def test_hashing_metrics(client):
+    """Test that hashing work is reported by the admin metrics endpoint"""
+    register(client)
+    login(client)
+    metrics = client.get("/api/v1/admin/metrics").json()["password_hashing"]
+    assert metrics["completed"] >= 2
+    assert metrics["latency"]["count"] >= 2
+    assert metrics["in_flight"] == 0
+
+def test_principal_cache_hit_and_invalidation(client):
+    """Test that cached principals are reused and dropped when a user is deactivated"""
+    register(client)
+    token = login(client).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    hits_before = principal_cache.stats()["hits"]
+    assert client.get("/api/v1/auth/me", headers=headers).status_code == 200
+    assert client.get("/api/v1/auth/me", headers=headers).status_code == 200
+    assert principal_cache.stats()["hits"] == hits_before + 1
+
+    db = TestingSessionLocal()
+    db.query(User).filter(User.username == "alice").one().is_active = False
+    db.commit()
+    db.close()
+
+    response = client.get("/api/v1/auth/me", headers=headers)
+    assert response.status_code == 403
+
+def test_low_cost_hash_upgraded_on_login(client):
+    """Test that a low-cost bcrypt hash is transparently rehashed on login"""
+    db = TestingSessionLocal()
+    db.add(User(
+        username="legacy",
+        email="legacy@example.com",
+        hashed_password=BcryptScheme().hash("secret123", cost=4),
+    ))
+    db.commit()
+    db.close()
+
+    assert login(client, username="legacy").status_code == 200
+
+    db = TestingSessionLocal()
+    stored = db.query(User).filter(User.username == "legacy").one().hashed_password
+    db.close()
+    assert stored.startswith(f"$2b${BCRYPT_ROUNDS:02d}$")
+    assert login(client, username="legacy").status_code == 200
+
+def test_legacy_passlib_hash_upgraded_on_login(client):
+    """Test that a non-bcrypt legacy hash verifies and is upgraded to bcrypt"""
+    from passlib.hash import pbkdf2_sha256
+
+    db = TestingSessionLocal()
+    db.add(User(
+        username="legacy",
+        email="legacy@example.com",
+        hashed_password=pbkdf2_sha256.hash("secret123"),
+    ))
+    db.commit()
+    db.close()
+
+    assert login(client, username="legacy", password="wrong-password").status_code == 401
+    assert login(client, username="legacy").status_code == 200
+
+    db = TestingSessionLocal()
+    stored = db.query(User).filter(User.username == "legacy").one().hashed_password
+    db.close()
+    assert stored.startswith("$2b$")
+
+def test_incomplete_password_scheme_cannot_be_instantiated():
+    """Test that a scheme missing a method fails when created, not at login"""
+    class VerifyOnly(PasswordScheme):
+        name = "verify-only"
+
+        def identify(self, hashed):
+            return hashed.startswith("$v$")
+
+        def verify(self, password, hashed):
+            return False
+
+    with pytest.raises(TypeError):
+        VerifyOnly()
+    assert BcryptScheme().identify(BcryptScheme().hash("secret123", cost=4))
+
+def test_token_cache_evicts_at_expiry():
+    """Test that cached token payloads are not served past the exp claim"""
+    token = create_access_token({"sub": "42"}, expires_delta=timedelta(seconds=1))
+    assert decode_access_token(token)["sub"] == "42"
+
+    hits_before = token_cache.stats()["hits"]
+    assert decode_access_token(token)["sub"] == "42"
+    assert token_cache.stats()["hits"] == hits_before + 1
+
+    time.sleep(2.1)
+    assert decode_access_token(token) is None
+
+def test_login_throttled_before_lookup(client):
+    """Test that repeated login attempts for one username are rejected with 429"""
+    attempts, _window = login_limiter.rules["username"]
+    for _ in range(attempts):
+        assert login(client, username="nobody").status_code == 401
+
+    response = login(client, username="nobody")
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+
+    # Other usernames from the same client are still admitted
+    assert login(client, username="someone-else").status_code == 401
+
+    state = client.get("/api/v1/admin/metrics").json()["auth_rate_limit"]
+    assert state["login"]["rejected_by_kind"]["username"] >= 1
+
+@pytest.mark.parametrize("store_kind", ["memory", "sqlite"])
+def test_rate_limiter_buckets(store_kind, tmp_path):
+    """Test all-or-nothing admission across keys for both bucket stores"""
+    if store_kind == "sqlite":
+        store = SQLiteBucketStore(str(tmp_path / "buckets.db"))
+    else:
+        store = MemoryBucketStore()
+    limiter = RateLimiter(store, scope="test", rules={"ip": (2, 10), "username": (1, 10)})
+
+    assert limiter.hit(ip="1.2.3.4", username="a") is None
+    # 'a' is empty: rejected without spending the IP's last token
+    assert limiter.hit(ip="1.2.3.4", username="a") == 10
+    assert limiter.hit(ip="1.2.3.4", username="b") is None
+    assert limiter.hit(ip="1.2.3.4", username="c") is not None
+
+def test_sqlite_bucket_wait_leaves_event_loop_running(tmp_path):
+    """Test that a take waiting for another worker's lock on the bucket file doesn't stall the event loop"""
+    path = str(tmp_path / "buckets.db")
+    limiter = RateLimiter(SQLiteBucketStore(path), scope="test", rules={"ip": (5, 10)})
+    other_worker = sqlite3.connect(path, isolation_level=None)
+    other_worker.execute("BEGIN IMMEDIATE")
+
+    async def attempt_while_locked():
+        attempt = asyncio.create_task(limiter.hit_async(ip="1.2.3.4"))
+        ticks = 0
+        started = time.monotonic()
+        while time.monotonic() - started < 0.3:
+            await asyncio.sleep(0.01)
+            ticks += 1
+        assert not attempt.done()
+        other_worker.execute("COMMIT")
+        return ticks, await attempt
+
+    ticks, retry_after = asyncio.run(attempt_while_locked())
+    other_worker.close()
+    assert ticks >= 10
+    assert retry_after is None
+
+def test_hashing_queue_full_is_rejected():
+    """Test that submissions beyond pool size + queue depth are rejected"""
+    service = PasswordHashingService(pool_size=1, queue_depth=0, timeout=30)
+
+    async def hash_twice():
+        return await asyncio.gather(
+            service.hash("first-password"),
+            service.hash("second-password"),
+            return_exceptions=True,
+        )
+
+    try:
+        first, second = asyncio.run(hash_twice())
+    finally:
+        service.shutdown()
+
+    assert isinstance(first, str) and first.startswith("$2")
+    assert isinstance(second, PasswordHashingUnavailable)
+    assert service.metrics()["rejected"] == 1
@@ -0,0 +1,147 @@
+"""
+Tests for database engine configuration and connection pooling.
+"""
+
+import os
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError, TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+# Set DATABASE_URL to SQLite BEFORE importing app to avoid psycopg2 dependency
+os.environ["DATABASE_URL"] = "sqlite:///./test.db"
+os.environ["SECRET_KEY"] = "test-secret-key"
+
+from app.core.database import Base, get_db
+from app.core.pool import InstrumentedQueuePool, pool_snapshot, warm_up_pool
+from app.core.sqlite_engine import create_sqlite_engine
+from app.core.replicas import READ_ONLY_KEY, REPLICAS_KEY, ReplicaSet, RoutingSession, route_reads
+from app.models.user import User
+
+def test_pool_metrics_record_waits_and_timeouts(tmp_path):
+    """Test checkout counting, timeout counting and pool gauges"""
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05,
+    )
+    assert warm_up_pool(engine, 5) == 1
+
+    held = engine.connect()
+    snapshot = pool_snapshot(engine.pool)
+    assert snapshot["checked_out"] == 1
+    assert snapshot["overflow"] == 0
+
+    with pytest.raises(PoolTimeoutError):
+        engine.connect()
+    held.close()
+
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+    snapshot = pool_snapshot(engine.pool)
+    assert snapshot["checkout_timeouts"] == 1
+    assert snapshot["checkouts"] == 3
+    assert snapshot["checkout_wait"]["count"] == 4
+    assert snapshot["checkout_wait"]["max_ms"] >= 50
+
+def test_pool_metrics_survive_dispose(tmp_path):
+    """Test that engine.dispose() keeps the pool's metrics history"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=InstrumentedQueuePool)
+    engine.connect().close()
+    engine.dispose()
+    assert pool_snapshot(engine.pool)["checkouts"] == 1
+
+def test_sqlite_file_engine_is_pooled_and_tuned(tmp_path):
+    """Test that SQLite files get a queue pool, WAL and the configured PRAGMAs"""
+    engine = create_sqlite_engine(f"sqlite:///{tmp_path / 'wal.db'}", {"pool_size": 2})
+    assert isinstance(engine.pool, InstrumentedQueuePool)
+
+    with engine.connect() as first, engine.connect() as second:
+        assert first.connection.dbapi_connection is not second.connection.dbapi_connection
+        assert first.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert first.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert first.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+        assert second.execute(text("PRAGMA cache_size")).scalar() == -16384
+
+def test_sqlite_memory_engine_keeps_static_pool():
+    """Test that in-memory databases share one connection"""
+    engine = create_sqlite_engine("sqlite://", {"pool_size": 2})
+    assert isinstance(engine.pool, StaticPool)
+
+@pytest.fixture
+def replicated(tmp_path):
+    """A primary and two replica SQLite files, each with a distinguishable user"""
+    engines = {}
+    for name in ("primary", "replica1", "replica2"):
+        engines[name] = create_engine(f"sqlite:///{tmp_path / name}.db")
+        Base.metadata.create_all(bind=engines[name])
+        with sessionmaker(bind=engines[name])() as db:
+            db.add(User(username=name, email=f"{name}@example.com", hashed_password="x"))
+            db.commit()
+    replicas = ReplicaSet([engines["replica1"], engines["replica2"]], eject_seconds=60)
+    SessionLocal = sessionmaker(
+        bind=engines["primary"], class_=RoutingSession, info={REPLICAS_KEY: replicas}
+    )
+    return SessionLocal, replicas
+
+def test_read_only_sessions_use_replicas_round_robin(replicated):
+    """Test that each read-only session reads from the next replica, once chosen"""
+    SessionLocal, replicas = replicated
+    seen = []
+    for _ in range(3):
+        with SessionLocal() as db:
+            route_reads(db, "GET")
+            first = db.query(User.username).scalar()
+            assert db.query(User.username).scalar() == first
+            seen.append(first)
+    assert seen == ["replica1", "replica2", "replica1"]
+
+    with SessionLocal() as db:
+        route_reads(db, "POST")
+        assert db.query(User.username).scalar() == "primary"
+
+def test_reads_after_write_stay_on_primary(replicated):
+    """Test that a read-only session sticks to the primary once it writes"""
+    SessionLocal, _ = replicated
+    with SessionLocal() as db:
+        route_reads(db, "GET")
+        assert db.query(User.username).scalar() == "replica1"
+        db.add(User(username="new", email="new@example.com", hashed_password="x"))
+        db.flush()
+        assert {name for (name,) in db.query(User.username)} == {"primary", "new"}
+
+def test_failing_replica_is_ejected(replicated, tmp_path):
+    """Test ejection on connection errors and falling back to the primary"""
+    primary = replicated[0].kw["bind"]
+    broken = create_engine(f"sqlite:///{tmp_path / 'missing' / 'replica.db'}")
+    replicas = ReplicaSet([broken], eject_seconds=60)
+    SessionLocal = sessionmaker(bind=primary, class_=RoutingSession, info={REPLICAS_KEY: replicas})
+
+    with SessionLocal() as db:
+        route_reads(db, "GET")
+        with pytest.raises(OperationalError):
+            db.query(User.username).scalar()
+    assert replicas.status()[0]["healthy"] is False
+    assert replicas.status()[0]["ejections"] == 1
+
+    with SessionLocal() as db:
+        route_reads(db, "GET")
+        assert db.query(User.username).scalar() == "primary"
+
+def test_get_db_marks_read_only_requests():
+    """Test that only GET/HEAD request sessions may use replicas"""
+    app = FastAPI()
+
+    @app.api_route("/", methods=["GET", "POST"])
+    def read_only(db=Depends(get_db)):
+        return db.info[READ_ONLY_KEY]
+
+    client = TestClient(app)
+    assert client.get("/").json() is True
+    assert client.post("/").json() is False
@@ -0,0 +1,129 @@
+"""
+Tests for the Alembic migrations and the startup schema check.
+"""
+
+import os
+import pytest
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.runtime.migration import MigrationContext
+from sqlalchemy import create_engine, inspect
+
+# Set DATABASE_URL to SQLite BEFORE importing app to avoid psycopg2 dependency
+os.environ["DATABASE_URL"] = "sqlite:///./test.db"
+os.environ["SECRET_KEY"] = "test-secret-key"
+
+from app.core.database import Base
+from app.core.migrations import (
+    SchemaVersionError,
+    alembic_config,
+    current_revision,
+    head_revision,
+    stamp_head,
+    verify_schema,
+)
+from app.core.user_stats import verify_user_stats
+
+# Import models to ensure they're registered with Base
+from app.models import user, task
+
+def upgrade(engine, revision="head"):
+    config = alembic_config()
+    with engine.begin() as connection:
+        config.attributes["connection"] = connection
+        command.upgrade(config, revision)
+
+@pytest.fixture
+def engine(tmp_path):
+    return create_engine(f"sqlite:///{tmp_path / 'migrations.db'}")
+
+@pytest.mark.filterwarnings("ignore:.*expression-based index")
+def test_migrations_match_models(engine):
+    """Test that upgrading to head produces exactly the schema of the models"""
+    upgrade(engine)
+    with engine.connect() as connection:
+        assert current_revision(connection) == head_revision()
+        diff = compare_metadata(MigrationContext.configure(connection), Base.metadata)
+        # Alembic can't compare expression indexes; check they exist at least
+        expression_indexes = connection.exec_driver_sql(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND name = 'ix_tasks_user_id_priority_rank_id'"
+        ).all()
+    assert diff == []
+    assert len(expression_indexes) == 1
+
+def test_baseline_adopts_create_all_schema(engine):
+    """Test that databases built by the old create_all() upgrade in place"""
+    # The baseline schema without a version table, as create_all() used to leave it
+    upgrade(engine, "0001")
+    with engine.begin() as connection:
+        connection.exec_driver_sql("DROP TABLE alembic_version")
+        connection.exec_driver_sql(
+            "INSERT INTO users (id, email, username, hashed_password) VALUES (1, 'a@example.com', 'a', 'x'), (2, 'b@example.com', 'b', 'x')"
+        )
+        connection.exec_driver_sql("INSERT INTO tasks (id, title, user_id) VALUES (1, 'A', 1), (2, 'B', 2)")
+        connection.exec_driver_sql(
+            "INSERT INTO pomodoro_sessions (id, task_id, duration_minutes, session_type) VALUES (1, 1, 25, 'work'), (2, 2, 25, 'work'), (3, 2, 5, 'short_break')"
+        )
+
+    upgrade(engine)
+    indexes = {index["name"] for index in inspect(engine).get_indexes("pomodoro_sessions")}
+    assert "ix_pomodoro_sessions_task_id_created_at" in indexes
+    with engine.connect() as connection:
+        owners = connection.exec_driver_sql("SELECT id, user_id FROM pomodoro_sessions ORDER BY id").all()
+    assert owners == [(1, 1), (2, 2), (3, 2)]
+
+    # The counters are backfilled like a rebuild would compute them
+    with engine.connect() as connection:
+        counters = connection.exec_driver_sql("SELECT user_id, tasks, sessions FROM user_stats ORDER BY user_id").all()
+        assert verify_user_stats(connection) == {}
+    assert counters == [(1, 1, 1), (2, 1, 2)]
+
+def test_hourly_rollups_backfill(engine):
+    """Test that the rollups are backfilled from sessions, archived sessions and completed tasks"""
+    upgrade(engine, "0006")
+    with engine.begin() as connection:
+        connection.exec_driver_sql("INSERT INTO users (id, email, username, hashed_password) VALUES (1, 'a@example.com', 'a', 'x')")
+        connection.exec_driver_sql(
+            "INSERT INTO tasks (id, title, user_id, status, completed_at) VALUES "
+            "(1, 'A', 1, 'DONE', '2026-03-02 09:15:00.000000'), (2, 'B', 1, 'TODO', NULL)"
+        )
+        connection.exec_driver_sql(
+            "INSERT INTO pomodoro_sessions (id, task_id, user_id, duration_minutes, session_type, completed_at, actual_duration_minutes, created_at) VALUES "
+            "(1, 1, 1, 25, 'work', '2026-03-02 09:40:00.000000', 25, '2026-03-02 09:10:00.000000'), "
+            "(2, 1, 1, 5, 'short_break', NULL, NULL, '2026-03-02 09:50:00.000000'), "
+            "(3, 2, 1, 25, 'work', NULL, NULL, '2026-03-02 00:05:00.000000')"
+        )
+        connection.exec_driver_sql(
+            "INSERT INTO pomodoro_session_archive (user_id, day, task_id, session_type, sessions, completed_sessions, completed_minutes, timed_sessions) "
+            "VALUES (1, '2026-03-02', 2, 'work', 2, 1, 20, 1)"
+        )
+
+    upgrade(engine)
+    with engine.connect() as connection:
+        rollups = connection.exec_driver_sql(
+            "SELECT hour, sessions, completed_sessions, work_minutes, tasks_completed FROM user_stats_hourly ORDER BY hour"
+        ).all()
+        assert verify_user_stats(connection) == {}
+    assert rollups == [
+        ("2026-03-02 00:00:00.000000", 3, 1, 20, 0),
+        ("2026-03-02 09:00:00.000000", 2, 1, 25, 1),
+    ]
+
+def test_verify_schema(engine):
+    """Test that startup refuses unmigrated or outdated databases"""
+    with pytest.raises(SchemaVersionError):
+        verify_schema(engine)
+
+    upgrade(engine, "0001")
+    with pytest.raises(SchemaVersionError):
+        verify_schema(engine)
+
+    upgrade(engine)
+    assert verify_schema(engine) == head_revision()
+
+def test_stamp_head_after_create_all(engine):
+    """Test that create_all plus stamp_head passes the schema check"""
+    with engine.begin() as connection:
+        Base.metadata.create_all(bind=connection)
+        stamp_head(connection)
+    assert verify_schema(engine) == head_revision()
@@ -0,0 +1,101 @@
+"""
+Tests for bulk purges and the admin deletion endpoints.
+"""
+
+import os
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, func, insert, select
+
+# Set DATABASE_URL to SQLite BEFORE importing app to avoid psycopg2 dependency
+os.environ["DATABASE_URL"] = "sqlite:///./test.db"
+os.environ["SECRET_KEY"] = "test-secret-key"
+
+from app.main import app
+from app.core.database import Base, get_db
+from app.core.principal_cache import principal_cache
+from app.core.purge import purge_all, purge_user
+from app.models.task import PomodoroSession, Task
+from app.models.user import User
+
+users = User.__table__
+tasks = Task.__table__
+sessions = PomodoroSession.__table__
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'purge.db'}")
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+def populate(engine, user_ids=(1, 2), tasks_per_user=4, sessions_per_task=2):
+    with engine.begin() as conn:
+        conn.execute(insert(users), [
+            {"id": u, "email": f"user{u}@example.com", "username": f"user{u}", "hashed_password": "x", "is_active": True}
+            for u in user_ids
+        ])
+        task_rows = [
+            {"id": u * 100 + t, "title": f"Task {t}", "user_id": u}
+            for u in user_ids for t in range(tasks_per_user)
+        ]
+        conn.execute(insert(tasks), task_rows)
+        conn.execute(insert(sessions), [
+            {"task_id": task["id"], "user_id": task["user_id"], "duration_minutes": 25, "session_type": "work"}
+            for task in task_rows for _ in range(sessions_per_task)
+        ])
+
+def row_counts(engine):
+    with engine.connect() as conn:
+        return {
+            table.name: conn.scalar(select(func.count()).select_from(table))
+            for table in (users, tasks, sessions)
+        }
+
+def test_purge_user_deletes_only_that_user_in_batches(engine):
+    """Test that a user's rows go in bounded batches and other users keep theirs"""
+    populate(engine)
+    progress = []
+    deleted = purge_user(engine, 1, batch_size=3, progress=lambda table, rows: progress.append((table, rows)))
+
+    assert deleted == {"pomodoro_session_archive": 0, "pomodoro_sessions": 8, "tasks": 4, "user_activity": 0, "user_stats": 0, "user_stats_hourly": 0, "users": 1}
+    assert row_counts(engine) == {"users": 1, "tasks": 4, "pomodoro_sessions": 8}
+    assert [step for step in progress if step[0] in ("pomodoro_sessions", "tasks", "users")] == [
+        ("pomodoro_sessions", 3), ("pomodoro_sessions", 6), ("pomodoro_sessions", 8),
+        ("tasks", 3), ("tasks", 4),
+        ("users", 1),
+    ]
+    assert purge_user(engine, 1) is None
+
+def test_purge_all_empties_every_table(engine):
+    """Test that purge_all empties children before parents, one batch at a time"""
+    populate(engine, user_ids=(1, 2, 3))
+    deleted = purge_all(engine, batch_size=5)
+    assert deleted == {"pomodoro_session_archive": 0, "pomodoro_sessions": 24, "tasks": 12, "user_activity": 0, "user_stats": 0, "user_stats_hourly": 0, "users": 3}
+    assert row_counts(engine) == {"users": 0, "tasks": 0, "pomodoro_sessions": 0}
+
+@pytest.fixture
+def client():
+    app_engine = create_engine("sqlite:///./test.db", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=app_engine)
+    principal_cache.clear()
+    yield TestClient(app), app_engine
+    Base.metadata.drop_all(bind=app_engine)
+
+def test_admin_purge_endpoints(client):
+    """Test the per-user and full deletion endpoints"""
+    client, app_engine = client
+    populate(app_engine)
+
+    response = client.delete("/api/v1/admin/users/1")
+    assert response.status_code == 200
+    assert response.json()["deleted"] == {"pomodoro_session_archive": 0, "pomodoro_sessions": 8, "tasks": 4, "user_activity": 0, "user_stats": 0, "user_stats_hourly": 0, "users": 1}
+    assert client.delete("/api/v1/admin/users/1").status_code == 404
+
+    response = client.delete("/api/v1/admin/users")
+    assert response.status_code == 200
+    assert response.json()["message"] == "Deleted 1 users and all associated data"
+
+    populate(app_engine)
+    response = client.post("/api/v1/admin/reset-db")
+    assert response.status_code == 200
+    assert row_counts(app_engine) == {"users": 0, "tasks": 0, "pomodoro_sessions": 0}
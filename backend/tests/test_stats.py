@@ -0,0 +1,553 @@
+"""
+Tests for statistics endpoints.
+"""
+
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+import pytest
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, func
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.util import greenlet_spawn
+
+# Set DATABASE_URL to SQLite BEFORE importing app to avoid psycopg2 dependency
+os.environ["DATABASE_URL"] = "sqlite:///./test.db"
+os.environ["SECRET_KEY"] = "test-secret-key"
+
+from app.main import app
+from app.core.activity import DailyActivity, streaks
+from app.core.archive import archive_sessions
+from app.core.database import Base, get_db
+from app.core.dependencies import get_current_active_user
+from app.core.cache import TTLCache
+from app.core.stats_cache import MemoryVersionStore, SQLiteVersionStore, StatsCache, _wait, stats_cache
+from app.core.user_stats import backfill_user_stats, rebuild_user_stats, verify_user_stats
+from app.models.task import PomodoroSession, PomodoroSessionArchive, Task, TaskPriority, TaskStatus
+from app.models.user import User
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+# The user the requests are made as (set by the fixture)
+current_user = {}
+
+def override_get_current_user():
+    return current_user["user"]
+
+@pytest.fixture
+def client():
+    Base.metadata.create_all(bind=engine)
+    stats_cache.clear()
+    saved_overrides = dict(app.dependency_overrides)
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_current_active_user] = override_get_current_user
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+    app.dependency_overrides.update(saved_overrides)
+    Base.metadata.drop_all(bind=engine)
+
+def populate(seed: int, users: int = 3):
+    """Random tasks and sessions for a few users; returns the users"""
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    db = TestingSessionLocal()
+    created_users = []
+    for u in range(users):
+        user = User(username=f"user{seed}_{u}", email=f"user{seed}_{u}@example.com", hashed_password="x")
+        db.add(user)
+        db.flush()
+        created_users.append(user)
+        for t in range(rng.randint(0, 6)):
+            task = Task(
+                title=f"Task {t}",
+                user_id=user.id,
+                status=rng.choice(list(TaskStatus)),
+                priority=rng.choice(list(TaskPriority)),
+            )
+            db.add(task)
+            db.flush()
+            for _ in range(rng.randint(0, 12)):
+                # Mostly today and the last few days, some long ago
+                created = now - timedelta(days=rng.choice([0, 0, 1, 3, 40, 400]), minutes=rng.randint(0, 300))
+                completed = rng.random() < 0.6
+                db.add(PomodoroSession(
+                    task_id=task.id,
+                    user_id=user.id,
+                    duration_minutes=25,
+                    session_type=rng.choice(["work", "work", "short_break", "long_break"]),
+                    started_at=created if completed or rng.random() < 0.5 else None,
+                    completed_at=created + timedelta(minutes=25) if completed else None,
+                    actual_duration_minutes=rng.choice([None, 3, 17, 25]) if completed else None,
+                    created_at=created,
+                ))
+    db.commit()
+    # Written behind the API's back, so the counters need a rebuild
+    with engine.begin() as connection:
+        rebuild_user_stats(connection)
+    for user in created_users:
+        db.refresh(user)
+        db.expunge(user)
+    db.close()
+    return created_users
+
+# Reference implementation: the previous one-query-per-figure endpoints
+def reference_dashboard(db, user_id):
+    archived = db.query(
+        func.coalesce(func.sum(PomodoroSessionArchive.sessions), 0),
+        func.coalesce(func.sum(PomodoroSessionArchive.completed_sessions), 0),
+        func.coalesce(func.sum(PomodoroSessionArchive.completed_minutes), 0),
+        func.coalesce(func.sum(PomodoroSessionArchive.timed_sessions), 0),
+    ).filter(PomodoroSessionArchive.user_id == user_id).one()
+    archived_work_minutes = db.query(func.coalesce(func.sum(PomodoroSessionArchive.completed_minutes), 0)).filter(
+        PomodoroSessionArchive.user_id == user_id, PomodoroSessionArchive.session_type == "work"
+    ).scalar()
+
+    total_tasks = db.query(func.count(Task.id)).filter(Task.user_id == user_id).scalar()
+    by_status = {
+        status: db.query(func.count(Task.id)).filter(Task.user_id == user_id, Task.status == status).scalar()
+        for status in TaskStatus
+    }
+    completion_rate = (by_status[TaskStatus.DONE] / total_tasks * 100) if total_tasks > 0 else 0
+
+    sessions = db.query(PomodoroSession).filter(PomodoroSession.user_id == user_id)
+    completed = sessions.filter(PomodoroSession.completed_at.isnot(None))
+    total_sessions = sessions.count() + archived[0]
+    completed_sessions = completed.count() + archived[1]
+    total_work_minutes = (completed.filter(PomodoroSession.session_type == "work").with_entities(
+        func.sum(PomodoroSession.actual_duration_minutes)).scalar() or 0) + archived_work_minutes
+    duration_sum = (completed.with_entities(func.sum(PomodoroSession.actual_duration_minutes)).scalar() or 0) + archived[2]
+    duration_count = completed.with_entities(func.count(PomodoroSession.actual_duration_minutes)).scalar() + archived[3]
+    today = datetime.utcnow().date()
+    tomorrow = today + timedelta(days=1)
+    created_today = sessions.filter(PomodoroSession.created_at >= today, PomodoroSession.created_at < tomorrow)
+    work_minutes_today = created_today.filter(
+        PomodoroSession.session_type == "work", PomodoroSession.completed_at.isnot(None)
+    ).with_entities(func.sum(PomodoroSession.actual_duration_minutes)).scalar() or 0
+
+    return {
+        "task_stats": {
+            "total_tasks": total_tasks,
+            "completed_tasks": by_status[TaskStatus.DONE],
+            "in_progress_tasks": by_status[TaskStatus.IN_PROGRESS],
+            "todo_tasks": by_status[TaskStatus.TODO],
+            "completion_rate": round(completion_rate, 2),
+        },
+        "pomodoro_stats": {
+            "total_sessions": total_sessions,
+            "completed_sessions": completed_sessions,
+            "total_work_minutes": total_work_minutes,
+            "average_session_duration": round(duration_sum / duration_count if duration_count else 0, 2),
+            "sessions_today": created_today.count(),
+            "work_minutes_today": work_minutes_today,
+        },
+    }
+
+def reference_pomodoro_summary(db, user_id):
+    by_type = {}
+    for model, count in (
+        (PomodoroSession, func.count(PomodoroSession.id)),
+        (PomodoroSessionArchive, func.sum(PomodoroSessionArchive.sessions)),
+    ):
+        for session_type, value in db.query(model.session_type, count).filter(
+            model.user_id == user_id
+        ).group_by(model.session_type).all():
+            by_type[session_type] = by_type.get(session_type, 0) + value
+    dashboard = reference_dashboard(db, user_id)["pomodoro_stats"]
+    total, completed = dashboard["total_sessions"], dashboard["completed_sessions"]
+    return {
+        "sessions_by_type": by_type,
+        "completion_rate": round((completed / total * 100), 2) if total > 0 else 0,
+    }
+
+@pytest.mark.parametrize("seed", range(5))
+def test_stats_match_reference_on_random_data(client, seed):
+    """Test that the single-pass statistics equal the per-figure queries"""
+    users = populate(seed)
+    if seed % 2:
+        archive_sessions(engine, horizon_days=30)
+    db = TestingSessionLocal()
+    try:
+        for user in users:
+            current_user["user"] = user
+            assert client.get("/api/v1/stats/dashboard").json() == reference_dashboard(db, user.id)
+            assert client.get("/api/v1/stats/pomodoro/summary").json() == reference_pomodoro_summary(db, user.id)
+    finally:
+        db.close()
+
+def test_dashboard_reads_counters_and_today(client):
+    """Test that the dashboard reads the counters row and today's sessions only"""
+    current_user["user"] = populate(7, users=1)[0]
+    statements = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        client.get("/api/v1/stats/dashboard")
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    tables = sorted(statement.split()[statement.split().index("FROM") + 1] for statement in statements)
+    assert tables == ["pomodoro_sessions", "user_stats"]
+
+def test_write_paths_keep_counters_exact(client):
+    """Test that random writes through every endpoint leave the counters and rollups equal to a recount"""
+    rng = random.Random(11)
+    user = populate(0, users=1)[0]
+    current_user["user"] = user
+    statuses = ["todo", "in_progress", "done"]
+    task_ids = [client.post("/api/v1/tasks", json={"title": "Single", "status": "in_progress"}).json()["id"]]
+    session_ids = []
+    for step in range(40):
+        operation = rng.choice(["tasks", "update", "session", "complete", "edit", "ingest", "delete_session", "delete_task"])
+        if operation == "tasks":
+            created = client.post("/api/v1/tasks/batch", json={"create": [
+                {"title": f"Batch {step}", "status": rng.choice(statuses)} for _ in range(rng.randint(1, 3))
+            ]}).json()["created"]
+            task_ids += [item["id"] for item in created]
+        elif operation == "update" and task_ids:
+            client.post("/api/v1/tasks/batch", json={"update": [
+                {"id": task_id, "status": rng.choice(statuses)} for task_id in rng.sample(task_ids, min(3, len(task_ids)))
+            ]})
+            client.put(f"/api/v1/tasks/{rng.choice(task_ids)}", json={"status": rng.choice(statuses)})
+        elif operation == "session" and task_ids:
+            session_ids.append(client.post("/api/v1/pomodoro", json={
+                "task_id": rng.choice(task_ids), "duration_minutes": 25, "session_type": rng.choice(["work", "short_break"])
+            }).json()["id"])
+        elif operation == "complete" and session_ids:
+            session_id = rng.choice(session_ids)
+            client.post(f"/api/v1/pomodoro/{session_id}/start")
+            client.post(f"/api/v1/pomodoro/{session_id}/complete")
+        elif operation == "edit" and session_ids:
+            client.put(f"/api/v1/pomodoro/{rng.choice(session_ids)}", json=rng.choice([
+                {"actual_duration_minutes": rng.randint(1, 60)},
+                {"completed_at": datetime.utcnow().isoformat()},
+                {"completed_at": None},
+            ]))
+        elif operation == "ingest" and task_ids:
+            started = datetime.utcnow() - timedelta(days=rng.randint(0, 3), hours=1)
+            client.post("/api/v1/pomodoro/batch", json={"sessions": [{
+                "client_id": f"offline-{rng.randint(0, 5)}",
+                "task_id": rng.choice(task_ids),
+                "started_at": started.isoformat(),
+                "completed_at": (started + timedelta(minutes=25)).isoformat(),
+            }]})
+        elif operation == "delete_session" and session_ids:
+            client.delete(f"/api/v1/pomodoro/{session_ids.pop(rng.randrange(len(session_ids)))}")
+        elif operation == "delete_task" and task_ids:
+            task_id = task_ids.pop(rng.randrange(len(task_ids)))
+            if rng.random() < 0.5:
+                client.delete(f"/api/v1/tasks/{task_id}")
+            else:
+                client.post("/api/v1/tasks/batch", json={"delete": [task_id]})
+        if step % 10 == 0:
+            archive_sessions(engine, horizon_days=30)
+
+    db = TestingSessionLocal()
+    try:
+        assert client.get("/api/v1/stats/dashboard").json() == reference_dashboard(db, user.id)
+    finally:
+        db.close()
+    with engine.connect() as connection:
+        assert verify_user_stats(connection) == {}
+
+def reference_timeseries(db, user_id, start, end, zone):
+    """Activity per local day from the sessions, archive and tasks themselves"""
+    def local_day(value):
+        return value.replace(tzinfo=timezone.utc).astimezone(zone).date()
+    days = {}
+    for session in db.query(PomodoroSession).filter(PomodoroSession.user_id == user_id):
+        counts = days.setdefault(local_day(session.created_at), Counter())
+        counts["sessions"] += 1
+        if session.completed_at is not None:
+            counts["completed_sessions"] += 1
+            if session.session_type == "work":
+                counts["work_minutes"] += session.actual_duration_minutes or 0
+    for row in db.query(PomodoroSessionArchive).filter(PomodoroSessionArchive.user_id == user_id):
+        # Rolled up at 00:00 UTC of their day
+        counts = days.setdefault(local_day(datetime.combine(row.day, datetime.min.time())), Counter())
+        counts["sessions"] += row.sessions
+        counts["completed_sessions"] += row.completed_sessions
+        if row.session_type == "work":
+            counts["work_minutes"] += row.completed_minutes
+    for task in db.query(Task).filter(Task.user_id == user_id, Task.status == TaskStatus.DONE, Task.completed_at.isnot(None)):
+        days.setdefault(local_day(task.completed_at), Counter())["tasks_completed"] += 1
+    names = ("sessions", "completed_sessions", "work_minutes", "tasks_completed")
+    return [
+        {"start": (start + timedelta(days=offset)).isoformat(), **{name: days.get(start + timedelta(days=offset), Counter())[name] for name in names}}
+        for offset in range((end - start).days + 1)
+    ]
+
+@pytest.mark.parametrize("tz", ["UTC", "America/New_York", "Asia/Tokyo"])
+def test_timeseries_matches_sessions_by_local_day(client, tz):
+    """Test that /stats/timeseries buckets the rollups like the rows themselves, in the user's time zone"""
+    user = populate(3, users=1)[0]
+    current_user["user"] = user
+    task_id = client.post("/api/v1/tasks", json={"title": "Finish me"}).json()["id"]
+    client.put(f"/api/v1/tasks/{task_id}", json={"status": "done"})
+    archive_sessions(engine, horizon_days=30)
+    zone = ZoneInfo(tz)
+    end = datetime.now(zone).date()
+    start = end - timedelta(days=450)
+
+    response = client.get("/api/v1/stats/timeseries", params={"start": start.isoformat(), "end": end.isoformat(), "tz": tz})
+    assert response.status_code == 200
+    data = response.json()
+    assert (data["bucket"], data["timezone"], data["start"], data["end"]) == ("day", tz, start.isoformat(), end.isoformat())
+    db = TestingSessionLocal()
+    try:
+        expected = reference_timeseries(db, user.id, start, end, zone)
+    finally:
+        db.close()
+    assert data["points"] == expected
+    assert expected[-1]["tasks_completed"] == 1
+    assert sum(point["sessions"] for point in expected) > 0
+
+    # Weeks and months add up the days
+    for bucket, first_day in (("week", start - timedelta(days=start.weekday())), ("month", start.replace(day=1))):
+        points = client.get("/api/v1/stats/timeseries", params={
+            "start": start.isoformat(), "end": end.isoformat(), "tz": tz, "bucket": bucket
+        }).json()["points"]
+        assert points[0]["start"] == first_day.isoformat()
+        assert sum(point["sessions"] for point in points) == sum(point["sessions"] for point in response.json()["points"])
+
+def test_timeseries_archived_sessions_count_at_utc_midnight(client):
+    """Test that archived sessions count on the local day of 00:00 UTC, the previous one behind UTC"""
+    db = TestingSessionLocal()
+    user = User(username="archived", email="archived@example.com", hashed_password="x")
+    db.add(user)
+    db.flush()
+    task = Task(title="Old", user_id=user.id)
+    db.add(task)
+    db.flush()
+    day = datetime.utcnow().date() - timedelta(days=40)
+    created_at = datetime.combine(day, datetime.min.time()) + timedelta(hours=15)
+    db.add(PomodoroSession(
+        task_id=task.id, user_id=user.id, duration_minutes=25, actual_duration_minutes=25,
+        session_type="work", started_at=created_at, completed_at=created_at + timedelta(minutes=25),
+        created_at=created_at,
+    ))
+    db.commit()
+    with engine.begin() as connection:
+        rebuild_user_stats(connection)
+    db.refresh(user)
+    db.close()
+    current_user["user"] = user
+
+    def sessions_by_day(tz):
+        points = client.get("/api/v1/stats/timeseries", params={
+            "start": (day - timedelta(days=1)).isoformat(), "end": day.isoformat(), "tz": tz
+        }).json()["points"]
+        return [point["sessions"] for point in points]
+
+    assert sessions_by_day("America/New_York") == [0, 1]
+    assert archive_sessions(engine, horizon_days=30) == 1
+    stats_cache.clear()
+    assert sessions_by_day("UTC") == [0, 1]
+    assert sessions_by_day("Asia/Tokyo") == [0, 1]
+    assert sessions_by_day("America/New_York") == [1, 0]
+
+def test_backfill_rebuilds_every_user_in_batches(client):
+    """Test that the batched backfill restores wiped counters and rollups"""
+    populate(2, users=5)
+    with engine.begin() as connection:
+        connection.exec_driver_sql("DELETE FROM user_stats")
+        connection.exec_driver_sql("UPDATE user_stats_hourly SET sessions = sessions + 1")
+        assert verify_user_stats(connection) != {}
+    progress = []
+    assert backfill_user_stats(engine, batch_size=2, progress=progress.append) == 5
+    assert progress == [2, 4, 5]
+    with engine.connect() as connection:
+        assert verify_user_stats(connection) == {}
+
+def test_timeseries_defaults_and_errors(client):
+    """Test the default 30-day range and the rejected parameters"""
+    current_user["user"] = populate(1, users=1)[0]
+    data = client.get("/api/v1/stats/timeseries").json()
+    assert len(data["points"]) == 30
+    assert data["end"] == datetime.utcnow().date().isoformat()
+    assert client.get("/api/v1/stats/timeseries", params={"tz": "Mars/Olympus"}).status_code == 400
+    assert client.get("/api/v1/stats/timeseries", params={"start": "2026-02-01", "end": "2026-01-01"}).status_code == 400
+    assert client.get("/api/v1/stats/timeseries", params={"start": "2020-01-01", "end": "2026-01-01"}).status_code == 400
+    assert client.get("/api/v1/stats/timeseries", params={"bucket": "year"}).status_code == 422
+
+def test_heatmap_matches_sessions_and_reads_one_row(client):
+    """Test that the heatmap equals the completed work sessions per day, from the user's activity row alone"""
+    user = populate(4, users=1)[0]
+    current_user["user"] = user
+    archive_sessions(engine, horizon_days=30)
+    today = datetime.utcnow().date()
+    db = TestingSessionLocal()
+    try:
+        expected = {}
+        for session in db.query(PomodoroSession).filter(
+            PomodoroSession.user_id == user.id, PomodoroSession.session_type == "work", PomodoroSession.completed_at.isnot(None)
+        ):
+            day = expected.setdefault(session.created_at.date(), [0, 0])
+            day[0] += 1
+            day[1] += session.actual_duration_minutes or 0
+        for row in db.query(PomodoroSessionArchive).filter(
+            PomodoroSessionArchive.user_id == user.id, PomodoroSessionArchive.session_type == "work"
+        ):
+            day = expected.setdefault(row.day, [0, 0])
+            day[0] += row.completed_sessions
+            day[1] += row.completed_minutes
+    finally:
+        db.close()
+
+    statements = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        data = client.get("/api/v1/stats/heatmap").json()
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    assert [statement.split()[statement.split().index("FROM") + 1] for statement in statements] == ["user_activity"]
+
+    days = [today - timedelta(days=364 - offset) for offset in range(365)]
+    assert (data["start"], data["end"]) == (days[0].isoformat(), today.isoformat())
+    assert data["work_sessions"] == [expected.get(day, [0, 0])[0] for day in days]
+    assert data["work_minutes"] == [expected.get(day, [0, 0])[1] for day in days]
+    assert sum(data["work_sessions"]) > 0
+    assert client.get("/api/v1/stats/heatmap", params={"days": 400}).status_code == 422
+
+def test_streaks(client):
+    """Test the current and longest streaks, live through today while yesterday counts"""
+    today = datetime.utcnow().date()
+    activity = DailyActivity()
+    for offset in (10, 9, 8, 7, 3, 2, 1):
+        activity.add(today - timedelta(days=offset), {"work_sessions": 1, "work_minutes": 25})
+    result = streaks(activity, today)
+    assert (result["current_streak"], result["current_streak_start"]) == (3, today - timedelta(days=3))
+    assert (result["longest_streak"], result["longest_streak_start"], result["longest_streak_end"]) == (
+        4, today - timedelta(days=10), today - timedelta(days=7)
+    )
+    assert result["active_days"] == 7
+    assert streaks(activity, today + timedelta(days=2))["current_streak"] == 0
+    assert streaks(DailyActivity(), today)["longest_streak"] == 0
+
+    # Through the API: an offline session yesterday, then one completed today
+    db = TestingSessionLocal()
+    user = User(username="streaker", email="streaker@example.com", hashed_password="x")
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    db.expunge(user)
+    db.close()
+    current_user["user"] = user
+    assert client.get("/api/v1/stats/streaks").json()["current_streak"] == 0
+    task_id = client.post("/api/v1/tasks", json={"title": "Focus"}).json()["id"]
+    yesterday = datetime.combine(today - timedelta(days=1), datetime.min.time()) + timedelta(hours=12)
+    client.post("/api/v1/pomodoro/batch", json={"sessions": [{
+        "client_id": "offline", "task_id": task_id, "duration_minutes": 25, "session_type": "work",
+        "started_at": yesterday.isoformat(), "completed_at": (yesterday + timedelta(minutes=25)).isoformat(),
+    }]})
+    session_id = client.post("/api/v1/pomodoro", json={"task_id": task_id, "duration_minutes": 25, "session_type": "work"}).json()["id"]
+    client.post(f"/api/v1/pomodoro/{session_id}/start")
+    client.post(f"/api/v1/pomodoro/{session_id}/complete")
+    result = client.get("/api/v1/stats/streaks").json()
+    assert (result["current_streak"], result["current_streak_start"]) == (2, (today - timedelta(days=1)).isoformat())
+    assert (result["longest_streak"], result["active_days"]) == (2, 2)
+    with engine.connect() as connection:
+        assert verify_user_stats(connection) == {}
+
+def test_stats_responses_are_cached_until_a_write(client):
+    """Test ETags, 304s and that a write invalidates the user's cached statistics"""
+    user, other = populate(5, users=2)
+    current_user["user"] = user
+    urls = ["/api/v1/stats/dashboard", "/api/v1/stats/tasks/summary", "/api/v1/stats/pomodoro/summary"]
+    first = {url: client.get(url) for url in urls}
+    assert all(response.headers["ETag"] for response in first.values())
+
+    statements = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        for url in urls:
+            assert client.get(url).json() == first[url].json()
+            response = client.get(url, headers={"If-None-Match": first[url].headers["ETag"]})
+            assert response.status_code == 304
+            assert response.content == b""
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    assert statements == []
+
+    # Another user's write leaves the cache alone, the user's own invalidates it
+    current_user["user"] = other
+    client.post("/api/v1/tasks", json={"title": "Not mine"})
+    current_user["user"] = user
+    assert client.get(urls[0], headers={"If-None-Match": first[urls[0]].headers["ETag"]}).status_code == 304
+    task_id = client.post("/api/v1/tasks", json={"title": "New"}).json()["id"]
+    client.post("/api/v1/pomodoro", json={"task_id": task_id, "duration_minutes": 25, "session_type": "work"})
+    for url in urls:
+        response = client.get(url, headers={"If-None-Match": first[url].headers["ETag"]})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != first[url].headers["ETag"]
+    dashboard = client.get(urls[0]).json()
+    assert dashboard["task_stats"]["total_tasks"] == first[urls[0]].json()["task_stats"]["total_tasks"] + 1
+    assert dashboard["pomodoro_stats"]["sessions_today"] == first[urls[0]].json()["pomodoro_stats"]["sessions_today"] + 1
+
+def test_concurrent_misses_compute_once():
+    """Test that concurrent misses for one entry wait for a single computation"""
+    cache = StatsCache(TTLCache(max_size=10, ttl_seconds=60), MemoryVersionStore())
+    calls = []
+    def compute():
+        calls.append(1)
+        time.sleep(0.2)
+        return {"value": len(calls)}
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get_or_compute(1, "dashboard", compute)))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert {json.loads(body)["value"] for body, _etag in results} == {1}
+    assert cache.stats()["coalesced_misses"] == 7
+
+def test_waiting_in_async_mode_leaves_the_event_loop_running():
+    """Test that a coalesced miss in a greenlet on the event loop doesn't block the loop"""
+    done = threading.Event()
+    async def main():
+        # Only runs if the waiter yields the loop
+        asyncio.get_running_loop().call_later(0.05, done.set)
+        return await greenlet_spawn(_wait, done, 5)
+    assert asyncio.run(main()) is True
+
+def test_shared_version_store_invalidates_every_worker(tmp_path):
+    """Test that an invalidation through the SQLite store reaches other processes' caches"""
+    path = str(tmp_path / "stats_versions.db")
+    workers = [StatsCache(TTLCache(max_size=10, ttl_seconds=60), SQLiteVersionStore(path)) for _ in range(2)]
+    for worker in workers:
+        worker.get_or_compute(1, "tasks", lambda: {"todo": 1})
+        worker.get_or_compute(2, "tasks", lambda: {"todo": 5})
+
+    workers[1].invalidate([1])
+    body, _etag = workers[0].get_or_compute(1, "tasks", lambda: {"todo": 2})
+    assert json.loads(body) == {"todo": 2}
+    body, _etag = workers[0].get_or_compute(2, "tasks", lambda: {"todo": 6})
+    assert json.loads(body) == {"todo": 5}
+
+    workers[1].invalidate_all()
+    body, _etag = workers[0].get_or_compute(2, "tasks", lambda: {"todo": 7})
+    assert json.loads(body) == {"todo": 7}
@@ -4,8 +4,11 @@ Tests for task endpoints.
 
 import os
 import pytest
+from contextlib import contextmanager
+from datetime import datetime, timedelta
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import DateTime, create_engine, event, literal, select
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.orm import sessionmaker
 
 # Set DATABASE_URL to SQLite BEFORE importing app to avoid psycopg2 dependency
@@ -16,7 +19,20 @@ from app.main import app
 from app.core.database import Base, get_db
 from app.core.dependencies import get_current_active_user
 from app.core.security import get_password_hash
-from app.models.task import Task
+from app.core.archive import archive_sessions
+from app.core.partitions import (
+    DEFAULT_PARTITION,
+    add_months,
+    ensure_session_partitions,
+    month_start,
+    partition_bounds,
+    partition_name,
+    partition_sessions_table,
+)
+from app.core.sql import minutes_between
+from app.core.stats_cache import stats_cache
+from app.core.user_stats import rebuild_user_stats, verify_user_stats
+from app.models.task import PomodoroSession, PomodoroSessionArchive, Task
 from app.models.user import User
 
 # Import models to ensure they're registered with Base
@@ -62,6 +78,8 @@ app.dependency_overrides[get_current_active_user] = override_get_current_user
 def client():
     # Create all tables including User
     Base.metadata.create_all(bind=engine)
+    # Cached statistics of a previous test's user with the same id
+    stats_cache.clear()
     
     # Create test user
     db = TestingSessionLocal()
@@ -165,3 +183,458 @@ def test_delete_task(client):
     # Verify it's deleted
     get_response = client.get(f"/api/v1/tasks/{task_id}")
     assert get_response.status_code == 404
+
+def test_session_owner_follows_task(client):
+    """Test that pomodoro_sessions.user_id is filled in and follows task ownership"""
+    task_id = client.post("/api/v1/tasks", json={"title": "Owned task"}).json()["id"]
+    session_id = client.post(
+        "/api/v1/pomodoro", json={"task_id": task_id, "duration_minutes": 25, "session_type": "work"}
+    ).json()["id"]
+
+    db = TestingSessionLocal()
+    try:
+        owner = db.query(User).filter(User.username == "testuser").first()
+        assert db.get(PomodoroSession, session_id).user_id == owner.id
+
+        # Sessions created through the ORM without user_id get the task's owner
+        orm_session = PomodoroSession(task_id=task_id, duration_minutes=5, session_type="short_break")
+        db.add(orm_session)
+        db.commit()
+        assert orm_session.user_id == owner.id
+
+        other = User(username="otheruser", email="other@example.com", hashed_password="x")
+        db.add(other)
+        db.flush()
+        db.get(Task, task_id).user_id = other.id
+        db.commit()
+        owners = {user_id for (user_id,) in db.query(PomodoroSession.user_id)}
+        assert owners == {other.id}
+        # Both owners' counters are recounted, including the session added through the ORM
+        with engine.connect() as connection:
+            assert verify_user_stats(connection) == {}
+    finally:
+        db.close()
+
+    # The previous owner no longer sees the sessions
+    assert client.get("/api/v1/pomodoro/").json() == []
+
+def collect_pages(client, url, limit):
+    """Follow X-Next-Cursor through a listing and return the ids in order"""
+    ids, cursor = [], None
+    while True:
+        params = {"limit": limit}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get(url, params=params)
+        assert response.status_code == 200
+        ids += [item["id"] for item in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return ids
+
+def test_cursor_pagination_sort_orders(client):
+    """Test that every sort order pages through all tasks exactly once, in order"""
+    tasks = [
+        {"title": "a", "priority": "low", "due_date": "2030-01-03T00:00:00"},
+        {"title": "b", "priority": "high"},
+        {"title": "c", "priority": "medium", "due_date": "2030-01-01T00:00:00"},
+        {"title": "d", "priority": "high", "due_date": "2030-01-02T00:00:00"},
+        {"title": "e", "priority": "low"},
+    ]
+    ids = [client.post("/api/v1/tasks", json=task).json()["id"] for task in tasks]
+
+    assert collect_pages(client, "/api/v1/tasks/?sort=created_at", 2) == ids
+    assert collect_pages(client, "/api/v1/tasks/?sort=created_at&order=desc", 2) == ids[::-1]
+    # Tasks without a due date come last, in both orders
+    assert collect_pages(client, "/api/v1/tasks/?sort=due_date", 2) == [ids[2], ids[3], ids[0], ids[1], ids[4]]
+    assert collect_pages(client, "/api/v1/tasks/?sort=due_date&order=desc", 2) == [ids[0], ids[3], ids[2], ids[4], ids[1]]
+    assert collect_pages(client, "/api/v1/tasks/?sort=priority", 2) == [ids[3], ids[1], ids[2], ids[4], ids[0]]
+    assert collect_pages(client, "/api/v1/tasks/?sort=priority&order=asc", 3) == [ids[0], ids[4], ids[2], ids[1], ids[3]]
+
+def test_cursor_pagination_errors_and_offset(client):
+    """Test cursor validation and the deprecated skip parameter"""
+    ids = [client.post("/api/v1/tasks", json={"title": f"Task {i}"}).json()["id"] for i in range(3)]
+
+    response = client.get("/api/v1/tasks/", params={"limit": 1})
+    cursor = response.headers["X-Next-Cursor"]
+    assert client.get("/api/v1/tasks/", params={"cursor": cursor, "sort": "priority"}).status_code == 400
+    assert client.get("/api/v1/tasks/", params={"cursor": "not-a-cursor"}).status_code == 400
+    assert client.get("/api/v1/tasks/", params={"cursor": cursor, "skip": 1}).status_code == 400
+
+    response = client.get("/api/v1/tasks/", params={"skip": 1, "limit": 1})
+    assert [task["id"] for task in response.json()] == [ids[1]]
+    assert response.headers["X-Next-Cursor"]
+
+def test_session_cursor_pagination(client):
+    """Test paging through pomodoro sessions"""
+    task_id = client.post("/api/v1/tasks", json={"title": "Sessions"}).json()["id"]
+    ids = [
+        client.post(
+            "/api/v1/pomodoro", json={"task_id": task_id, "duration_minutes": 25, "session_type": "work"}
+        ).json()["id"]
+        for _ in range(5)
+    ]
+    assert collect_pages(client, "/api/v1/pomodoro/", 2) == ids
+    assert collect_pages(client, f"/api/v1/pomodoro/?task_id={task_id}&order=desc", 3) == ids[::-1]
+
+@contextmanager
+def count_queries():
+    """Count the statements sent to the test database"""
+    statements = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+def test_task_list_query_count_is_constant(client):
+    """Test that a page of tasks costs the same number of queries whatever its size"""
+    for i in range(10):
+        task_id = client.post("/api/v1/tasks", json={"title": f"Task {i}"}).json()["id"]
+        client.post("/api/v1/pomodoro", json={"task_id": task_id, "duration_minutes": 25, "session_type": "work"})
+
+    counts = {}
+    for limit in (2, 10):
+        with count_queries() as statements:
+            response = client.get("/api/v1/tasks/", params={"limit": limit})
+        assert all(len(task["pomodoro_sessions"]) == 1 for task in response.json())
+        counts[limit] = len(statements)
+    assert counts[2] == counts[10]
+
+    with count_queries() as statements:
+        response = client.get("/api/v1/tasks/", params={"limit": 10, "include": ""})
+    assert all(task["pomodoro_sessions"] == [] for task in response.json())
+    assert len(statements) == counts[10] - 1
+
+def test_batch_create_update_delete(client):
+    """Test a mixed batch with per-item results and ownership checks"""
+    existing = [client.post("/api/v1/tasks", json={"title": f"Existing {i}"}).json()["id"] for i in range(2)]
+    client.post("/api/v1/pomodoro", json={"task_id": existing[1], "duration_minutes": 25, "session_type": "work"})
+
+    db = TestingSessionLocal()
+    other = User(username="otheruser", email="other@example.com", hashed_password="x")
+    db.add(other)
+    db.flush()
+    foreign = Task(title="Not mine", user_id=other.id)
+    db.add(foreign)
+    db.commit()
+    foreign_id = foreign.id
+    db.close()
+
+    response = client.post("/api/v1/tasks/batch", json={
+        "create": [{"title": "New 1"}, {"title": "New 2", "priority": "high"}],
+        "update": [
+            {"id": existing[0], "status": "done", "description": "Finished"},
+            {"id": foreign_id, "title": "Stolen"},
+        ],
+        "delete": [existing[1], 99999],
+    })
+    assert response.status_code == 200
+    data = response.json()
+
+    assert [item["task"]["title"] for item in data["created"]] == ["New 1", "New 2"]
+    assert data["created"][1]["task"]["priority"] == "high"
+    assert data["updated"][0]["status"] == "updated"
+    assert data["updated"][0]["task"]["status"] == "done"
+    assert data["updated"][0]["task"]["description"] == "Finished"
+    assert data["updated"][0]["task"]["title"] == "Existing 0"
+    assert data["updated"][0]["task"]["completed_at"] is not None
+    assert data["updated"][1] == {"index": 1, "id": foreign_id, "status": "not_found", "task": None}
+    assert [item["status"] for item in data["deleted"]] == ["deleted", "not_found"]
+
+    titles = sorted(task["title"] for task in client.get("/api/v1/tasks/").json())
+    assert titles == ["Existing 0", "New 1", "New 2"]
+    assert client.get("/api/v1/pomodoro/").json() == []
+    db = TestingSessionLocal()
+    assert db.get(Task, foreign_id).title == "Not mine"
+    db.close()
+
+def test_batch_validation_and_query_count(client):
+    """Test that conflicting batches are rejected and batch cost doesn't grow with size"""
+    response = client.post("/api/v1/tasks/batch", json={"update": [{"id": 1, "title": "a"}], "delete": [1]})
+    assert response.status_code == 422
+    response = client.post("/api/v1/tasks/batch", json={"delete": [1, 1]})
+    assert response.status_code == 422
+
+    counts = []
+    for size in (2, 20):
+        ids = [item["id"] for item in client.post("/api/v1/tasks/batch", json={
+            "create": [{"title": f"Task {i}"} for i in range(size)]
+        }).json()["created"]]
+        with count_queries() as statements:
+            response = client.post("/api/v1/tasks/batch", json={
+                "create": [{"title": f"More {i}"} for i in range(size)],
+                "update": [{"id": task_id, "priority": "low"} for task_id in ids[: size // 2]],
+                "delete": ids[size // 2:],
+            })
+        assert response.status_code == 200
+        counts.append(len(statements))
+    assert counts[0] == counts[1]
+
+def test_ingest_offline_sessions(client):
+    """Test that offline sessions are stored once, with ownership checked per item"""
+    task_id = client.post("/api/v1/tasks", json={"title": "Offline work"}).json()["id"]
+    db = TestingSessionLocal()
+    other = User(username="otheruser", email="other@example.com", hashed_password="x")
+    db.add(other)
+    db.flush()
+    foreign = Task(title="Not mine", user_id=other.id)
+    db.add(foreign)
+    db.commit()
+    foreign_id = foreign.id
+    db.close()
+
+    # Two days ago, 09:00 UTC
+    day = (datetime.utcnow() - timedelta(days=2)).date().isoformat()
+
+    def session(client_id, task, start=f"{day}T09:00:00", end=f"{day}T09:24:30"):
+        return {
+            "client_id": client_id,
+            "task_id": task,
+            "duration_minutes": 25,
+            "session_type": "work",
+            "started_at": start,
+            "completed_at": end,
+        }
+
+    batch = {"sessions": [
+        session("a", task_id),
+        session("b", task_id, f"{day}T10:00:00+01:00", f"{day}T10:24:30+01:00"),
+        session("a", task_id),
+        session("c", foreign_id),
+    ]}
+    response = client.post("/api/v1/pomodoro/batch", json=batch)
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [result["status"] for result in results] == ["created", "created", "duplicate", "task_not_found"]
+    assert results[2]["id"] == results[0]["id"]
+
+    sessions = client.get("/api/v1/pomodoro/").json()
+    assert [(s["client_id"], s["started_at"], s["actual_duration_minutes"]) for s in sessions] == [
+        ("a", f"{day}T09:00:00", 24),
+        ("b", f"{day}T09:00:00", 24),
+    ]
+
+    # Retrying the upload doesn't create anything
+    with count_queries() as statements:
+        response = client.post("/api/v1/pomodoro/batch", json=batch)
+    retried = response.json()["results"]
+    assert [result["status"] for result in retried] == ["duplicate", "duplicate", "duplicate", "task_not_found"]
+    assert [result["id"] for result in retried] == [result["id"] for result in results]
+    assert not any(statement.startswith("INSERT") for statement in statements)
+    assert len(client.get("/api/v1/pomodoro/").json()) == 2
+
+    # Ends before it starts, spans more than an hour, from the future, too old
+    now = datetime.utcnow()
+    for start, end, error in [
+        (f"{day}T09:00:00", f"{day}T08:00:00", "must not be before started_at"),
+        (f"{day}T09:00:00", f"{day}T10:00:01", "can't span more than 60 minutes"),
+        ((now + timedelta(minutes=10)).isoformat(), (now + timedelta(minutes=35)).isoformat(), "must not be in the future"),
+        ("1990-01-01T09:00:00", "1990-01-01T09:25:00", "older than 366 days"),
+    ]:
+        response = client.post("/api/v1/pomodoro/batch", json={"sessions": [session("d", task_id, start, end)]})
+        assert response.status_code == 422
+        assert error in response.json()["detail"][0]["msg"]
+    # A full hour is still accepted
+    response = client.post("/api/v1/pomodoro/batch", json={"sessions": [session("e", task_id, f"{day}T11:00:00", f"{day}T12:00:00")]})
+    assert response.json()["results"][0]["status"] == "created"
+    assert len(client.get("/api/v1/pomodoro/").json()) == 3
+
+def test_completed_at_stamped_only_when_becoming_done(client):
+    """Test that completed_at is set when a task moves into DONE and kept when it is marked done again"""
+    task_id = client.post("/api/v1/tasks", json={"title": "Finish"}).json()["id"]
+    completed_at = client.put(f"/api/v1/tasks/{task_id}", json={"status": "done"}).json()["completed_at"]
+    assert completed_at is not None
+
+    # Already done: neither a PUT nor a batch update restamps it
+    assert client.put(f"/api/v1/tasks/{task_id}", json={"status": "done", "title": "Finished"}).json()["completed_at"] == completed_at
+    client.post("/api/v1/tasks/batch", json={"update": [{"id": task_id, "status": "done"}]})
+    assert client.get(f"/api/v1/tasks/{task_id}").json()["completed_at"] == completed_at
+
+    # Reopened then done again: a new completion
+    client.put(f"/api/v1/tasks/{task_id}", json={"status": "todo"})
+    restamped = client.post("/api/v1/tasks/batch", json={"update": [{"id": task_id, "status": "done"}]})
+    assert restamped.status_code == 200
+    assert client.get(f"/api/v1/tasks/{task_id}").json()["completed_at"] > completed_at
+
+def test_single_write_statements(client):
+    """Test that single-task and session writes are the write plus the statistics upserts, without refreshes"""
+    # statements[0] loads the current user; the INSERTs after the write are the counters and rollups upserts
+    with count_queries() as statements:
+        task = client.post("/api/v1/tasks", json={"title": "Write me"}).json()
+    assert [statement.split()[0] for statement in statements[1:]] == ["INSERT", "INSERT"]
+    assert task["pomodoro_sessions"] == []
+
+    with count_queries() as statements:
+        session = client.post("/api/v1/pomodoro", json={"task_id": task["id"], "duration_minutes": 25, "session_type": "work"}).json()
+    assert [statement.split()[0] for statement in statements[1:]] == ["INSERT", "INSERT", "INSERT"]
+    assert session["task_id"] == task["id"]
+
+    with count_queries() as statements:
+        response = client.put(f"/api/v1/tasks/{task['id']}", json={"status": "done"})
+    # The previous status, the UPDATE, the counters and rollups, then the task's sessions for the response
+    assert [statement.split()[0] for statement in statements[1:]] == ["SELECT", "UPDATE", "INSERT", "INSERT", "SELECT"]
+    data = response.json()
+    assert data["status"] == "done"
+    assert data["completed_at"] is not None
+    assert [s["id"] for s in data["pomodoro_sessions"]] == [session["id"]]
+
+    with count_queries() as statements:
+        response = client.put(f"/api/v1/pomodoro/{session['id']}", json={"actual_duration_minutes": 20})
+    # Not completed, so the counters and rollups don't change
+    assert [statement.split()[0] for statement in statements[1:]] == ["SELECT", "UPDATE"]
+    assert response.json()["actual_duration_minutes"] == 20
+
+    with count_queries() as statements:
+        assert client.delete(f"/api/v1/pomodoro/{session['id']}").status_code == 204
+    assert [statement.split()[0] for statement in statements[1:]] == ["DELETE", "INSERT", "INSERT"]
+    assert client.delete(f"/api/v1/pomodoro/{session['id']}").status_code == 404
+    assert client.delete(f"/api/v1/tasks/{task['id']}").status_code == 204
+    assert client.delete(f"/api/v1/tasks/{task['id']}").status_code == 404
+    assert client.put(f"/api/v1/tasks/{task['id']}", json={"title": "Gone"}).status_code == 404
+    assert client.post("/api/v1/pomodoro", json={"task_id": task["id"], "duration_minutes": 25, "session_type": "work"}).status_code == 404
+
+def test_session_start_complete_transitions(client):
+    """Test that start/complete are single conditional UPDATEs (plus the statistics) with the right errors"""
+    task_id = client.post("/api/v1/tasks", json={"title": "Timed"}).json()["id"]
+    session_id = client.post("/api/v1/pomodoro", json={"task_id": task_id, "duration_minutes": 25, "session_type": "work"}).json()["id"]
+
+    response = client.post(f"/api/v1/pomodoro/{session_id}/complete")
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Session not started"
+
+    with count_queries() as statements:
+        response = client.post(f"/api/v1/pomodoro/{session_id}/start")
+    assert response.status_code == 200
+    assert response.json()["started_at"] is not None
+    assert [statement.split()[0] for statement in statements[1:]] == ["UPDATE"]
+
+    response = client.post(f"/api/v1/pomodoro/{session_id}/start")
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Session already started"
+
+    started = (datetime.utcnow() - timedelta(minutes=25, seconds=30)).isoformat()
+    client.put(f"/api/v1/pomodoro/{session_id}", json={"started_at": started})
+    with count_queries() as statements:
+        response = client.post(f"/api/v1/pomodoro/{session_id}/complete")
+    assert response.status_code == 200
+    assert response.json()["actual_duration_minutes"] == 25
+    assert response.json()["completed_at"] is not None
+    # The counters and rollups upserts, then the focus row: created for the
+    # user's first completed work session, locked and rewritten
+    assert [statement.split()[0] for statement in statements[1:]] == [
+        "UPDATE", "INSERT", "INSERT", "SELECT", "INSERT", "SELECT", "UPDATE"
+    ]
+    assert client.get("/api/v1/stats/heatmap", params={"days": 1}).json()["work_sessions"] == [1]
+
+    response = client.post(f"/api/v1/pomodoro/{session_id}/complete")
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Session already completed"
+    assert client.post("/api/v1/pomodoro/99999/start").status_code == 404
+    assert client.post("/api/v1/pomodoro/99999/complete").status_code == 404
+
+def test_minutes_between():
+    """Test that minutes_between truncates to whole minutes like the Python code did"""
+    start = datetime(2026, 1, 5, 9, 0, 0)
+    with engine.connect() as connection:
+        for elapsed, minutes in [
+            (timedelta(minutes=25), 25),
+            (timedelta(minutes=24, seconds=59, microseconds=999000), 24),
+            (timedelta(hours=3, seconds=1), 180),
+            (timedelta(0), 0),
+        ]:
+            expression = minutes_between(literal(start, DateTime()), literal(start + elapsed, DateTime()))
+            assert connection.scalar(select(expression)) == minutes
+    compiled = str(minutes_between(Task.created_at, Task.updated_at).compile(dialect=postgresql.dialect()))
+    assert compiled == "CAST(FLOOR(EXTRACT(EPOCH FROM (tasks.updated_at - tasks.created_at)) / 60) AS INTEGER)"
+
+def test_archived_sessions_keep_dashboard_totals(client):
+    """Test that archiving old sessions leaves the all-time statistics unchanged"""
+    import random
+    rng = random.Random(3)
+    task_ids = [client.post("/api/v1/tasks", json={"title": f"Task {i}"}).json()["id"] for i in range(3)]
+    now = datetime.utcnow()
+    db = TestingSessionLocal()
+    user_id = db.query(User).filter(User.username == "testuser").one().id
+    for _ in range(60):
+        created = now - timedelta(days=rng.randint(0, 90), minutes=rng.randint(0, 600))
+        completed = rng.random() < 0.7
+        db.add(PomodoroSession(
+            task_id=rng.choice(task_ids),
+            user_id=user_id,
+            duration_minutes=25,
+            session_type=rng.choice(["work", "work", "short_break", "long_break"]),
+            started_at=created,
+            completed_at=created + timedelta(minutes=25) if completed else None,
+            actual_duration_minutes=rng.choice([None, 5, 25]) if completed else None,
+            created_at=created,
+        ))
+    db.commit()
+    with engine.begin() as connection:
+        rebuild_user_stats(connection)
+    old_sessions = db.query(PomodoroSession).filter(PomodoroSession.created_at < datetime.combine((now - timedelta(days=30)).date(), datetime.min.time())).count()
+    db.close()
+
+    dashboard = client.get("/api/v1/stats/dashboard").json()
+    summary = client.get("/api/v1/stats/pomodoro/summary").json()
+
+    assert archive_sessions(engine, horizon_days=30, batch_size=7, now=now) == old_sessions > 0
+    assert archive_sessions(engine, horizon_days=30, now=now) == 0
+    stats_cache.clear()
+    assert client.get("/api/v1/stats/dashboard").json() == dashboard
+    assert client.get("/api/v1/stats/pomodoro/summary").json() == summary
+    with engine.connect() as connection:
+        assert verify_user_stats(connection) == {}
+    assert len(client.get("/api/v1/pomodoro/").json()) == 60 - old_sessions
+
+    # Archived totals go away with their task, like its sessions
+    client.delete(f"/api/v1/tasks/{task_ids[0]}")
+    db = TestingSessionLocal()
+    assert db.query(PomodoroSessionArchive).filter(PomodoroSessionArchive.task_id == task_ids[0]).count() == 0
+    assert db.query(PomodoroSessionArchive).count() > 0
+    db.close()
+    with engine.connect() as connection:
+        assert verify_user_stats(connection) == {}
+
+def test_partition_names():
+    """Test monthly partition naming and bounds"""
+    month = datetime(2026, 12, 1).date()
+    assert partition_name(month) == "pomodoro_sessions_p2026_12"
+    assert partition_bounds("pomodoro_sessions_p2026_12") == (month, datetime(2027, 1, 1).date())
+    assert partition_bounds("pomodoro_sessions_default") is None
+    assert add_months(month, -12) == datetime(2025, 12, 1).date()
+
+@pytest.mark.skipif(not os.environ.get("TEST_POSTGRES_URL"), reason="needs TEST_POSTGRES_URL")
+def test_new_partition_takes_its_rows_from_default():
+    """Test a month created after its rows landed in DEFAULT (PostgreSQL)"""
+    pg_engine = create_engine(os.environ["TEST_POSTGRES_URL"])
+    with pg_engine.connect() as connection:
+        transaction = connection.begin()
+        try:
+            connection.exec_driver_sql("CREATE SCHEMA partition_test")
+            connection.exec_driver_sql("SET LOCAL search_path TO partition_test")
+            Base.metadata.create_all(connection)
+            partition_sessions_table(connection)
+            month = add_months(month_start(datetime.utcnow().date()), 6)
+            user_id = connection.scalar(User.__table__.insert().values(
+                username="partitioned", email="partitioned@example.com", hashed_password="x"
+            ).returning(User.id))
+            task_id = connection.scalar(Task.__table__.insert().values(
+                title="Partitioned", user_id=user_id
+            ).returning(Task.id))
+            connection.execute(PomodoroSession.__table__.insert().values(
+                task_id=task_id, user_id=user_id, duration_minutes=25, session_type="work",
+                created_at=datetime.combine(month, datetime.min.time()) + timedelta(days=3),
+            ))
+            assert connection.exec_driver_sql(f"SELECT count(*) FROM {DEFAULT_PARTITION}").scalar() == 1
+
+            ensure_session_partitions(connection, months_ahead=0, today=month)
+            ensure_session_partitions(connection, months_ahead=0, today=month)
+
+            assert connection.exec_driver_sql(f"SELECT count(*) FROM {DEFAULT_PARTITION}").scalar() == 0
+            assert connection.exec_driver_sql(f"SELECT count(*) FROM {partition_name(month)}").scalar() == 1
+            assert connection.execute(select(PomodoroSession.id)).all()
+        finally:
+            transaction.rollback()